@@ -0,0 +1,9 @@
+from asgiref.wsgi import WsgiToAsgi
+
+from main import app as flask_app, prepare
+
+prepare()
+
+# ASGI entrypoint, e.g. `uvicorn asgi:app`. Views still run in worker threads;
+# every db_utils coroutine is executed on the shared loop in async_runner.
+app = WsgiToAsgi(flask_app)
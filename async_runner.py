@@ -0,0 +1,116 @@
+import asyncio
+import atexit
+import contextvars
+import os
+import threading
+
+# "persistent": every coroutine runs on one long-lived loop in a background thread.
+# "per_request": legacy behaviour, a fresh asyncio.run() loop per call.
+ASYNC_MODE = os.getenv("ASYNC_MODE", "persistent")
+
+
+class LoopRunner:
+    """Owns a single event loop running in a daemon thread.
+
+    Synchronous code (Flask views) submits coroutines with ``run`` and blocks
+    until they finish, so async resources such as pooled connections and
+    caches live on the same loop for the whole life of the process.
+    """
+
+    def __init__(self, name="db-event-loop"):
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        if self._loop is None:
+            self.start()
+        return self._loop
+
+    def start(self):
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=_run, name=self.name, daemon=True)
+            self._thread.start()
+            ready.wait()
+            self._loop = loop
+
+    def run(self, coro, timeout=None):
+        loop = self.loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            coro.close()
+            raise RuntimeError("LoopRunner.run() called from its own event loop; await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+    def stop(self):
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = None
+            self._thread = None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+
+
+runner = LoopRunner()
+atexit.register(runner.stop)
+
+
+class _DatabaseTimer:
+    __slots__ = ("seconds",)
+
+    def __init__(self):
+        self.seconds = 0.0
+
+
+# The timer of the run_async call whose coroutine is running; tasks it spawns share it
+_database_timer = contextvars.ContextVar("database_timer", default=None)
+_database = threading.local()
+
+
+async def _timed(coro, timer):
+    _database_timer.set(timer)
+    return await coro
+
+
+def run_async(coro):
+    timer = _DatabaseTimer()
+    try:
+        if ASYNC_MODE == "per_request":
+            return asyncio.run(_timed(coro, timer))
+        return runner.run(_timed(coro, timer))
+    finally:
+        _database.seconds = database_seconds() + timer.seconds
+
+
+def add_database_seconds(seconds: float):
+    """Charge seconds of database work to the run_async call being served, if any."""
+    timer = _database_timer.get()
+    if timer is not None:
+        timer.seconds += seconds
+
+
+def database_seconds() -> float:
+    """Total database time of the coroutines the calling thread has run through run_async.
+
+    This is time spent checking out and holding pooled connections and waiting
+    on the writer, so password hashing and image work are not included.
+    """
+    return getattr(_database, "seconds", 0.0)
@@ -1,8 +1,11 @@
 import os
 import jwt
+import hashlib
+import secrets
 import datetime
 
 SECRET_KEY = os.getenv("AUTH_SECRET_KEY", "supersecretkey")
+REFRESH_TOKEN_TTL = datetime.timedelta(days=int(os.getenv("REFRESH_TOKEN_TTL_DAYS", "30")))
 
 
 def generate_token(user_id, username, role):
@@ -26,6 +29,15 @@ def decode_token(token):
         return {"error": "Invalid token"}
 
 
+def generate_refresh_token():
+    # Opaque random token; only its hash is stored server-side
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
 # Example usage
 if __name__ == "__main__":
     token = generate_token("U123", "satya", "admin")
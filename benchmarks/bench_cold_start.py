@@ -0,0 +1,84 @@
+"""Cold-start time of the app: a fresh interpreter importing main, checked against a budget.
+
+The first start runs every migration on an empty database; the rest find the
+schema current, which is what each worker process pays on a normal boot.
+Exits with status 1 when the median start exceeds the budget.
+
+    python benchmarks/bench_cold_start.py --runs 10 --budget-ms 800
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLD_START_BUDGET_MS = float(os.getenv("COLD_START_BUDGET_MS", "800"))
+
+# Reports how long importing and preparing the app took, excluding interpreter start-up
+_CHILD = "import time; t = time.perf_counter(); import main; main.prepare(); print('IMPORT_MS', (time.perf_counter() - t) * 1000)"
+
+
+def _start(db_name, importtime=False):
+    env = dict(os.environ, DB_NAME=db_name, PYTHONPATH=ROOT)
+    args = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", _CHILD]
+    started = time.perf_counter()
+    result = subprocess.run(args, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    import_ms = next(float(line.split()[1]) for line in result.stdout.splitlines() if line.startswith("IMPORT_MS"))
+    return wall_ms, import_ms, result.stderr
+
+
+def _slowest_imports(stderr, count):
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|").split("|"))
+        if not name.startswith(" "):
+            modules.append((int(cumulative_us), int(self_us), name.strip()))
+    modules.sort(reverse=True)
+    return {name: {"cumulative_ms": round(cumulative / 1000, 1), "self_ms": round(own / 1000, 1)}
+            for cumulative, own, name in modules[:count]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=COLD_START_BUDGET_MS)
+    parser.add_argument("--db", help="existing database to start against (default: a new one)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = args.db or os.path.join(tmp, "cold_start.db")
+        first_wall, first_import, _ = _start(db_name)
+
+        walls, imports = [], []
+        for _ in range(args.runs):
+            wall_ms, import_ms, _ = _start(db_name)
+            walls.append(wall_ms)
+            imports.append(import_ms)
+        _, _, importtime = _start(db_name, importtime=True)
+
+    median = statistics.median(walls)
+    print(json.dumps({
+        "first_start_ms": round(first_wall, 1),
+        "first_import_ms": round(first_import, 1),
+        "runs": args.runs,
+        "median_ms": round(median, 1),
+        "max_ms": round(max(walls), 1),
+        "median_import_ms": round(statistics.median(imports), 1),
+        "budget_ms": args.budget_ms,
+        "within_budget": median <= args.budget_ms,
+        "slowest_top_level_imports": _slowest_imports(importtime, 8),
+    }, indent=2))
+    return 0 if median <= args.budget_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""Latency of the main db_utils operations over seeded databases of several sizes.
+
+Each scale is seeded once with seed_database.py and cached in --data-dir. Every
+run starts from a fresh copy, so writes from one run never leak into the next.
+Each scale is measured in its own process, because db_utils binds its pool to
+DB_NAME when it is imported. Results are printed as JSON.
+
+    python benchmarks/bench_db_utils.py --scales small,medium --save-baseline baseline.json
+    python benchmarks/bench_db_utils.py --scales small,medium --baseline baseline.json
+
+Every operation reports best_round_p50_ms, the median of its fastest round,
+next to p50/p95/mean/max over all samples pooled. With --baseline, any
+operation whose best_round_p50_ms got slower than the baseline by more than
+--threshold is listed under "regressions" and the exit status is 1.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from seed_database import DEFAULT_ANCHOR, SEED_PASSWORD, member_username, seed_database
+
+# name: (members, logged days per member)
+SCALES = {
+    "small": (200, 30),
+    "medium": (2000, 180),
+    "large": (20000, 365),
+}
+
+# Login otherwise measures bcrypt's cost factor rather than the database
+BENCH_BCRYPT_ROUNDS = 4
+
+# Changes in the median smaller than this are noise, whatever the ratio
+MIN_REGRESSION_MS = 0.1
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _operations(db_utils, rng, users, days, user_ids, food_ids):
+    """name: (setup, call) pairs; setup runs untimed before every call, and so do call's arguments."""
+    anchor = date.fromisoformat(DEFAULT_ANCHOR)
+
+    def member():
+        return member_username(rng.randrange(users))
+
+    def logged_day():
+        return (anchor - timedelta(days=rng.randint(1, days))).isoformat()
+
+    def user_id():
+        return user_ids[member()]
+
+    def nothing():
+        return None
+
+    return {
+        "login": (nothing, lambda: db_utils.login(member(), SEED_PASSWORD)),
+        "get_all_users": (nothing, lambda: db_utils.get_all_users(limit=db_utils.USERS_PAGE_SIZE)),
+        "get_all_users_active_by_end_date": (nothing, lambda: db_utils.get_all_users(
+            limit=db_utils.USERS_PAGE_SIZE, status="active", sort="sub_end_date")),
+        "get_dashboard_statistics": (db_utils.invalidate_dashboard_statistics, db_utils.get_dashboard_statistics),
+        "get_dashboard_statistics_cached": (nothing, db_utils.get_dashboard_statistics),
+        "get_nutrition_data_from_db": (nothing, lambda: db_utils.get_nutrition_data_from_db(user_id(), logged_day())),
+        "save_nutrition_data_to_db": (nothing, lambda: db_utils.save_nutrition_data_to_db(user_id(), {
+            "date": logged_day(),
+            "items": [{"meal": "snacks", "food_id": rng.choice(food_ids), "servings": 1}],
+            "water": 0.25,
+        })),
+    }
+
+
+def run_scale(users, days, iterations, warmup, rounds, seed):
+    """Measure every operation against DB_NAME; runs in the child process.
+
+    The operations take turns for several rounds, and each reports the median
+    of its best round: background noise only ever adds time.
+    """
+    import db_utils
+
+    conn = sqlite3.connect(db_utils.DB_NAME)
+    user_ids = dict(conn.execute("SELECT username, user_id FROM users WHERE role = 'user'"))
+    food_ids = [row[0] for row in conn.execute("SELECT food_id FROM foods ORDER BY food_id")]
+    conn.close()
+
+    rng = random.Random(seed)
+    operations = _operations(db_utils, rng, users, days, user_ids, food_ids)
+    samples = {name: [] for name in operations}
+    medians = {name: [] for name in operations}
+
+    async def measure():
+        for round_no in range(rounds):
+            for name, (setup, call) in operations.items():
+                timings = []
+                for i in range((warmup if round_no == 0 else 0) + iterations):
+                    setup()
+                    coro = call()
+                    started = time.perf_counter()
+                    result = await coro
+                    elapsed = (time.perf_counter() - started) * 1000
+                    if result.get("status") == "failure" and result.get("reason") != "Subscription Expired":
+                        raise RuntimeError(f"{name} failed: {result}")
+                    timings.append(elapsed)
+                timings = timings[-iterations:]
+                samples[name].extend(timings)
+                medians[name].append(statistics.median(timings))
+
+    # db_utils reports logins with print; stdout is not part of the result
+    with contextlib.redirect_stdout(sys.stderr):
+        asyncio.run(measure())
+        db_utils.writer.stop()
+
+    return {
+        name: {
+            "iterations": len(timings),
+            # Compared against baselines: background noise only ever adds time
+            "best_round_p50_ms": round(min(medians[name]), 3),
+            "p50_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(_percentile(timings, 95), 3),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "max_ms": round(max(timings), 3),
+            "ops_per_s": round(1000 / statistics.fmean(timings), 1),
+        }
+        for name, timings in samples.items()
+    }
+
+
+def _seeded(scale, data_dir, seed):
+    """Path of the pristine database for scale and its row counts, seeding it on first use."""
+    users, days = SCALES[scale]
+    path = os.path.join(data_dir, f"{scale}-u{users}-d{days}-s{seed}-r{BENCH_BCRYPT_ROUNDS}.db")
+    summary_path = path + ".json"
+    if not os.path.exists(summary_path):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        print(f"Seeding {scale} ({users} members x {days} days)...", file=sys.stderr)
+        summary = seed_database(path, users=users, days=days, seed=seed,
+                                log=lambda message: print(message, file=sys.stderr))
+        with open(summary_path, "w") as f:
+            json.dump(summary, f)
+    with open(summary_path) as f:
+        return path, json.load(f)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """best_round_p50_ms change of every operation present in both runs, and the ones over threshold."""
+    changes, regressions = {}, []
+    for scale, measured in results["scales"].items():
+        before = baseline.get("scales", {}).get(scale)
+        if not before:
+            continue
+        for name, stats in measured["operations"].items():
+            old = before["operations"].get(name)
+            if not old or "best_round_p50_ms" not in old:
+                continue
+            old_ms, new_ms = old["best_round_p50_ms"], stats["best_round_p50_ms"]
+            change = (new_ms - old_ms) / old_ms if old_ms else 0.0
+            changes.setdefault(scale, {})[name] = {
+                "baseline_best_round_p50_ms": old_ms, "best_round_p50_ms": new_ms, "change": round(change, 3),
+            }
+            if change > threshold and new_ms - old_ms > MIN_REGRESSION_MS:
+                regressions.append(f"{scale}/{name}: {old_ms} -> {new_ms} ms ({change:+.0%})")
+    return {"baseline_commit": baseline.get("meta", {}).get("git_commit"), "threshold": threshold,
+            "changes": changes, "regressions": regressions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="small,medium", help=f"comma-separated, of: {', '.join(SCALES)}")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3, help="times every operation is measured, best median kept")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "pubfitnessstudio-bench"),
+                        help="where seeded databases are cached between runs")
+    parser.add_argument("--baseline", help="JSON from an earlier --save-baseline run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="median slowdown counted as a regression")
+    parser.add_argument("--save-baseline", help="also write the results to this file")
+    parser.add_argument("--run-scale", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_scale:
+        users, days = SCALES[args.run_scale]
+        print(json.dumps(run_scale(users, days, args.iterations, args.warmup, args.rounds, args.seed)))
+        return 0
+
+    scales = [scale.strip() for scale in args.scales.split(",") if scale.strip()]
+    unknown = [scale for scale in scales if scale not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale: {', '.join(unknown)}")
+
+    os.environ["BCRYPT_ROUNDS"] = str(BENCH_BCRYPT_ROUNDS)
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = {
+        "meta": {
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "rounds": args.rounds,
+            "bcrypt_rounds": BENCH_BCRYPT_ROUNDS,
+            "seed": args.seed,
+        },
+        "scales": {},
+    }
+    for scale in scales:
+        pristine, rows = _seeded(scale, args.data_dir, args.seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            work = os.path.join(tmp, "bench.db")
+            shutil.copyfile(pristine, work)
+            child = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--run-scale", scale,
+                 "--iterations", str(args.iterations), "--warmup", str(args.warmup),
+                 "--rounds", str(args.rounds), "--seed", str(args.seed)],
+                env=dict(os.environ, DB_NAME=work), stdout=subprocess.PIPE, check=True, text=True,
+            )
+        results["scales"][scale] = {"rows": rows, "operations": json.loads(child.stdout)}
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            results["comparison"] = compare(results, json.load(f), args.threshold)
+        status = 1 if results["comparison"]["regressions"] else 0
+    print(json.dumps(results, indent=2))
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Throughput of the Flask dev server with per-request asyncio.run() vs the persistent loop.
+
+    python benchmarks/bench_event_loop.py --requests 2000 --concurrency 16
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _request(base_url, path, token, body=None):
+    req = urllib.request.Request(
+        base_url + path,
+        data=json.dumps(body).encode("utf-8") if body is not None else None,
+        headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(req) as resp:
+        resp.read()
+        return resp.status
+
+
+def run_load(base_url, token, total, concurrency):
+    paths = ["/api/user-goals", "/api/nutrition-data/2025-01-01", "/api/user-profile"]
+    counter = iter(range(total))
+    lock = threading.Lock()
+    errors = []
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            try:
+                _request(base_url, paths[i % len(paths)], token)
+            except Exception as e:
+                errors.append(str(e))
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return {"requests": total, "seconds": round(elapsed, 3), "rps": round(total / elapsed, 1), "errors": len(errors)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DB_NAME", os.path.join(tempfile.mkdtemp(), "bench.db"))
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    import async_runner
+    import main as webapp
+    webapp.prepare()
+
+    server = make_server("127.0.0.1", 0, webapp.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    req = urllib.request.Request(
+        base_url + "/api/login",
+        data=json.dumps({
+            "username": os.getenv("ADMIN_USERNAME", "PubFit"),
+            "password": os.getenv("ADMIN_PASSWORD", "PubFit@123"),
+        }).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(req) as resp:
+        token = json.loads(resp.read())["token"]
+
+    results = {}
+    for mode in ("per_request", "persistent"):
+        async_runner.ASYNC_MODE = mode
+        run_load(base_url, token, min(100, args.requests), args.concurrency)  # warm-up
+        results[mode] = run_load(base_url, token, args.requests, args.concurrency)
+    results["speedup"] = round(results["persistent"]["rps"] / results["per_request"]["rps"], 2)
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
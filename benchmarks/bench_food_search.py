@@ -0,0 +1,63 @@
+"""Per-query latency of the in-memory food search index.
+
+    python benchmarks/bench_food_search.py --rounds 200
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Mix of what members type: short prefixes, whole words, multi-word and misspelt queries
+QUERIES = [
+    "a", "ch", "chick", "chicken curry", "paneer tik", "dal", "egg", "idli",
+    "badam", "masala dosa", "biryni", "chiken", "panir", "dosaa", "zzzz",
+]
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    from food_search import FoodIndex
+
+    start = time.perf_counter()
+    index = FoodIndex.from_csv()
+    build_ms = (time.perf_counter() - start) * 1000
+
+    per_query = {}
+    samples = []
+    for query in QUERIES:
+        index.search(query, args.limit)  # warm-up
+        timings = []
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            index.search(query, args.limit)
+            timings.append((time.perf_counter() - start) * 1000)
+        per_query[query] = round(statistics.median(timings), 3)
+        samples.extend(timings)
+
+    print(json.dumps({
+        "foods": len(index),
+        "build_ms": round(build_ms, 2),
+        "queries": len(samples),
+        "p50_ms": round(_percentile(samples, 50), 3),
+        "p95_ms": round(_percentile(samples, 95), 3),
+        "max_ms": round(max(samples), 3),
+        "median_ms_by_query": per_query,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
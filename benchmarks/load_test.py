@@ -0,0 +1,342 @@
+"""End-to-end load test: members and admins using the app at once, at rising concurrency.
+
+Each member thread runs sessions like a browser would: log in, open the home
+page, then a weighted mix of actions (calculator searches, saving meals,
+history, trends, profile) before logging in again as someone else. Requests
+carry the JWT, revalidate with If-None-Match like a browser cache, and
+refresh the access token on a 401. Admin threads poll the dashboard, user
+list and pending requests throughout. Each stage of --ramp runs that many
+member threads for --stage-seconds. Throughput and p50/p95/p99 per route
+are printed as JSON.
+
+By default the app is started in this process on a freshly seeded database:
+
+    python benchmarks/load_test.py --ramp 1,4,16,32 --stage-seconds 20
+
+To load a running server instead, seed its database with seed_database.py
+(--anchor set to today, so subscriptions are current) and pass its URL:
+
+    python benchmarks/load_test.py --url http://localhost:5000 --members 1000
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from urllib.parse import quote, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from seed_database import SEED_PASSWORD, member_username, seed_database
+
+# Relative weights of what a signed-in member does next
+DEFAULT_MIX = {
+    "open_home": 35,
+    "open_calculator": 15,
+    "save_meal": 20,
+    "view_history": 10,
+    "view_trends": 10,
+    "view_profile": 10,
+}
+
+SEARCH_QUERIES = ["ch", "chick", "dal", "egg", "paneer", "rice", "roti", "idli", "dosa", "banana", "biryni"]
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def parse_mix(text):
+    """"open_home=50,save_meal=50" -> {"open_home": 50, "save_meal": 50}"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"unknown action {name!r}; choose from {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight)
+    return mix
+
+
+class Client:
+    """One keep-alive connection and the browser state of one virtual user."""
+
+    def __init__(self, base_url, samples):
+        parts = urlsplit(base_url)
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        self.samples = samples  # route -> [(status, ms)], owned by this thread
+        self.token = None
+        self.refresh_token = None
+        self.etags = {}
+
+    def request(self, method, path, route, body=None, auth=True, revalidate=False, parse=False):
+        # Like a browser, except for the few responses whose JSON is read here
+        headers = {} if parse else {"Accept-Encoding": "zstd, gzip"}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+            body = json.dumps(body)
+        if auth and self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        if revalidate and path in self.etags:
+            headers["If-None-Match"] = self.etags[path]
+
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, path, body, headers)
+            response = self.conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.samples.setdefault(route, []).append(("error", (time.perf_counter() - started) * 1000))
+            return None, None
+        self.samples.setdefault(route, []).append((response.status, (time.perf_counter() - started) * 1000))
+        if response.will_close:
+            self.conn.close()
+
+        if response.status == 401 and auth and self.refresh_token and self.refresh():
+            return self.request(method, path, route, json.loads(body) if body else None, auth, revalidate, parse)
+        if revalidate and response.getheader("ETag"):
+            self.etags[path] = response.getheader("ETag")
+        return response.status, json.loads(data) if parse else None
+
+    def login(self, username, password):
+        # The ETag cache survives: a browser keeps it across sign-ins, and user data ETags name the user
+        self.token = self.refresh_token = None
+        _, result = self.request("POST", "/api/login", "/api/login", {"username": username, "password": password}, auth=False, parse=True)
+        if result and result.get("status") == "success":
+            self.token, self.refresh_token = result["token"], result["refresh_token"]
+            return True
+        return False
+
+    def refresh(self):
+        _, result = self.request("POST", "/api/token/refresh", "/api/token/refresh", {"refresh_token": self.refresh_token}, auth=False, parse=True)
+        if result and result.get("status") == "success":
+            self.token, self.refresh_token = result["token"], result["refresh_token"]
+            return True
+        self.token = self.refresh_token = None
+        return False
+
+
+def _member_actions(client, rng, food_ids, history_days):
+    today = date.today()
+
+    def recent_day():
+        return (today - timedelta(days=rng.randint(0, 6))).isoformat()
+
+    def open_home():
+        client.request("GET", "/home", "/home", auth=False, revalidate=True)
+        client.request("GET", "/api/user-goals", "/api/user-goals", revalidate=True)
+        day = recent_day()
+        client.request("GET", f"/api/nutrition-data/{day}", "/api/nutrition-data/<date>", revalidate=True)
+
+    def open_calculator():
+        client.request("GET", "/calculator", "/calculator", auth=False, revalidate=True)
+        query = rng.choice(SEARCH_QUERIES)
+        # The page searches as the member types
+        for length in sorted({min(len(query), n) for n in (2, 4, len(query))}):
+            client.request("GET", f"/api/foods/search?q={quote(query[:length])}&limit=10", "/api/foods/search", auth=False)
+
+    def save_meal():
+        day = recent_day()
+        items = [{"meal": rng.choice(("breakfast", "lunch", "snacks", "dinner")), "food_id": rng.choice(food_ids),
+                  "servings": rng.choice((0.5, 1, 1, 2))} for _ in range(rng.randint(1, 3))]
+        client.request("POST", "/api/nutrition-data", "POST /api/nutrition-data", {"date": day, "items": items, "water": 0.25})
+        client.request("GET", f"/api/nutrition-data/{day}", "/api/nutrition-data/<date>", revalidate=True)
+
+    def view_history():
+        start = (today - timedelta(days=min(history_days, 30))).isoformat()
+        client.request("GET", f"/api/nutrition-data?from={start}&to={today.isoformat()}&bucket=day", "/api/nutrition-data")
+
+    def view_trends():
+        client.request("GET", f"/api/nutrition-trends?bucket={rng.choice(('week', 'month'))}&periods=12", "/api/nutrition-trends")
+
+    def view_profile():
+        client.request("GET", "/profile", "/profile", auth=False, revalidate=True)
+        client.request("GET", "/api/user-profile", "/api/user-profile", revalidate=True)
+
+    return {action.__name__: action for action in (open_home, open_calculator, save_meal, view_history, view_trends, view_profile)}
+
+
+def member_loop(base_url, members, mix, session_actions, think, food_ids, history_days, deadline, seed, samples):
+    rng = random.Random(seed)
+    client = Client(base_url, samples)
+    actions = _member_actions(client, rng, food_ids, history_days)
+    names, weights = list(mix), list(mix.values())
+    while time.monotonic() < deadline:
+        client.request("GET", "/login", "/login", auth=False, revalidate=True)
+        if not client.login(member_username(rng.randrange(members)), SEED_PASSWORD):
+            # An expired subscription: the member gives up and someone else signs in
+            continue
+        actions["open_home"]()
+        for _ in range(session_actions):
+            if time.monotonic() >= deadline:
+                break
+            actions[rng.choices(names, weights)[0]]()
+            if think:
+                time.sleep(rng.expovariate(1 / think))
+    client.conn.close()
+
+
+def admin_loop(base_url, username, password, interval, stop, samples):
+    client = Client(base_url, samples)
+    if not client.login(username, password):
+        return
+    while not stop.is_set():
+        client.request("GET", "/api/dashboard-stats", "/api/dashboard-stats")
+        client.request("GET", "/api/users?limit=50", "/api/users")
+        client.request("GET", "/api/pending-requests", "/api/pending-requests")
+        stop.wait(interval)
+    client.conn.close()
+
+
+def _merge(per_thread):
+    merged = {}
+    for samples in per_thread:
+        for route, observed in samples.items():
+            merged.setdefault(route, []).extend(observed)
+    return merged
+
+
+def summarize(samples, seconds):
+    routes = {}
+    for route, observed in sorted(samples.items()):
+        timings = [ms for _, ms in observed]
+        statuses = {}
+        for status, _ in observed:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        routes[route] = {
+            "requests": len(observed),
+            "rps": round(len(observed) / seconds, 1),
+            "p50_ms": round(_percentile(timings, 50), 2),
+            "p95_ms": round(_percentile(timings, 95), 2),
+            "p99_ms": round(_percentile(timings, 99), 2),
+            "mean_ms": round(statistics.fmean(timings), 2),
+            "max_ms": round(max(timings), 2),
+            "statuses": statuses,
+        }
+    total = sum(route["requests"] for route in routes.values())
+    errors = sum(count for route in routes.values() for status, count in route["statuses"].items()
+                 if status == "error" or status.startswith("5"))
+    return {"requests": total, "rps": round(total / seconds, 1), "errors": errors, "routes": routes}
+
+
+def _food_ids(base_url):
+    client = Client(base_url, {})
+    ids = set()
+    for query in SEARCH_QUERIES:
+        status, result = client.request("GET", f"/api/foods/search?q={quote(query)}&limit=20", "", auth=False, parse=True)
+        if status == 200:
+            ids.update(food["food_id"] for food in result["foods"])
+    client.conn.close()
+    if not ids:
+        raise RuntimeError("No foods found through /api/foods/search")
+    return sorted(ids)
+
+
+def start_app(members, days, bcrypt_rounds):
+    """Seed a database, import main against it and serve it on a free port; returns the base URL."""
+    db_name = os.path.join(tempfile.mkdtemp(), "load.db")
+    os.environ["DB_NAME"] = db_name
+    os.environ["BCRYPT_ROUNDS"] = str(bcrypt_rounds)
+    print(f"Seeding {members} members x {days} days...", file=sys.stderr)
+    seed_database(db_name, users=members, days=days, anchor=date.today().isoformat(),
+                  log=lambda message: print(message, file=sys.stderr))
+
+    import logging
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    import main as webapp
+    webapp.prepare()
+
+    class KeepAliveHandler(WSGIRequestHandler):
+        # HTTP/1.0 would open a new connection for every request
+        protocol_version = "HTTP/1.1"
+
+    server = make_server("127.0.0.1", 0, webapp.app, threaded=True, request_handler=KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="load a running server instead of starting the app in this process")
+    parser.add_argument("--members", type=int, default=500, help="seeded members to sign in as")
+    parser.add_argument("--days", type=int, default=60, help="logged days per seeded member (in-process only)")
+    parser.add_argument("--ramp", default="1,4,16", help="member threads per stage, comma-separated")
+    parser.add_argument("--stage-seconds", type=float, default=15)
+    parser.add_argument("--mix", help=f"action weights, e.g. open_home=50,save_meal=50 (default: {DEFAULT_MIX})")
+    parser.add_argument("--session-actions", type=int, default=20, help="actions per member session before signing in again")
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between a member's actions")
+    parser.add_argument("--admins", type=int, default=1, help="admin threads polling during every stage")
+    parser.add_argument("--admin-interval", type=float, default=2.0, help="seconds between an admin's polls")
+    parser.add_argument("--bcrypt-rounds", type=int, default=int(os.getenv("BCRYPT_ROUNDS", "12")),
+                        help="password cost for the in-process app; the production default is 12")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+        ramp = [int(stage) for stage in args.ramp.split(",")]
+    except ValueError as e:
+        parser.error(str(e))
+
+    out = sys.stdout
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        # The app prints from request handlers; keep stdout for the results
+        sys.stdout = sys.stderr
+        base_url = start_app(args.members, args.days, args.bcrypt_rounds)
+    food_ids = _food_ids(base_url)
+    admin = (os.getenv("ADMIN_USERNAME", "PubFit"), os.getenv("ADMIN_PASSWORD", "PubFit@123"))
+
+    stages = []
+    for stage_no, concurrency in enumerate(ramp):
+        stop = threading.Event()
+        deadline = time.monotonic() + args.stage_seconds
+        per_thread = [{} for _ in range(concurrency + args.admins)]
+        threads = [
+            threading.Thread(target=member_loop, args=(
+                base_url, args.members, mix, args.session_actions, args.think_ms / 1000, food_ids,
+                args.days, deadline, args.seed * 1000 + stage_no * 100 + i, per_thread[i],
+            ))
+            for i in range(concurrency)
+        ] + [
+            threading.Thread(target=admin_loop, args=(base_url, *admin, args.admin_interval, stop, per_thread[concurrency + i]))
+            for i in range(args.admins)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads[:concurrency]:
+            thread.join()
+        stop.set()
+        for thread in threads[concurrency:]:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        stage = {"concurrency": concurrency, "seconds": round(elapsed, 2), **summarize(_merge(per_thread), elapsed)}
+        stages.append(stage)
+        print(f"{concurrency:>4} members: {stage['rps']:>8} req/s, {stage['errors']} errors", file=sys.stderr)
+
+    print(json.dumps({
+        "target": base_url if args.url else "in-process",
+        "members": args.members,
+        "mix": mix,
+        "think_ms": args.think_ms,
+        "admins": args.admins,
+        "bcrypt_rounds": None if args.url else args.bcrypt_rounds,
+        "stages": stages,
+    }, indent=2), file=out)
+
+
+if __name__ == "__main__":
+    main()
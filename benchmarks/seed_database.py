@@ -0,0 +1,212 @@
+"""Build a deterministic synthetic database for benchmarks.
+
+N members with M consecutive logged days each (meal items, daily totals and
+rollups), pending registrations and shared profile images. The same arguments
+always produce the same rows, so timings from different checkouts compare.
+Only the default admin's password hash, created by the migrations, is salted
+at random.
+
+    python benchmarks/seed_database.py --db /tmp/bench.db --users 10000 --days 365
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Every seeded member and applicant signs in with this password
+SEED_PASSWORD = "Bench@1234"
+# A fixed bcrypt salt keeps the shared hash identical between runs
+_SEED_SALT = "benchmarkseedsaltvalue"
+
+DEFAULT_ANCHOR = "2026-01-01"
+IMAGE_COLOURS = 16
+# Members are written this many per transaction
+USERS_PER_CHUNK = 200
+
+_MEALS = ("breakfast", "lunch", "snacks", "dinner")
+_SERVINGS = (0.5, 1, 1, 1, 1.5, 2)
+
+
+def member_username(index: int) -> str:
+    return f"member{index:07d}"
+
+
+def password_hash(rounds: int) -> str:
+    import bcrypt
+    return bcrypt.hashpw(SEED_PASSWORD.encode("utf-8"), f"$2b${rounds:02d}${_SEED_SALT}".encode("ascii")).decode("utf-8")
+
+
+def _profile_images(count: int):
+    """(original PNG, thumbnails) for count solid-colour images, each made and resized once."""
+    from PIL import Image
+    from image_pipeline import make_variants
+
+    images = []
+    for i in range(count):
+        out = io.BytesIO()
+        Image.new("RGB", (512, 512), ((i * 53) % 256, (i * 97) % 256, (i * 193) % 256)).save(out, "PNG")
+        data = out.getvalue()
+        images.append((data, make_variants(data)["variants"]))
+    return images
+
+
+def _user_row(rng, index, user_id, hashed, anchor):
+    start = anchor - timedelta(days=rng.randint(30, 900))
+    # A mix of expired, expiring and active subscriptions relative to the anchor
+    end = anchor + timedelta(days=rng.randint(-180, 720))
+    return (
+        user_id, "user", member_username(index), hashed, f"9{rng.randrange(10 ** 9):09d}",
+        start.isoformat(), end.isoformat(),
+        rng.randrange(1500, 3200, 50), rng.randrange(60, 200, 5), rng.randrange(40, 110, 5), rng.randrange(150, 400, 10),
+        rng.choice(("male", "female", "other")), date(rng.randint(1960, 2006), rng.randint(1, 12), rng.randint(1, 28)).isoformat(),
+        rng.randint(150, 200), rng.randint(45, 120),
+    )
+
+
+def _day_rows(rng, user_id, day, foods, max_items):
+    items = [(rng.choice(_MEALS), rng.choice(foods), rng.choice(_SERVINGS)) for _ in range(rng.randint(1, max_items))]
+    names = {meal: [] for meal in _MEALS}
+    totals = [0.0, 0.0, 0.0, 0.0]
+    for meal, (food_id, name, *nutrients), servings in items:
+        names[meal].append(name)
+        for i, value in enumerate(nutrients):
+            totals[i] += (value or 0) * servings
+    calories, carbs, proteins, fats = (round(total, 2) for total in totals)
+    nutrition = (
+        user_id, day, *(", ".join(names[meal]) for meal in _MEALS),
+        calories, carbs, proteins, fats, round(rng.uniform(0.5, 4), 1),
+    )
+    return nutrition, [(user_id, day, meal, food[0], servings) for meal, food, servings in items]
+
+
+def seed_database(db_name, users=1000, days=90, registrations=100, image_fraction=0.2,
+                  max_items=5, seed=42, anchor=DEFAULT_ANCHOR, log=print):
+    """Create db_name (which must not exist yet) and fill it; returns row counts and timings."""
+    from migrations import migrate
+    from db_utils import MIGRATIONS, prepare_database, BCRYPT_ROUNDS
+    from image_store import store_profile_image
+    from nutrition_rollups import rebuild_rollups
+
+    if os.path.exists(db_name):
+        raise FileExistsError(f"{db_name} already exists")
+    started = time.perf_counter()
+    # The migrations report progress with print; keep stdout for the JSON summary
+    with contextlib.redirect_stdout(sys.stderr):
+        migrate(db_name, MIGRATIONS, prepare_database)
+
+    rng = random.Random(seed)
+    anchor = date.fromisoformat(anchor)
+    hashed = password_hash(BCRYPT_ROUNDS)
+    images = _profile_images(IMAGE_COLOURS) if image_fraction > 0 else []
+    day_names = [(anchor - timedelta(days=offset)).isoformat() for offset in range(days, 0, -1)]
+
+    conn = sqlite3.connect(db_name, isolation_level=None)
+    # A throwaway database: durability is not worth paying for while filling it
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -262144")
+    foods = conn.execute(
+        "SELECT food_id, food_name, unit_serving_energy_kcal, unit_serving_carb_g, unit_serving_protein_g, unit_serving_fat_g "
+        "FROM foods ORDER BY food_id"
+    ).fetchall()
+
+    counts = {"users": 0, "nutrition_days": 0, "meal_items": 0, "profile_images": 0, "registrations": 0}
+    try:
+        for first in range(0, users, USERS_PER_CHUNK):
+            user_rows, nutrition_rows, item_rows, image_rows = [], [], [], []
+            for index in range(first, min(first + USERS_PER_CHUNK, users)):
+                user_id = uuid.UUID(int=rng.getrandbits(128)).hex
+                user_rows.append(_user_row(rng, index, user_id, hashed, anchor))
+                for day in day_names:
+                    nutrition, items = _day_rows(rng, user_id, day, foods, max_items)
+                    nutrition_rows.append(nutrition)
+                    item_rows.extend(items)
+                if images and rng.random() < image_fraction:
+                    image_rows.append((user_id, images[rng.randrange(len(images))]))
+
+            conn.execute("BEGIN")
+            conn.executemany("""
+                INSERT INTO users (
+                    user_id, role, username, password, phone_no, sub_start_date, sub_end_date,
+                    calories_goal, proteins_goal, fats_goal, carbs_goal, gender, dob, height, weight
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, user_rows)
+            conn.executemany("""
+                INSERT INTO nutrition_data
+                (user_id, date, breakfast, lunch, snacks, dinner, calories, carbs, proteins, fats, water, items_backfilled)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+            """, nutrition_rows)
+            conn.executemany(
+                "INSERT INTO meal_items (user_id, date, meal, food_id, servings) VALUES (?, ?, ?, ?, ?)", item_rows
+            )
+            for user_id, (data, variants) in image_rows:
+                store_profile_image(conn, user_id, data, "image/png", variants)
+            conn.execute("COMMIT")
+
+            counts["users"] += len(user_rows)
+            counts["nutrition_days"] += len(nutrition_rows)
+            counts["meal_items"] += len(item_rows)
+            counts["profile_images"] += len(image_rows)
+            if counts["users"] % (USERS_PER_CHUNK * 50) == 0:
+                log(f"{counts['users']} of {users} members ({time.perf_counter() - started:.0f} s)")
+
+        conn.execute("BEGIN")
+        conn.executemany("""
+            INSERT INTO registrations (
+                registration_id, username, phone_no, email_id, message,
+                preferred_role, gender, dob, height, weight, status
+            ) VALUES (?, ?, ?, ?, ?, 'user', ?, ?, ?, ?, 'pending')
+        """, [
+            (uuid.UUID(int=rng.getrandbits(128)).hex, f"applicant{i:07d}", f"8{rng.randrange(10 ** 9):09d}",
+             f"applicant{i}@example.com", "Please create my membership account.",
+             rng.choice(("male", "female", "other")), "1995-06-15", rng.randint(150, 200), rng.randint(45, 120))
+            for i in range(registrations)
+        ])
+        rebuild_rollups(conn)
+        conn.execute("COMMIT")
+        counts["registrations"] = registrations
+
+        # No ANALYZE: the app never runs it, so plans match a real database
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+
+    return {**counts, "seconds": round(time.perf_counter() - started, 2), "bytes": os.path.getsize(db_name)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", required=True, help="database file to create")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=90, help="logged days per member, ending the day before --anchor")
+    parser.add_argument("--registrations", type=int, default=100, help="pending registration requests")
+    parser.add_argument("--image-fraction", type=float, default=0.2, help="share of members with a profile image")
+    parser.add_argument("--max-items", type=int, default=5, help="most meal items logged per day")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--anchor", default=DEFAULT_ANCHOR, help="date the synthetic history ends at (YYYY-MM-DD)")
+    parser.add_argument("--force", action="store_true", help="replace --db if it exists")
+    args = parser.parse_args()
+
+    if args.force:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+    result = seed_database(
+        args.db, users=args.users, days=args.days, registrations=args.registrations,
+        image_fraction=args.image_fraction, max_items=args.max_items, seed=args.seed, anchor=args.anchor,
+        log=lambda message: print(message, file=sys.stderr),
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+import aiosqlite
+import asyncio
+import atexit
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from async_runner import add_database_seconds
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Bounded pool of long-lived aiosqlite connections.
+
+    The pool state is guarded by a thread lock and waiters are woken with
+    ``call_soon_threadsafe``, so one pool can be shared by coroutines running
+    on different event loops (e.g. one ``asyncio.run`` per Flask request).
+    """
+
+    def __init__(self, db_name, size=5, timeout=10.0, pragmas=None, health_check_interval=30.0, factory=sqlite3.Connection):
+        self.db_name = db_name
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.pragmas = pragmas or {}
+        self.health_check_interval = health_check_interval
+
+        self._lock = threading.Lock()
+        self._idle = deque()      # (connection, last_used)
+        self._waiters = deque()   # (loop, future)
+        self._open = 0
+        self._in_use = 0
+        self._closed = False
+
+        self._checkouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._timeouts = 0
+        self._failed_health_checks = 0
+        self._peak_in_use = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    @asynccontextmanager
+    async def acquire(self):
+        started = time.perf_counter()
+        conn = await self._checkout()
+        failed = False
+        try:
+            yield conn
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            await self._checkin(conn, failed)
+            add_database_seconds(time.perf_counter() - started)
+
+    async def _checkout(self):
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        while True:
+            conn = None
+            waiter = None
+            create = False
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    self._in_use += 1
+                elif self._open < self.size:
+                    self._open += 1
+                    self._in_use += 1
+                    create = True
+                else:
+                    loop = asyncio.get_running_loop()
+                    waiter = loop.create_future()
+                    self._waiters.append((loop, waiter))
+
+            if waiter is not None:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError
+                    await asyncio.wait_for(waiter, remaining)
+                except asyncio.TimeoutError:
+                    self._remove_waiter(waiter)
+                    with self._lock:
+                        self._timeouts += 1
+                    raise PoolTimeout(f"Timed out after {self.timeout}s waiting for a database connection")
+                except BaseException:
+                    self._remove_waiter(waiter)
+                    raise
+                continue
+
+            try:
+                if create:
+                    conn = await self._connect()
+                elif time.monotonic() - last_used > self.health_check_interval:
+                    await self._health_check(conn)
+            except Exception:
+                self._release_slot()
+                if create:
+                    raise
+                await self._close_quietly(conn)
+                with self._lock:
+                    self._failed_health_checks += 1
+                continue
+
+            waited = time.perf_counter() - start
+            with self._lock:
+                self._checkouts += 1
+                self._total_wait += waited
+                self._max_wait = max(self._max_wait, waited)
+                self._peak_in_use = max(self._peak_in_use, self._in_use)
+            return conn
+
+    async def _checkin(self, conn, failed):
+        discard = False
+        if failed or conn.in_transaction:
+            # Never hand a half-finished transaction to the next caller
+            try:
+                await conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._lock:
+            self._in_use -= 1
+            if discard or self._closed:
+                self._open -= 1
+                self._discarded += 1
+                discard = True
+            else:
+                self._idle.append((conn, time.monotonic()))
+        if discard:
+            await self._close_quietly(conn)
+        self._notify_one()
+
+    async def _connect(self):
+        conn = aiosqlite.connect(self.db_name, factory=self.factory)
+        # Idle pooled connections must not keep the interpreter alive on exit
+        conn.daemon = True
+        await conn
+        try:
+            for name, value in self.pragmas.items():
+                await conn.execute(f"PRAGMA {name} = {value}")
+        except Exception:
+            await self._close_quietly(conn)
+            raise
+        with self._lock:
+            self._created += 1
+        return conn
+
+    async def _health_check(self, conn):
+        async with conn.execute("SELECT 1") as cursor:
+            await cursor.fetchone()
+
+    async def _close_quietly(self, conn):
+        try:
+            await conn.close()
+        except Exception:
+            pass
+
+    def _release_slot(self):
+        with self._lock:
+            self._open -= 1
+            self._in_use -= 1
+            self._discarded += 1
+        self._notify_one()
+
+    def _remove_waiter(self, waiter):
+        with self._lock:
+            for item in self._waiters:
+                if item[1] is waiter:
+                    self._waiters.remove(item)
+                    return
+        # Already popped by a release: pass the wake-up on so it is not lost
+        self._notify_one()
+
+    def _notify_one(self):
+        with self._lock:
+            if not self._waiters:
+                return
+            loop, waiter = self._waiters.popleft()
+        try:
+            loop.call_soon_threadsafe(self._wake, waiter)
+        except RuntimeError:
+            # The waiter's loop has already been closed
+            self._notify_one()
+
+    def _wake(self, waiter):
+        if waiter.done():
+            self._notify_one()
+        else:
+            waiter.set_result(None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": len(self._waiters),
+                "peak_in_use": self._peak_in_use,
+                "checkouts": self._checkouts,
+                "created": self._created,
+                "discarded": self._discarded,
+                "timeouts": self._timeouts,
+                "failed_health_checks": self._failed_health_checks,
+                "total_wait_ms": round(self._total_wait * 1000, 3),
+                "avg_wait_ms": round(self._total_wait * 1000 / self._checkouts, 3) if self._checkouts else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+            }
+
+    async def close(self):
+        with self._lock:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._open -= len(idle)
+            waiters = list(self._waiters)
+            self._waiters.clear()
+        for conn in idle:
+            await self._close_quietly(conn)
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(self._wake, waiter)
+            except RuntimeError:
+                pass
+
+    def close_sync(self):
+        asyncio.run(self.close())
+
+    def register_atexit(self):
+        atexit.register(self.close_sync)
+        return self
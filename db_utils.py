@@ -1,22 +1,76 @@
-from models import RegisterModel, ContactModel
+from datetime import datetime, timedelta
 
-from datetime import datetime
-from pydantic import ValidationError
+from db_pool import ConnectionPool
+from migrations import migrate
+from write_queue import GroupCommitWriter
+from image_store import create_image_tables, migrate_inline_profile_images, add_missing_variants, store_profile_image, delete_profile_image, profile_image_url, content_hash
+from image_pipeline import read_upload, process_image, VARIANT_SIZES
+from password_hasher import PasswordHasher, BCRYPT_ROUNDS
+from auth_utils import generate_refresh_token, hash_refresh_token, REFRESH_TOKEN_TTL
+from nutrition_rollups import create_rollup_tables, rebuild_rollups, apply_day_change, day_totals, period_sql, ROLLUPS, ROLLUP_COLUMNS
+from meal_store import create_meal_tables, seed_foods, replace_meal_items, import_nutrition_days, backfill_meal_items, MEAL_ITEMS_SQL, meal_item_from_row
+from nutrition_io import EXPORT_FIELDS
+from resource_versions import create_version_table, bump_versions, resource_etag, nutrition_day, GOALS, PROFILE, VERSION_SQL
+from food_search import FoodIndex, load_foods_csv, FOOD_SEARCH_LIMIT, FOOD_SEARCH_MAX_LIMIT
+from query_log import query_log, connection_factory
 
+import asyncio
 import sqlite3
-import aiosqlite
-import bcrypt
+import threading
+import time
+import base64
+import json
 import uuid
 import os
 
 DB_NAME = os.getenv("DB_NAME", "pubfitnessstudio.db")
 
-def create_tables():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+# bcrypt runs in its own worker processes, off the request threads and the event loop
+hasher = PasswordHasher(
+    workers=int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    max_concurrency=int(os.getenv("PASSWORD_HASH_MAX_CONCURRENCY", "0")) or None,
+)
+
+# Per-connection settings; journal_mode=WAL is persistent and set once in prepare_database
+DB_PRAGMAS = {
+    "synchronous": "NORMAL",
+    "cache_size": int(os.getenv("DB_CACHE_SIZE_KIB", "16000")) * -1,
+    "mmap_size": int(os.getenv("DB_MMAP_SIZE", str(128 * 1024 * 1024))),
+    "busy_timeout": int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000")),
+    "temp_store": "MEMORY",
+}
+
+# Shared by every coroutine below instead of one aiosqlite.connect() per call
+pool = ConnectionPool(
+    DB_NAME,
+    size=int(os.getenv("DB_POOL_SIZE", "5")),
+    timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
+    health_check_interval=float(os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", "30")),
+    pragmas=DB_PRAGMAS,
+    factory=connection_factory(),
+).register_atexit()
+
+# Nutrition and profile writes are funnelled through one writer thread and group-committed
+writer = GroupCommitWriter(
+    DB_NAME,
+    max_batch=int(os.getenv("DB_WRITE_MAX_BATCH", "64")),
+    max_delay=float(os.getenv("DB_WRITE_MAX_DELAY_MS", "2")) / 1000,
+    pragmas=DB_PRAGMAS,
+    factory=connection_factory(),
+).register_atexit()
+
+def prepare_database(conn):
+    # WAL lets readers run alongside the single writer; it is persistent, so set once here
+    conn.execute("PRAGMA journal_mode = WAL")
+    for name, value in DB_PRAGMAS.items():
+        # The migration runner sets its own, longer lock wait
+        if name != "busy_timeout":
+            conn.execute(f"PRAGMA {name} = {value}")
+
 
+def _create_tables(conn):
     # Create users table
-    cursor.execute("""
+    conn.execute("""
     CREATE TABLE IF NOT EXISTS users (
         user_id TEXT PRIMARY KEY,
         role TEXT NOT NULL,
@@ -39,7 +93,7 @@ def create_tables():
     """)
 
     # Create nutrition_data table
-    cursor.execute("""
+    conn.execute("""
     CREATE TABLE IF NOT EXISTS nutrition_data (
         user_id TEXT NOT NULL,
         date DATE NOT NULL,
@@ -58,7 +112,7 @@ def create_tables():
     """)
 
     # Create registrations table for contact admin requests
-    cursor.execute("""
+    conn.execute("""
     CREATE TABLE IF NOT EXISTS registrations (
         registration_id TEXT PRIMARY KEY,
         username TEXT NOT NULL,
@@ -79,41 +133,299 @@ def create_tables():
     )
     """)
 
-    # Check if default admin exists, if not create it
+    # Create refresh_tokens table; only a hash of each token is stored
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS refresh_tokens (
+        token_hash TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        family_id TEXT NOT NULL,
+        expires_at TIMESTAMP NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        revoked_at TIMESTAMP,
+        replaced_by TEXT,
+        FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE
+    )
+    """)
+
+    create_image_tables(conn)
+    create_meal_tables(conn)
+    create_rollup_tables(conn)
+    create_version_table(conn)
+
+
+def _seed_foods(conn):
+    # Existing food_ids are preserved; add a migration that calls this again after editing data.csv
+    seed_foods(conn, load_foods_csv())
+
+
+def _create_default_admin(conn):
     admin_username = os.getenv("ADMIN_USERNAME", "PubFit")
     admin_password = os.getenv("ADMIN_PASSWORD", "PubFit@123")
 
-    cursor.execute("SELECT COUNT(*) FROM users WHERE username = ?", (admin_username,))
-    admin_exists = cursor.fetchone()[0]
-    
-    if admin_exists == 0:
-        # Create default admin user
-        admin_id = uuid.uuid4().hex
-        
-        admin_password = bcrypt.hashpw(admin_password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-        
-        cursor.execute("""
-            INSERT INTO users (
-                user_id, role, username, password, phone_no, 
-                sub_start_date, sub_end_date, calories_goal, proteins_goal, fats_goal, carbs_goal,
-                gender, dob
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            admin_id, 'admin', admin_username, admin_password, '9876543210',
-            '2024-01-01', '9999-12-31', 2000, 150, 65, 250,
-            'prefer_not_to_say', '1990-01-01'
-        ))
-        
-        print("Default admin user created successfully!")
+    admin_exists = conn.execute("SELECT COUNT(*) FROM users WHERE username = ?", (admin_username,)).fetchone()[0]
+    if admin_exists:
+        return
+
+    # Only a fresh database needs bcrypt in the server process
+    import bcrypt
+
+    admin_password = bcrypt.hashpw(admin_password.encode("utf-8"), bcrypt.gensalt(BCRYPT_ROUNDS)).decode("utf-8")
+    conn.execute("""
+        INSERT INTO users (
+            user_id, role, username, password, phone_no,
+            sub_start_date, sub_end_date, calories_goal, proteins_goal, fats_goal, carbs_goal,
+            gender, dob
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        uuid.uuid4().hex, 'admin', admin_username, admin_password, '9876543210',
+        '2024-01-01', '9999-12-31', 2000, 150, 65, 250,
+        'prefer_not_to_say', '1990-01-01'
+    ))
+    print("Default admin user created successfully!")
+
+
+def _move_inline_profile_images(conn):
+    moved = migrate_inline_profile_images(conn)
+    if moved:
+        print(f"Moved {moved} profile images into the image store.")
+
+
+def _add_missing_thumbnails(conn):
+    added = add_missing_variants(conn)
+    if added:
+        print(f"Rendered thumbnails for {added} profile images.")
+
+
+def _backfill_meal_items(conn):
+    backfilled = backfill_meal_items(conn)
+    if backfilled:
+        print(f"Backfilled meal items for {backfilled} nutrition log days.")
+
+
+# (name, table, columns, unique). Each migration step creates the indexes it shipped with, so a
+# step replays the same way on old databases; a new index needs a step of its own
+_INITIAL_INDEXES = (
+    ("idx_users_username", "users", "username", True),
+    ("idx_users_sub_end_date", "users", "sub_end_date", False),
+    ("idx_users_username_nocase", "users", "username COLLATE NOCASE", False),
+    ("idx_registrations_status_created_at", "registrations", "status, created_at", False),
+    ("idx_refresh_tokens_user_id", "refresh_tokens", "user_id", False),
+    ("idx_refresh_tokens_family_id", "refresh_tokens", "family_id", False),
+)
+_USER_SORT_KEY_INDEXES = (
+    ("idx_users_sub_end_date_user_id", "users", "sub_end_date, user_id", False),
+    ("idx_users_sub_start_date_user_id", "users", "sub_start_date, user_id", False),
+    ("idx_users_phone_no_user_id", "users", "phone_no, user_id", False),
+)
+
+# Indexes backing the login, admin dashboard and registration queries once every step has run
+INDEXES = [
+    index for index in _INITIAL_INDEXES if index[0] != "idx_users_sub_end_date"
+] + list(_USER_SORT_KEY_INDEXES)
+
+# The four dashboard counts in one pass over the sub_end_date index
+DASHBOARD_STATS_SQL = """
+    SELECT COUNT(*),
+           COUNT(CASE WHEN sub_end_date > date('now') THEN 1 END),
+           COUNT(CASE WHEN sub_end_date BETWEEN date('now') AND date('now', '+7 days') THEN 1 END),
+           COUNT(CASE WHEN sub_end_date < date('now') THEN 1 END)
+    FROM users
+"""
+
+# The index each /api/users sort key pages through; username is unique, so its index already
+# orders ties. Pages seek to the cursor with a row-value comparison on (sort, user_id)
+USER_SORT_INDEXES = {
+    "username": "idx_users_username",
+    "sub_end_date": "idx_users_sub_end_date_user_id",
+    "sub_start_date": "idx_users_sub_start_date_user_id",
+    "phone_no": "idx_users_phone_no_user_id",
+}
+
+
+def _users_page_sql(sort: str, where) -> str:
+    return f"""
+        SELECT u.user_id, u.username, u.phone_no, p.content_hash, 
+               u.sub_start_date, u.sub_end_date, u.role
+        FROM users u
+        LEFT JOIN profile_images p ON p.user_id = u.user_id
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY u.{sort}, u.user_id
+    """
+
+
+# Used wherever a user has no goal of their own set
+DEFAULT_GOALS = {"calories_goal": 2000, "proteins_goal": 150, "fats_goal": 65, "carbs_goal": 250}
+
+# Period keys for the nutrition range query
+NUTRITION_BUCKETS = {
+    "day": "n.date",
+    "week": period_sql("week", "n.date"),
+    "month": period_sql("month", "n.date"),
+}
+NUTRITION_RANGE_MAX_DAYS = 731
+# A day counts towards a goal when it lands within this fraction of it
+GOAL_TOLERANCE = 0.10
+_GOAL_NUTRIENTS = (("calories", "calories_goal"), ("proteins", "proteins_goal"), ("fats", "fats_goal"), ("carbs", "carbs_goal"))
+
+
+def _nutrition_range_sql(bucket: str):
+    goals = ", ".join(
+        f"COALESCE(NULLIF({goal}, 0), {DEFAULT_GOALS[goal]}) AS {goal}" for _, goal in _GOAL_NUTRIENTS
+    )
+    sums = ", ".join(f"SUM(n.{column})" for column in ("calories", "proteins", "fats", "carbs", "water"))
+    within = ", ".join(
+        f"SUM(n.{column} BETWEEN {1 - GOAL_TOLERANCE} * g.{goal} AND {1 + GOAL_TOLERANCE} * g.{goal})"
+        for column, goal in _GOAL_NUTRIENTS
+    )
+    # LEFT JOIN from the user row so the goals come back even for a range without logs
+    return f"""
+        SELECT {NUTRITION_BUCKETS[bucket]} AS period, COUNT(n.date), {sums}, {within},
+               {", ".join(f"g.{goal}" for _, goal in _GOAL_NUTRIENTS)}
+        FROM (SELECT user_id, {goals} FROM users WHERE user_id = ?) g
+        LEFT JOIN nutrition_data n ON n.user_id = g.user_id AND n.date BETWEEN ? AND ?
+        GROUP BY period
+        ORDER BY period
+    """
+
+
+NUTRITION_RANGE_SQL = {bucket: _nutrition_range_sql(bucket) for bucket in NUTRITION_BUCKETS}
+
+# Hot queries and the index each one must use, checked by check_hot_query_plans()
+HOT_QUERIES = [
+    ("login", "SELECT user_id, username, password, sub_end_date, role FROM users WHERE username=?",
+     ("PubFit",), "idx_users_username"),
+    ("approve_registration", "SELECT COUNT(*) FROM users WHERE username = ? and phone_no = ?",
+     ("PubFit", "9876543210"), "idx_users_username"),
+    ("dashboard_statistics", DASHBOARD_STATS_SQL, (), "idx_users_sub_end_date_user_id"),
+    ("pending_registrations", "SELECT registration_id FROM registrations WHERE status = 'pending' ORDER BY created_at DESC",
+     (), "idx_registrations_status_created_at"),
+    ("meal_items", MEAL_ITEMS_SQL, ("", "2025-01-01"), "idx_meal_items_user_id_date"),
+    ("nutrition_range", NUTRITION_RANGE_SQL["day"], ("", "2025-01-01", "2025-01-31"), "sqlite_autoindex_nutrition_data_1"),
+] + [
+    (f"users_page_by_{sort}", _users_page_sql(sort, [f"(u.{sort}, u.user_id) > (?, ?)"]) + " LIMIT 51", ("", ""), index)
+    for sort, index in USER_SORT_INDEXES.items()
+]
+
+
+def _index_user_sort_keys(conn):
+    # (sub_end_date, user_id) takes over from the single-column index for the dashboard counts
+    conn.execute("DROP INDEX IF EXISTS idx_users_sub_end_date")
+    create_indexes(conn, _USER_SORT_KEY_INDEXES)
+
 
-    conn.commit()
-    conn.close()
-    print("Tables created successfully.")
+def _create_initial_indexes(conn):
+    create_indexes(conn, _INITIAL_INDEXES)
 
 
+def create_indexes(cursor, indexes=INDEXES):
+    for name, table, columns, unique in indexes:
+        if unique:
+            try:
+                cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+                continue
+            except sqlite3.IntegrityError:
+                # Existing duplicates: keep a plain index so lookups are still a probe
+                print(f"Duplicate values in {table}({columns}); creating non-unique index {name}")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+def check_hot_query_plans(db_name: str = DB_NAME):
+    """Run EXPLAIN QUERY PLAN for every hot query and report whether it uses its index."""
+    conn = sqlite3.connect(db_name)
+    try:
+        report = {}
+        for name, sql, params, index in HOT_QUERIES:
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+            report[name] = {
+                "index": index,
+                "uses_index": any(index in step for step in plan),
+                "has_full_scan": any(step.startswith("SCAN ") and "INDEX" not in step for step in plan),
+                "plan": plan,
+            }
+        return report
+    finally:
+        conn.close()
+
+
+# Ordered schema and data migrations, applied by create_tables(). Never edit or reorder a
+# released step: append a new one. Steps must be idempotent, because databases created
+# before versioning replay all of them.
+MIGRATIONS = [
+    (1, "create tables", _create_tables),
+    (2, "create indexes", _create_initial_indexes),
+    (3, "seed foods from static/data.csv", _seed_foods),
+    (4, "create default admin", _create_default_admin),
+    (5, "move inline profile images into the image store", _move_inline_profile_images),
+    (6, "backfill meal items from meal name strings", _backfill_meal_items),
+    (7, "rebuild nutrition rollups", rebuild_rollups),
+    (8, "index the user list sort keys with user_id", _index_user_sort_keys),
+    (9, "render thumbnails for profile images stored without them", _add_missing_thumbnails),
+]
+
+
+def create_tables():
+    """Apply pending migrations. On a current database this is a single PRAGMA user_version read."""
+    migrate(DB_NAME, MIGRATIONS, prepare_database)
+
+
+async def _hash_password(password: str) -> str:
+    return await hasher.hash(password)
+
+
+async def _check_password(password: str, hashed: str) -> bool:
+    return await hasher.check(password, hashed)
+
+
+async def _upgrade_password_hash(user_id: str, password: str, old_hash: str):
+    """Re-hash a verified password whose bcrypt cost differs from BCRYPT_ROUNDS."""
+    new_hash = await _hash_password(password)
+
+    def write(conn):
+        # Only replace the hash we verified, never a password changed in the meantime
+        conn.execute("UPDATE users SET password = ? WHERE user_id = ? AND password = ?", (new_hash, user_id, old_hash))
+
+    await writer.submit(write)
+    hasher.record_rehash()
+
+
+# Running hash upgrades by user id; holding the task here also keeps it from being garbage collected
+_rehashing = {}
+
+
+def _upgrade_password_hash_later(user_id: str, password: str, old_hash: str):
+    """Start the upgrade as a background task so the login response does not wait for a second hash.
+
+    With ASYNC_MODE=per_request the task is cancelled when the request's loop
+    closes; the hash is then upgraded on a later login instead.
+    """
+    if user_id in _rehashing:
+        return
+
+    async def upgrade():
+        try:
+            await _upgrade_password_hash(user_id, password, old_hash)
+        except Exception as e:
+            print(f"Password rehash failed for {user_id}: {e}")
+        finally:
+            _rehashing.pop(user_id, None)
+
+    _rehashing[user_id] = asyncio.create_task(upgrade())
+
+
+def _subscription_days_left(sub_end_date):
+    """Days until sub_end_date, or None if it is missing, invalid or already past."""
+    if not sub_end_date:
+        return None
+    try:
+        end_date = datetime.strptime(sub_end_date, "%Y-%m-%d").date()
+    except Exception:
+        return None
+    days_left = (end_date - datetime.today().date()).days
+    return days_left if days_left >= 0 else None
+
 
 async def login(username: str, password: str):
-    async with aiosqlite.connect(DB_NAME) as db:
+    async with pool.acquire() as db:
         async with db.execute(
             "SELECT user_id, username, password, sub_end_date, role FROM users WHERE username=?",
             (username,)
@@ -134,7 +446,7 @@ async def login(username: str, password: str):
     user_id, uname, hashed_pw, sub_end_date, role = row
     
     # Verify password with bcrypt
-    if not bcrypt.checkpw(password.encode("utf-8"), hashed_pw.encode("utf-8")):
+    if not await _check_password(password, hashed_pw):
         return {
             "status": "failure",
             "reason": "Invalid password",
@@ -145,16 +457,11 @@ async def login(username: str, password: str):
             "role": None
         }
 
+    if hasher.needs_rehash(hashed_pw):
+        _upgrade_password_hash_later(user_id, password, hashed_pw)
+
     # Calculate remaining days
-    days_left = None
-    if sub_end_date:
-        try:
-            end_date = datetime.strptime(sub_end_date, "%Y-%m-%d").date()
-            days_left = (end_date - datetime.today().date()).days
-            if days_left < 0:
-                days_left = None
-        except Exception:
-            days_left = None
+    days_left = _subscription_days_left(sub_end_date)
     print(days_left)
     return {
         "status": "success" if days_left is not None else "failure",
@@ -167,7 +474,120 @@ async def login(username: str, password: str):
     }
 
 
+# A rotated refresh token presented again within this window (e.g. two tabs refreshing at once)
+# gets a new sibling token instead of being treated as stolen
+REFRESH_TOKEN_REUSE_GRACE = timedelta(seconds=int(os.getenv("REFRESH_TOKEN_REUSE_GRACE_SECONDS", "10")))
+
+
+def _utc_timestamp(delta: timedelta = timedelta()) -> str:
+    # Same format as SQLite's CURRENT_TIMESTAMP so the two compare as strings
+    return (datetime.utcnow() + delta).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _insert_refresh_token(conn, user_id: str, family_id: str) -> str:
+    token = generate_refresh_token()
+    conn.execute("""
+        INSERT INTO refresh_tokens (token_hash, user_id, family_id, expires_at)
+        VALUES (?, ?, ?, ?)
+    """, (hash_refresh_token(token), user_id, family_id, _utc_timestamp(REFRESH_TOKEN_TTL)))
+    return token
+
+
+def _revoke_refresh_family(conn, family_id: str):
+    conn.execute("""
+        UPDATE refresh_tokens SET revoked_at = CURRENT_TIMESTAMP
+        WHERE family_id = ? AND revoked_at IS NULL
+    """, (family_id,))
+
+
+async def create_refresh_token(user_id: str):
+    """Start a new refresh token family for a user who just logged in."""
+    def write(conn):
+        conn.execute("DELETE FROM refresh_tokens WHERE user_id = ? AND expires_at < ?", (user_id, _utc_timestamp()))
+        return _insert_refresh_token(conn, user_id, uuid.uuid4().hex)
+
+    return await writer.submit(write)
+
+
+async def rotate_refresh_token(refresh_token: str):
+    """Exchange a refresh token for a new one in the same family. No password hashing involved."""
+    token_hash = hash_refresh_token(refresh_token)
+
+    def rotate(conn):
+        row = conn.execute("""
+            SELECT r.user_id, r.family_id, r.expires_at, r.revoked_at, r.replaced_by,
+                   u.username, u.role, u.sub_end_date
+            FROM refresh_tokens r
+            LEFT JOIN users u ON u.user_id = r.user_id
+            WHERE r.token_hash = ?
+        """, (token_hash,)).fetchone()
+        if row is None:
+            return {"status": "failure", "reason": "Invalid refresh token"}
+
+        user_id, family_id, expires_at, revoked_at, replaced_by, username, role, sub_end_date = row
+        if revoked_at is not None:
+            family_active = conn.execute(
+                "SELECT 1 FROM refresh_tokens WHERE family_id = ? AND revoked_at IS NULL LIMIT 1", (family_id,)
+            ).fetchone()
+            if replaced_by is None or not family_active or revoked_at <= _utc_timestamp(-REFRESH_TOKEN_REUSE_GRACE):
+                # An old token came back: assume it leaked and end the whole session
+                _revoke_refresh_family(conn, family_id)
+                return {"status": "failure", "reason": "Refresh token has been revoked"}
+        elif expires_at < _utc_timestamp():
+            return {"status": "failure", "reason": "Refresh token expired"}
+
+        if username is None:
+            _revoke_refresh_family(conn, family_id)
+            return {"status": "failure", "reason": "No such user exists"}
+        days_left = _subscription_days_left(sub_end_date)
+        if days_left is None:
+            _revoke_refresh_family(conn, family_id)
+            return {"status": "failure", "reason": "Subscription Expired"}
+
+        new_token = _insert_refresh_token(conn, user_id, family_id)
+        if revoked_at is None:
+            conn.execute("""
+                UPDATE refresh_tokens SET revoked_at = CURRENT_TIMESTAMP, replaced_by = ?
+                WHERE token_hash = ?
+            """, (hash_refresh_token(new_token), token_hash))
+        return {
+            "status": "success",
+            "reason": "Token refreshed successfully",
+            "username": username,
+            "user_id": user_id,
+            "subscription_end_date": sub_end_date,
+            "no_days_to_subscription_end": days_left,
+            "role": role,
+            "refresh_token": new_token
+        }
+
+    try:
+        return await writer.submit(rotate)
+    except Exception as e:
+        return {"status": "failure", "reason": f"Database error: {str(e)}"}
+
+
+async def revoke_refresh_token(refresh_token: str):
+    """Log out: revoke the presented token and every token rotated from the same login."""
+    token_hash = hash_refresh_token(refresh_token)
+
+    def write(conn):
+        row = conn.execute("SELECT family_id FROM refresh_tokens WHERE token_hash = ?", (token_hash,)).fetchone()
+        if row:
+            _revoke_refresh_family(conn, row[0])
+
+    try:
+        await writer.submit(write)
+        return {"status": "success", "message": "Refresh token revoked"}
+    except Exception as e:
+        return {"status": "failure", "message": f"Database error: {str(e)}"}
+
+
 async def register(data: dict):
+    # pydantic and email-validator load on first use, not at startup
+    from models import RegisterModel
+    from pydantic import ValidationError
+
     try:
         validated = RegisterModel(**data)
     except ValidationError as e:
@@ -177,35 +597,39 @@ async def register(data: dict):
     role = validated.role if validated.role in ["admin", "user"] else "user"
 
     # Hash password
-    hashed_pw = bcrypt.hashpw(validated.password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    hashed_pw = await _hash_password(validated.password)
 
-    # Handle profile image if provided
+    # Handle profile image if provided; decode it before creating the user so a bad upload fails early
     profile_img = None
-    if hasattr(validated, 'profile_image') and validated.profile_image:
+    if data.get('profile_image'):
         try:
-            # Read the file content
-            profile_img = validated.profile_image.read()
+            profile_img = await _prepare_profile_image(read_upload(data['profile_image']))
         except Exception as e:
             return {"status": "failure", "error": f"Error reading profile image: {str(e)}"}
 
-    async with aiosqlite.connect(DB_NAME) as db:
-        try:
-            await db.execute("""
-                INSERT INTO users (
-                    user_id, role, username, password, device_id, phone_no, 
-                    sub_start_date, sub_end_date, calories_goal, proteins_goal, fats_goal, carbs_goal,
-                    gender, dob, height, weight, profile_img
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                user_id, role, validated.username, hashed_pw, validated.device_id, validated.phone_no,
-                validated.sub_start_date, validated.sub_end_date,
-                validated.calories_goal, validated.proteins_goal,
-                validated.fats_goal, validated.carbs_goal,
-                validated.gender, validated.dob, validated.height, validated.weight, profile_img
-            ))
-            await db.commit()
-        except Exception as e:
-            return {"status": "failure", "error": str(e)}
+    # The user and their image are written in one writer job, so a failed image leaves no user behind
+    def write(conn):
+        conn.execute("""
+            INSERT INTO users (
+                user_id, role, username, password, device_id, phone_no, 
+                sub_start_date, sub_end_date, calories_goal, proteins_goal, fats_goal, carbs_goal,
+                gender, dob, height, weight
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            user_id, role, validated.username, hashed_pw, validated.device_id, validated.phone_no,
+            validated.sub_start_date, validated.sub_end_date,
+            validated.calories_goal, validated.proteins_goal,
+            validated.fats_goal, validated.carbs_goal,
+            validated.gender, validated.dob, validated.height, validated.weight
+        ))
+        if profile_img:
+            store_profile_image(conn, user_id, **profile_img)
+
+    try:
+        await writer.submit(write)
+    except Exception as e:
+        return {"status": "failure", "error": str(e)}
+    invalidate_dashboard_statistics()
 
     days_left = None
     if validated.sub_end_date:
@@ -226,7 +650,132 @@ async def register(data: dict):
     }
 
 
+_USER_INSERT_COLUMNS = (
+    "user_id", "role", "username", "password", "device_id", "phone_no",
+    "sub_start_date", "sub_end_date", "calories_goal", "proteins_goal", "fats_goal", "carbs_goal",
+    "gender", "dob", "height", "weight",
+)
+
+# Usernames per "IN (...)" lookup, under the 999 bound variables SQLite allowed before 3.32
+USERNAME_LOOKUP_CHUNK = 500
+
+
+def _username_lookups(usernames):
+    """(sql, params) pairs that together select which of usernames are already registered."""
+    for start in range(0, len(usernames), USERNAME_LOOKUP_CHUNK):
+        chunk = usernames[start:start + USERNAME_LOOKUP_CHUNK]
+        yield f"SELECT username FROM users WHERE username IN ({', '.join('?' for _ in chunk)})", chunk
+
+
+async def bulk_register(rows):
+    """Register many members at once from [(row_no, fields)].
+
+    Every row is validated first; the passwords of the valid ones are hashed
+    across the hasher's worker processes and the users inserted in a single
+    transaction. Rows that fail are reported with their row number and do not
+    stop the rest.
+    """
+    from models import RegisterModel
+    from pydantic import ValidationError
+
+    started = time.perf_counter()
+    errors = []
+    valid = []
+    seen = set()
+    for row_no, data in rows:
+        if not isinstance(data, dict):
+            errors.append({"row": row_no, "username": None, "errors": ["Each member must be an object"]})
+            continue
+        try:
+            validated = RegisterModel(**data)
+        except ValidationError as e:
+            errors.append({
+                "row": row_no, "username": data.get("username"),
+                "errors": [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors(include_url=False)],
+            })
+            continue
+        if validated.username in seen:
+            errors.append({"row": row_no, "username": validated.username, "errors": ["Username appears earlier in the upload"]})
+            continue
+        seen.add(validated.username)
+        valid.append((row_no, validated))
+
+    # Skip hashing for usernames that are already taken
+    if valid:
+        usernames = [validated.username for _, validated in valid]
+        taken = set()
+        async with pool.acquire() as db:
+            for sql, params in _username_lookups(usernames):
+                async with db.execute(sql, params) as cursor:
+                    taken.update(row[0] for row in await cursor.fetchall())
+        for row_no, validated in valid:
+            if validated.username in taken:
+                errors.append({"row": row_no, "username": validated.username, "errors": ["Username already exists"]})
+        valid = [(row_no, validated) for row_no, validated in valid if validated.username not in taken]
+    validated_at = time.perf_counter()
+
+    hashes = await hasher.hash_many([validated.password for _, validated in valid])
+    hashed_at = time.perf_counter()
+
+    users = []
+    for (row_no, validated), hashed_pw in zip(valid, hashes):
+        users.append((row_no, (
+            uuid.uuid4().hex, validated.role, validated.username, hashed_pw, validated.device_id, validated.phone_no,
+            validated.sub_start_date, validated.sub_end_date,
+            validated.calories_goal, validated.proteins_goal,
+            validated.fats_goal, validated.carbs_goal,
+            validated.gender, validated.dob, validated.height, validated.weight,
+        )))
+
+    def write(conn):
+        # Usernames registered while the batch was hashing lose to the earlier registration
+        names = [params[2] for _, params in users]
+        raced = {row[0] for sql, params in _username_lookups(names) for row in conn.execute(sql, params)}
+        conn.executemany(
+            f"INSERT INTO users ({', '.join(_USER_INSERT_COLUMNS)}) VALUES ({', '.join('?' for _ in _USER_INSERT_COLUMNS)})",
+            [params for _, params in users if params[2] not in raced],
+        )
+        return raced
+
+    try:
+        raced = await writer.submit(write) if users else set()
+    except Exception as e:
+        return {"status": "failure", "error": f"Database error: {str(e)}"}
+    inserted_at = time.perf_counter()
+
+    created = []
+    for row_no, params in users:
+        if params[2] in raced:
+            errors.append({"row": row_no, "username": params[2], "errors": ["Username already exists"]})
+        else:
+            created.append({"row": row_no, "user_id": params[0], "username": params[2], "role": params[1]})
+    if created:
+        invalidate_dashboard_statistics()
+    errors.sort(key=lambda error: error["row"])
+
+    elapsed = inserted_at - started
+    return {
+        "status": "success",
+        "received": len(rows),
+        "created": len(created),
+        "failed": len(errors),
+        "users": created,
+        "errors": errors,
+        "timing": {
+            "validate_ms": round((validated_at - started) * 1000, 1),
+            "hash_ms": round((hashed_at - validated_at) * 1000, 1),
+            "insert_ms": round((inserted_at - hashed_at) * 1000, 1),
+            "total_ms": round(elapsed * 1000, 1),
+            "rows_per_second": round(len(rows) / elapsed, 1) if elapsed > 0 else None,
+            "hash_workers": hasher.workers,
+        },
+    }
+
+
 async def contact_admin(data: dict):
+    from models import ContactModel
+    from pydantic import ValidationError
+
     try:
         validated = ContactModel(**data)
     except ValidationError as e:
@@ -234,7 +783,7 @@ async def contact_admin(data: dict):
 
     registration_id = uuid.uuid4().hex
 
-    async with aiosqlite.connect(DB_NAME) as db:
+    async with pool.acquire() as db:
         try:
             await db.execute("""
                 INSERT INTO registrations (
@@ -259,7 +808,7 @@ async def contact_admin(data: dict):
 
 
 async def get_pending_registrations():
-    async with aiosqlite.connect(DB_NAME) as db:
+    async with pool.acquire() as db:
         try:
             async with db.execute("""
                 SELECT registration_id, username, phone_no, email_id, message, 
@@ -294,7 +843,11 @@ async def get_pending_registrations():
 
 
 async def approve_registration(registration_id: str):
-    async with aiosqlite.connect(DB_NAME) as db:
+    # Hash the temporary password before taking a connection, so no connection waits on bcrypt
+    temp_password = os.getenv("NEW_USER_PASSWORD", "pubfitnessstudio")
+    hashed_pw = await _hash_password(temp_password)
+
+    async with pool.acquire() as db:
         try:
             # First, get the registration details
             async with db.execute("""
@@ -317,12 +870,6 @@ async def approve_registration(registration_id: str):
                     if user_exists > 0:
                         return {"status": "failure", "message": "Username already exists in users table"}
                 
-                # Generate a random password for the new user
-                temp_password = os.getenv("NEW_USER_PASSWORD", "pubfitnessstudio")
-                
-                # Hash the password
-                hashed_pw = bcrypt.hashpw(temp_password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-                
                 # Create user account with current date as subscription start and end dates
                 user_id = uuid.uuid4().hex
                 current_date = datetime.now().strftime("%Y-%m-%d")
@@ -345,6 +892,7 @@ async def approve_registration(registration_id: str):
                 """, (registration_id,))
                 
                 await db.commit()
+                invalidate_dashboard_statistics()
                 
                 return {
                     "status": "success", 
@@ -359,7 +907,7 @@ async def approve_registration(registration_id: str):
 
 
 async def reject_registration(registration_id: str, reason: str):
-    async with aiosqlite.connect(DB_NAME) as db:
+    async with pool.acquire() as db:
         try:
             # Update status to rejected with reason
             await db.execute("""
@@ -374,80 +922,291 @@ async def reject_registration(registration_id: str, reason: str):
             return {"status": "failure", "message": f"Database error: {str(e)}"}
 
 
+REGISTRATION_BATCH_MAX_IDS = 500
+
+
+def _pending_registrations(conn, registration_ids):
+    """Split ids into {id: row} for pending requests and {id: message} for the rest."""
+    placeholders = ", ".join("?" for _ in registration_ids)
+    rows = {
+        row[0]: row for row in conn.execute(f"""
+            SELECT registration_id, status, username, phone_no, preferred_role, device_id,
+                   gender, dob, height, weight
+            FROM registrations
+            WHERE registration_id IN ({placeholders})
+        """, registration_ids)
+    }
+    pending, failed = {}, {}
+    for registration_id in registration_ids:
+        row = rows.get(registration_id)
+        if row is None:
+            failed[registration_id] = "Registration request not found"
+        elif row[1] != "pending":
+            failed[registration_id] = f"Registration request is already {row[1]}"
+        else:
+            pending[registration_id] = row
+    return pending, failed
+
+
+def _batch_outcomes(registration_ids, done, failed, success_message):
+    results = [
+        {"registration_id": registration_id, "status": "success", "message": success_message, **done[registration_id]}
+        if registration_id in done else
+        {"registration_id": registration_id, "status": "failure", "message": failed[registration_id]}
+        for registration_id in registration_ids
+    ]
+    return {"status": "success", "processed": len(done), "failed": len(failed), "results": results}
+
+
+async def approve_registrations(registration_ids):
+    """Approve many registration requests in one transaction, reporting an outcome per id.
+
+    The shared temporary password is hashed once for the whole batch, and
+    taken usernames are found with a single query instead of one per request.
+    """
+    registration_ids = list(dict.fromkeys(registration_ids))
+    if not registration_ids:
+        return {"status": "success", "processed": 0, "failed": 0, "results": []}
+
+    temp_password = os.getenv("NEW_USER_PASSWORD", "pubfitnessstudio")
+    hashed_pw = await _hash_password(temp_password)
+    current_date = datetime.now().strftime("%Y-%m-%d")
+
+    def write(conn):
+        pending, failed = _pending_registrations(conn, registration_ids)
+
+        usernames = list({row[2] for row in pending.values()})
+        taken = {row[0] for sql, params in _username_lookups(usernames) for row in conn.execute(sql, params)}
+
+        users, done = [], {}
+        for registration_id, row in pending.items():
+            _, _, username, phone_no, preferred_role, device_id, gender, dob, height, weight = row
+            if username in taken:
+                failed[registration_id] = "Username already exists in users table"
+                continue
+            # Two requests for the same username: the first in the batch wins
+            taken.add(username)
+            user_id = uuid.uuid4().hex
+            users.append((
+                user_id, preferred_role, username, hashed_pw, phone_no, device_id,
+                gender, dob, height, weight, current_date, current_date
+            ))
+            done[registration_id] = {"user_id": user_id, "username": username}
+
+        conn.executemany("""
+            INSERT INTO users (
+                user_id, role, username, password, phone_no, device_id,
+                gender, dob, height, weight, sub_start_date, sub_end_date
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, users)
+        conn.executemany("""
+            UPDATE registrations
+            SET status = 'approved', processed_at = CURRENT_TIMESTAMP
+            WHERE registration_id = ?
+        """, [(registration_id,) for registration_id in done])
+        return done, failed
+
+    try:
+        done, failed = await writer.submit(write)
+    except Exception as e:
+        return {"status": "failure", "message": f"Database error: {str(e)}"}
+    if done:
+        invalidate_dashboard_statistics()
+
+    result = _batch_outcomes(registration_ids, done, failed, "Registration approved and user account created")
+    result["temp_password"] = temp_password
+    return result
+
+
+async def reject_registrations(registration_ids, reason: str):
+    """Reject many pending registration requests in one transaction, reporting an outcome per id."""
+    registration_ids = list(dict.fromkeys(registration_ids))
+    if not registration_ids:
+        return {"status": "success", "processed": 0, "failed": 0, "results": []}
+
+    def write(conn):
+        pending, failed = _pending_registrations(conn, registration_ids)
+        conn.executemany("""
+            UPDATE registrations
+            SET status = 'rejected', processed_at = CURRENT_TIMESTAMP, notes = ?
+            WHERE registration_id = ?
+        """, [(reason, registration_id) for registration_id in pending])
+        return {registration_id: {} for registration_id in pending}, failed
+
+    try:
+        done, failed = await writer.submit(write)
+    except Exception as e:
+        return {"status": "failure", "message": f"Database error: {str(e)}"}
+    return _batch_outcomes(registration_ids, done, failed, "Registration request rejected")
+
+
+# Cached dashboard counts. Cleared by writes that change users or subscriptions and
+# keyed on the UTC day, which is what SQLite's date('now') uses
+_dashboard_cache = {"generation": 0, "day": None, "stats": None}
+
+
+def invalidate_dashboard_statistics():
+    _dashboard_cache["generation"] += 1
+    _dashboard_cache["stats"] = None
+
+
 async def get_dashboard_statistics():
-    async with aiosqlite.connect(DB_NAME) as db:
+    today = datetime.utcnow().date()
+    cached = _dashboard_cache["stats"]
+    if cached is not None and _dashboard_cache["day"] == today:
+        return dict(cached)
+
+    generation = _dashboard_cache["generation"]
+    async with pool.acquire() as db:
         try:
-            # Get total users
-            async with db.execute("SELECT COUNT(*) FROM users") as cursor:
-                total_users = (await cursor.fetchone())[0]
-            
-            # Get active users (subscription not expired)
-            async with db.execute("""
-                SELECT COUNT(*) FROM users 
-                WHERE sub_end_date IS NOT NULL AND sub_end_date > date('now')
-            """) as cursor:
-                active_users = (await cursor.fetchone())[0]
-            
-            # Get users expiring in 7 days
-            async with db.execute("""
-                SELECT COUNT(*) FROM users 
-                WHERE sub_end_date IS NOT NULL 
-                AND sub_end_date BETWEEN date('now') AND date('now', '+7 days')
-            """) as cursor:
-                expiring_users = (await cursor.fetchone())[0]
-            
-            # Get expired users (subscription expired)
-            async with db.execute("""
-                SELECT COUNT(*) FROM users 
-                WHERE sub_end_date < date('now')
-            """) as cursor:
-                expired_users = (await cursor.fetchone())[0]
-            
-            return {
-                "status": "success",
-                "total_users": total_users,
-                "active_users": active_users,
-                "expiring_users": expiring_users,
-                "expired_users": expired_users
-            }
+            async with db.execute(DASHBOARD_STATS_SQL) as cursor:
+                total_users, active_users, expiring_users, expired_users = await cursor.fetchone()
         except Exception as e:
             return {"status": "failure", "message": f"Database error: {str(e)}"}
 
+    stats = {
+        "status": "success",
+        "total_users": total_users,
+        "active_users": active_users,
+        "expiring_users": expiring_users,
+        "expired_users": expired_users
+    }
+    # Skip caching if a write invalidated the counts while the query was running
+    if _dashboard_cache["generation"] == generation:
+        _dashboard_cache.update(day=today, stats=stats)
+    return dict(stats)
+
+
+def get_pool_statistics():
+    return {"status": "success", "pool": pool.stats(), "writer": writer.stats(), "password_hasher": hasher.stats()}
+
+
+def get_query_statistics(top: int = 20, sort: str = "total"):
+    try:
+        return {"status": "success", **query_log.stats(top, sort)}
+    except ValueError as e:
+        return {"status": "failure", "message": str(e)}
+
+
+# Subscription filters shared by the dashboard counts and the user listing
+USER_STATUS_FILTERS = {
+    "active": "u.sub_end_date > date('now')",
+    "expiring": "u.sub_end_date BETWEEN date('now') AND date('now', '+7 days')",
+    "expired": "u.sub_end_date < date('now')",
+}
+USER_SORT_KEYS = list(USER_SORT_INDEXES)
+# Position of each sort key in the listing row, used to build the next cursor
+_USER_SORT_COLUMNS = {"username": 1, "phone_no": 2, "sub_start_date": 4, "sub_end_date": 5}
+USERS_PAGE_SIZE = 50
+USERS_MAX_PAGE_SIZE = 200
+
+
+def encode_users_cursor(sort_value, user_id: str) -> str:
+    raw = json.dumps([sort_value, user_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_users_cursor(cursor: str):
+    sort_value, user_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    return sort_value, user_id
+
 
-async def get_all_users():
-    async with aiosqlite.connect(DB_NAME) as db:
+async def get_all_users(limit: int = None, cursor: str = None, status: str = None, sort: str = "username", prefix: str = None):
+    """List users ordered by ``sort``, one keyset page at a time when ``limit`` is given.
+
+    ``cursor`` is the ``next_cursor`` of the previous page. ``total`` counts every user
+    matching ``status`` and ``prefix``, not just the returned page.
+    """
+    if status in (None, "", "total", "all"):
+        status = None
+    if status is not None and status not in USER_STATUS_FILTERS:
+        return {"status": "failure", "message": f"Invalid status filter: {status}"}
+    if sort not in USER_SORT_KEYS:
+        return {"status": "failure", "message": f"Invalid sort key: {sort}"}
+
+    where, params = [], []
+    if status:
+        where.append(USER_STATUS_FILTERS[status])
+    if prefix:
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        where.append("u.username LIKE ? ESCAPE '\\'")
+        params.append(escaped + "%")
+
+    # Keyset conditions, tried in order until the page is full
+    segments = [([], [])]
+    if cursor:
         try:
-            async with db.execute("""
-                SELECT user_id, username, phone_no, profile_img, 
-                       sub_start_date, sub_end_date, role
-                FROM users 
-                ORDER BY username
-            """) as cursor:
-                rows = await cursor.fetchall()
-                
-                users = []
-                for row in rows:
-                    profile_img = None
-                    if row[3]:  # If profile_img exists
-                        import base64
-                        profile_img = base64.b64encode(row[3]).decode('utf-8')
-                    
-                    users.append({
-                        "user_id": row[0],
-                        "username": row[1],
-                        "phone_no": row[2],
-                        "profile_img": profile_img,
-                        "sub_start_date": row[4],
-                        "sub_end_date": row[5],
-                        "role": row[6]
-                    })
-                return {"status": "success", "users": users}
-        except Exception as e:
-            return {"status": "failure", "message": f"Database error: {str(e)}"}
+            after_value, after_id = decode_users_cursor(cursor)
+        except Exception:
+            return {"status": "failure", "message": "Invalid cursor"}
+        if after_value is None:
+            # NULLs sort first: finish the NULL rows, then carry on into the rest. Each part
+            # seeks on the (sort, user_id) index, where OR-ing them would scan it
+            segments = [
+                ([f"u.{sort} IS NULL AND u.user_id > ?"], [after_id]),
+                ([f"u.{sort} IS NOT NULL"], []),
+            ]
+        else:
+            segments = [([f"(u.{sort}, u.user_id) > (?, ?)"], [after_value, after_id])]
+
+    if limit is not None:
+        limit = max(1, min(int(limit), USERS_MAX_PAGE_SIZE))
+
+    try:
+        rows = []
+        async with pool.acquire() as db:
+            for conditions, condition_params in segments:
+                sql = _users_page_sql(sort, where + conditions)
+                page_params = params + condition_params
+                if limit is not None:
+                    # One extra row tells us whether another page exists
+                    sql += " LIMIT ?"
+                    page_params.append(limit + 1 - len(rows))
+                async with db.execute(sql, page_params) as cur:
+                    rows.extend(await cur.fetchall())
+                if limit is not None and len(rows) > limit:
+                    break
+
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_users_cursor(last[_USER_SORT_COLUMNS[sort]], last[0])
+
+        users = []
+        for row in rows:
+            users.append({
+                "user_id": row[0],
+                "username": row[1],
+                "phone_no": row[2],
+                "profile_img": profile_image_url(row[0], row[3], size=64),
+                "sub_start_date": row[4],
+                "sub_end_date": row[5],
+                "role": row[6]
+            })
+
+        total = None
+        if limit is None:
+            total = len(users)
+        elif not prefix:
+            # Same counts the dashboard shows, usually served from its cache
+            stats = await get_dashboard_statistics()
+            total = stats.get(f"{status}_users" if status else "total_users")
+        if total is None:
+            async with pool.acquire() as db:
+                async with db.execute(
+                    f"SELECT COUNT(*) FROM users u {'WHERE ' + ' AND '.join(where) if where else ''}",
+                    params
+                ) as cur:
+                    total = (await cur.fetchone())[0]
+
+        return {"status": "success", "users": users, "total": total, "next_cursor": next_cursor}
+    except Exception as e:
+        return {"status": "failure", "message": f"Database error: {str(e)}"}
 
 
 async def get_user_goals_from_db(user_id: str):
-    async with aiosqlite.connect(DB_NAME) as db:
+    async with pool.acquire() as db:
         try:
             async with db.execute("""
                 SELECT calories_goal, proteins_goal, fats_goal, carbs_goal
@@ -459,10 +1218,8 @@ async def get_user_goals_from_db(user_id: str):
                     return {
                         "status": "success",
                         "goals": {
-                            "calories_goal": row[0] or 2000,
-                            "proteins_goal": row[1] or 150,
-                            "fats_goal": row[2] or 65,
-                            "carbs_goal": row[3] or 250
+                            name: value or DEFAULT_GOALS[name]
+                            for name, value in zip(("calories_goal", "proteins_goal", "fats_goal", "carbs_goal"), row)
                         }
                     }
                 else:
@@ -471,8 +1228,43 @@ async def get_user_goals_from_db(user_id: str):
             return {"status": "failure", "message": f"Database error: {str(e)}"}
 
 
+async def get_resource_etag(user_id: str, resource: str) -> str:
+    """Current ETag of a user's goals, profile or nutrition day: one primary-key lookup.
+
+    Views read it before loading the resource, so a concurrent write can only
+    make the tag older than the body, never newer.
+    """
+    async with pool.acquire() as db:
+        async with db.execute(VERSION_SQL, (user_id, resource)) as cursor:
+            row = await cursor.fetchone()
+    # Meal items carry nutrition values from the foods table, which is reseeded at startup
+    revision = get_food_index().revision if resource.startswith(nutrition_day("")) else None
+    return resource_etag(user_id, resource, row[0] if row else 0, revision)
+
+
+_food_index = None
+_food_index_lock = threading.Lock()
+
+
+def get_food_index():
+    """Search index over the foods table, built on first use."""
+    global _food_index
+    with _food_index_lock:
+        if _food_index is None:
+            conn = sqlite3.connect(DB_NAME)
+            try:
+                _food_index = FoodIndex.from_db(conn)
+            finally:
+                conn.close()
+        return _food_index
+
+
+def search_foods(query: str, limit: int = FOOD_SEARCH_LIMIT):
+    return get_food_index().search(query, min(limit, FOOD_SEARCH_MAX_LIMIT))
+
+
 async def get_nutrition_data_from_db(user_id: str, date: str):
-    async with aiosqlite.connect(DB_NAME) as db:
+    async with pool.acquire() as db:
         try:
             async with db.execute("""
                 SELECT breakfast, lunch, snacks, dinner, calories, carbs, proteins, fats, water
@@ -480,85 +1272,247 @@ async def get_nutrition_data_from_db(user_id: str, date: str):
                 WHERE user_id = ? AND date = ?
             """, (user_id, date)) as cursor:
                 row = await cursor.fetchone()
+
+            async with db.execute(MEAL_ITEMS_SQL, (user_id, date)) as cursor:
+                items = [meal_item_from_row(item) for item in await cursor.fetchall()]
                 
-                if row:
-                    return {
-                        "status": "success",
-                        "nutrition_data": {
-                            "breakfast": row[0] or "",
-                            "lunch": row[1] or "",
-                            "snacks": row[2] or "",
-                            "dinner": row[3] or "",
-                            "calories": row[4] or 0,
-                            "carbs": row[5] or 0,
-                            "proteins": row[6] or 0,
-                            "fats": row[7] or 0,
-                            "water": row[8] or 0
-                        }
+            if row:
+                return {
+                    "status": "success",
+                    "nutrition_data": {
+                        "breakfast": row[0] or "",
+                        "lunch": row[1] or "",
+                        "snacks": row[2] or "",
+                        "dinner": row[3] or "",
+                        "calories": row[4] or 0,
+                        "carbs": row[5] or 0,
+                        "proteins": row[6] or 0,
+                        "fats": row[7] or 0,
+                        "water": row[8] or 0,
+                        "items": items
                     }
-                else:
-                    return {
-                        "status": "success",
-                        "nutrition_data": {
-                            "breakfast": "",
-                            "lunch": "",
-                            "snacks": "",
-                            "dinner": "",
-                            "calories": 0,
-                            "carbs": 0,
-                            "proteins": 0,
-                            "fats": 0,
-                            "water": 0
-                        }
+                }
+            else:
+                return {
+                    "status": "success",
+                    "nutrition_data": {
+                        "breakfast": "",
+                        "lunch": "",
+                        "snacks": "",
+                        "dinner": "",
+                        "calories": 0,
+                        "carbs": 0,
+                        "proteins": 0,
+                        "fats": 0,
+                        "water": 0,
+                        "items": items
                     }
+                }
         except Exception as e:
             return {"status": "failure", "message": f"Database error: {str(e)}"}
 
 
-async def save_nutrition_data_to_db(user_id: str, data: dict):
-    async with aiosqlite.connect(DB_NAME) as db:
+def _nutrition_summary(days_logged, sums, within, goals):
+    totals = dict(zip(("calories", "proteins", "fats", "carbs", "water"), (round(value or 0, 2) for value in sums)))
+    averages = {name: round(value / days_logged, 2) if days_logged else 0 for name, value in totals.items()}
+    adherence = {}
+    for (name, _), days_within, goal in zip(_GOAL_NUTRIENTS, within, goals):
+        adherence[name] = {
+            "percent_of_goal": round(averages[name] * 100 / goal, 1) if goal else None,
+            "days_within_goal": days_within or 0,
+        }
+    return {"days_logged": days_logged, "totals": totals, "averages": averages, "adherence": adherence}
+
+
+async def get_nutrition_range_from_db(user_id: str, date_from: str, date_to: str, bucket: str = "day"):
+    """Totals, averages and goal adherence per day, week or month over a date range, in one query."""
+    if bucket not in NUTRITION_BUCKETS:
+        return {"status": "failure", "message": f"bucket must be one of: {', '.join(NUTRITION_BUCKETS)}"}
+    try:
+        start = datetime.strptime(date_from, "%Y-%m-%d").date()
+        end = datetime.strptime(date_to, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return {"status": "failure", "message": "from and to must be dates in YYYY-MM-DD format"}
+    if start > end:
+        return {"status": "failure", "message": "from must not be after to"}
+    if (end - start).days >= NUTRITION_RANGE_MAX_DAYS:
+        return {"status": "failure", "message": f"Date range is limited to {NUTRITION_RANGE_MAX_DAYS} days"}
+
+    async with pool.acquire() as db:
         try:
-            # Insert or update nutrition data with all nutrition fields
-            await db.execute("""
-                INSERT OR REPLACE INTO nutrition_data 
-                (user_id, date, breakfast, lunch, snacks, dinner, calories, carbs, proteins, fats, water)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                user_id,
-                data.get('date'),
-                data.get('breakfast', ''),
-                data.get('lunch', ''),
-                data.get('snacks', ''),
-                data.get('dinner', ''),
-                data.get('calories', 0),
-                data.get('carbs', 0),
-                data.get('proteins', 0),
-                data.get('fats', 0),
-                data.get('water', 0)
-            ))
-            
-            await db.commit()
-            return {"status": "success", "message": "Nutrition data saved successfully"}
+            async with db.execute(NUTRITION_RANGE_SQL[bucket], (user_id, start.isoformat(), end.isoformat())) as cursor:
+                rows = await cursor.fetchall()
+        except Exception as e:
+            return {"status": "failure", "message": f"Database error: {str(e)}"}
+
+    if not rows:
+        return {"status": "failure", "message": "User not found"}
+
+    goals = rows[0][11:15]
+    periods = []
+    total_days, total_sums, total_within = 0, [0.0] * 5, [0] * 4
+    for row in rows:
+        period, days_logged, sums, within = row[0], row[1], row[2:7], row[7:11]
+        if period is None:
+            # The empty group from a range without any logs
+            continue
+        periods.append({"period": period, **_nutrition_summary(days_logged, sums, within, goals)})
+        total_days += days_logged
+        total_sums = [a + (b or 0) for a, b in zip(total_sums, sums)]
+        total_within = [a + (b or 0) for a, b in zip(total_within, within)]
+
+    return {
+        "status": "success",
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "bucket": bucket,
+        "goals": dict(zip((goal for _, goal in _GOAL_NUTRIENTS), goals)),
+        "periods": periods,
+        "summary": _nutrition_summary(total_days, total_sums, total_within, goals),
+    }
+
+
+NUTRITION_TRENDS_MAX_PERIODS = 104
+
+
+async def get_nutrition_trends_from_db(user_id: str, bucket: str = "week", periods: int = 12):
+    """Averages per logged day for the last `periods` weeks or months, read from the rollup tables."""
+    if bucket not in ROLLUPS:
+        return {"status": "failure", "message": f"bucket must be one of: {', '.join(ROLLUPS)}"}
+    if not 1 <= periods <= NUTRITION_TRENDS_MAX_PERIODS:
+        return {"status": "failure", "message": f"periods must be between 1 and {NUTRITION_TRENDS_MAX_PERIODS}"}
+
+    table = ROLLUPS[bucket][0]
+    shift = f"-{periods - 1} months" if bucket == "month" else f"-{7 * (periods - 1)} days"
+    async with pool.acquire() as db:
+        try:
+            async with db.execute(f"""
+                SELECT period, days_logged, {", ".join(ROLLUP_COLUMNS)}
+                FROM {table}
+                WHERE user_id = ? AND period >= {period_sql(bucket, "date('now', 'start of day', ?)")}
+                ORDER BY period
+            """, (user_id, shift)) as cursor:
+                rows = await cursor.fetchall()
         except Exception as e:
             return {"status": "failure", "message": f"Database error: {str(e)}"}
 
+    return {
+        "status": "success",
+        "bucket": bucket,
+        "periods": [
+            {
+                "period": row[0],
+                "days_logged": row[1],
+                "averages": {name: round(value / row[1], 2) for name, value in zip(ROLLUP_COLUMNS, row[2:])},
+            }
+            for row in rows
+        ],
+    }
+
+
+async def save_nutrition_data_to_db(user_id: str, data: dict):
+    from models import NutritionLogModel
+    from pydantic import ValidationError
+
+    try:
+        validated = NutritionLogModel(**data)
+    except ValidationError as e:
+        return {"status": "failure", "message": "Invalid nutrition data", "error": e.errors(include_url=False)}
+
+    date = validated.date.isoformat()
+    items = [(item.meal, item.food_id, item.servings) for item in validated.items]
+
+    def write(conn):
+        # The posted items replace the day; totals come from the foods table
+        old = day_totals(conn, user_id, date)
+        replace_meal_items(conn, user_id, date, items, validated.water)
+        new = day_totals(conn, user_id, date)
+        # Same transaction: the week and month rollups never disagree with the day
+        apply_day_change(conn, user_id, date, old, new)
+        bump_versions(conn, user_id, [nutrition_day(date)])
+        return new
+
+    try:
+        totals = await writer.submit(write)
+        return {
+            "status": "success",
+            "message": "Nutrition data saved successfully",
+            "totals": dict(zip(ROLLUP_COLUMNS, totals))
+        }
+    except ValueError as e:
+        return {"status": "failure", "message": str(e)}
+    except Exception as e:
+        return {"status": "failure", "message": f"Database error: {str(e)}"}
+
+
+NUTRITION_IMPORT_CHUNK = int(os.getenv("NUTRITION_IMPORT_CHUNK", "500"))
+
+
+async def import_nutrition_chunk(user_id: str, days: list):
+    """Write one batch of imported days in a single transaction; returns the [(date, error)] skipped."""
+    return await writer.submit(lambda conn: import_nutrition_days(conn, user_id, days))
+
+
+def iter_nutrition_export(user_id: str, date_from: str = None, date_to: str = None, include_items: bool = True,
+                          batch_size: int = 500):
+    """Yield a user's logged days in date order without loading the history into memory.
+
+    Runs on its own connection so a slow download never holds a pooled one.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    try:
+        for name, value in DB_PRAGMAS.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        # One read snapshot for both cursors
+        conn.execute("BEGIN")
+        bounds = (user_id, date_from or "0000-01-01", date_to or "9999-12-31")
+        days = conn.execute(f"""
+            SELECT {", ".join(EXPORT_FIELDS)} FROM nutrition_data
+            WHERE user_id = ? AND date BETWEEN ? AND ?
+            ORDER BY date
+        """, bounds)
+        items = conn.execute("""
+            SELECT m.date, m.meal, m.food_id, f.food_name, m.servings
+            FROM meal_items m
+            JOIN foods f ON f.food_id = m.food_id
+            WHERE m.user_id = ? AND m.date BETWEEN ? AND ?
+            ORDER BY m.date, m.item_id
+        """, bounds) if include_items else None
+        pending = next(items, None) if items else None
+
+        while True:
+            rows = days.fetchmany(batch_size)
+            if not rows:
+                return
+            for row in rows:
+                day = dict(zip(EXPORT_FIELDS, row))
+                # Both cursors are in date order: merge the day's items in as they come
+                day_items = []
+                while pending is not None and pending[0] <= day["date"]:
+                    if pending[0] == day["date"]:
+                        day_items.append({"meal": pending[1], "food_id": pending[2], "food_name": pending[3], "servings": pending[4]})
+                    pending = next(items, None)
+                if day_items:
+                    day["items"] = day_items
+                yield day
+    finally:
+        conn.close()
+
 
 async def get_user_profile_from_db(user_id: str):
-    async with aiosqlite.connect(DB_NAME) as db:
+    async with pool.acquire() as db:
         try:
             async with db.execute("""
-                SELECT user_id, username, phone_no, role, profile_img, gender, dob, height, weight,
-                       calories_goal, proteins_goal, fats_goal, carbs_goal
-                FROM users 
-                WHERE user_id = ?
+                SELECT u.user_id, u.username, u.phone_no, u.role, p.content_hash, u.gender, u.dob, u.height, u.weight,
+                       u.calories_goal, u.proteins_goal, u.fats_goal, u.carbs_goal
+                FROM users u
+                LEFT JOIN profile_images p ON p.user_id = u.user_id
+                WHERE u.user_id = ?
             """, (user_id,)) as cursor:
                 row = await cursor.fetchone()
                 
                 if row:
-                    profile_img = None
-                    if row[4]:  # If profile_img exists
-                        import base64
-                        profile_img = base64.b64encode(row[4]).decode('utf-8')
+                    profile_img = profile_image_url(row[0], row[4], size=256)
                     
                     return {
                         "status": "success",
@@ -585,133 +1539,201 @@ async def get_user_profile_from_db(user_id: str):
 
 
 async def update_user_profile_to_db(user_id: str, data: dict):
-    async with aiosqlite.connect(DB_NAME) as db:
-        try:
-            await db.execute("""
-                UPDATE users 
-                SET username = ?, phone_no = ?, gender = ?, dob = ?, height = ?, weight = ?
-                WHERE user_id = ?
-            """, (
-                data.get('username'),
-                data.get('phone_no'),
-                data.get('gender'),
-                data.get('dob'),
-                data.get('height'),
-                data.get('weight'),
-                user_id
-            ))
-            
-            await db.commit()
-            return {"status": "success", "message": "Profile updated successfully"}
-        except Exception as e:
-            return {"status": "failure", "message": f"Database error: {str(e)}"}
+    def write(conn):
+        conn.execute("""
+            UPDATE users 
+            SET username = ?, phone_no = ?, gender = ?, dob = ?, height = ?, weight = ?
+            WHERE user_id = ?
+        """, (
+            data.get('username'),
+            data.get('phone_no'),
+            data.get('gender'),
+            data.get('dob'),
+            data.get('height'),
+            data.get('weight'),
+            user_id
+        ))
+        bump_versions(conn, user_id, [PROFILE])
+
+    try:
+        await writer.submit(write)
+        return {"status": "success", "message": "Profile updated successfully"}
+    except Exception as e:
+        return {"status": "failure", "message": f"Database error: {str(e)}"}
 
 
 async def update_user_goals_to_db(user_id: str, data: dict):
-    async with aiosqlite.connect(DB_NAME) as db:
-        try:
-            await db.execute("""
-                UPDATE users 
-                SET calories_goal = ?, proteins_goal = ?, fats_goal = ?, carbs_goal = ?
-                WHERE user_id = ?
-            """, (
-                data.get('calories_goal'),
-                data.get('proteins_goal'),
-                data.get('fats_goal'),
-                data.get('carbs_goal'),
-                user_id
-            ))
-            
-            await db.commit()
-            return {"status": "success", "message": "Nutrition goals updated successfully"}
-        except Exception as e:
-            return {"status": "failure", "message": f"Database error: {str(e)}"}
+    def write(conn):
+        conn.execute("""
+            UPDATE users 
+            SET calories_goal = ?, proteins_goal = ?, fats_goal = ?, carbs_goal = ?
+            WHERE user_id = ?
+        """, (
+            data.get('calories_goal'),
+            data.get('proteins_goal'),
+            data.get('fats_goal'),
+            data.get('carbs_goal'),
+            user_id
+        ))
+        # The profile response carries the goals too
+        bump_versions(conn, user_id, [GOALS, PROFILE])
+
+    try:
+        await writer.submit(write)
+        return {"status": "success", "message": "Nutrition goals updated successfully"}
+    except Exception as e:
+        return {"status": "failure", "message": f"Database error: {str(e)}"}
+
+
+async def _prepare_profile_image(file_content: bytes):
+    """Decode an upload once in the image worker pool, unless its thumbnails already exist."""
+    async with pool.acquire() as db:
+        async with db.execute(
+            "SELECT COUNT(*) FROM image_variants WHERE source_hash = ?", (content_hash(file_content),)
+        ) as cursor:
+            known_variants = (await cursor.fetchone())[0]
+    if known_variants == len(VARIANT_SIZES):
+        return {"data": file_content}
+
+    image = await process_image(file_content)
+    return {"data": file_content, "mime_type": image["mime_type"], "variants": image["variants"]}
 
 
 async def update_profile_image_to_db(user_id: str, file):
-    async with aiosqlite.connect(DB_NAME) as db:
+    try:
+        profile_img = await _prepare_profile_image(read_upload(file))
+    except ValueError as e:
+        return {"status": "failure", "message": str(e)}
+
+    try:
+        def write(conn):
+            image_hash = store_profile_image(conn, user_id, **profile_img)
+            bump_versions(conn, user_id, [PROFILE])
+            return image_hash
+
+        image_hash = await writer.submit(write)
+        return {
+            "status": "success",
+            "message": "Profile image updated successfully",
+            "profile_img": profile_image_url(user_id, image_hash, size=256)
+        }
+    except Exception as e:
+        return {"status": "failure", "message": f"Database error: {str(e)}"}
+
+
+async def get_profile_image_from_db(user_id: str, known_hashes=(), size: int = None):
+    async with pool.acquire() as db:
         try:
-            # Read the file content
-            file_content = file.read()
-            
-            await db.execute("""
-                UPDATE users 
-                SET profile_img = ?
-                WHERE user_id = ?
-            """, (file_content, user_id))
-            
-            await db.commit()
-            return {"status": "success", "message": "Profile image updated successfully"}
+            # Serve the requested thumbnail, falling back to the original if it has none
+            async with db.execute("""
+                SELECT p.content_hash, b.content_hash, b.mime_type
+                FROM profile_images p
+                LEFT JOIN image_variants v ON v.source_hash = p.content_hash AND v.variant = ?
+                JOIN image_blobs b ON b.content_hash = COALESCE(v.variant_hash, p.content_hash)
+                WHERE p.user_id = ?
+            """, (str(size) if size else None, user_id)) as cursor:
+                row = await cursor.fetchone()
+            if not row:
+                return {"status": "failure", "message": "Image not found"}
+
+            source_hash, image_hash, mime_type = row
+            # The client already holds this version: skip reading the blob
+            if image_hash in known_hashes:
+                return {"status": "not_modified", "source_hash": source_hash, "content_hash": image_hash}
+
+            async with db.execute("SELECT data FROM image_blobs WHERE content_hash = ?", (image_hash,)) as cursor:
+                data = (await cursor.fetchone())[0]
+            return {
+                "status": "success",
+                "source_hash": source_hash,
+                "content_hash": image_hash,
+                "mime_type": mime_type,
+                "data": data
+            }
         except Exception as e:
             return {"status": "failure", "message": f"Database error: {str(e)}"}
 
 
 async def update_user_password_in_db(user_id: str, data: dict):
-    async with aiosqlite.connect(DB_NAME) as db:
-        try:
-            current_password = data.get('current_password')
-            new_password = data.get('new_password')
-            
-            if not current_password or not new_password:
-                return {"status": "failure", "message": "Current password and new password are required"}
-            
-            # First, verify the current password
+    current_password = data.get('current_password')
+    new_password = data.get('new_password')
+
+    if not current_password or not new_password:
+        return {"status": "failure", "message": "Current password and new password are required"}
+
+    try:
+        async with pool.acquire() as db:
             async with db.execute("""
                 SELECT password FROM users WHERE user_id = ?
             """, (user_id,)) as cursor:
                 row = await cursor.fetchone()
-                
-                if not row:
-                    return {"status": "failure", "message": "User not found"}
-                
-                stored_password = row[0]
-                
-                # Verify current password with bcrypt
-                if not bcrypt.checkpw(current_password.encode("utf-8"), stored_password.encode("utf-8")):
-                    return {"status": "failure", "message": "Current password is incorrect"}
-            
-            # Hash the new password
-            hashed_new_password = bcrypt.hashpw(new_password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-            
-            # Update the password
-            await db.execute("""
-                UPDATE users 
-                SET password = ?
-                WHERE user_id = ?
-            """, (hashed_new_password, user_id))
-            
-            await db.commit()
-            return {"status": "success", "message": "Password updated successfully"}
-            
-        except Exception as e:
-            return {"status": "failure", "message": f"Database error: {str(e)}"}
+    except Exception as e:
+        return {"status": "failure", "message": f"Database error: {str(e)}"}
+
+    if not row:
+        return {"status": "failure", "message": "User not found"}
+
+    stored_password = row[0]
+
+    # Check and hash with the connection released; bcrypt would otherwise hold it for its whole run
+    if not await _check_password(current_password, stored_password):
+        return {"status": "failure", "message": "Current password is incorrect"}
+
+    hashed_new_password = await _hash_password(new_password)
+
+    def write(conn):
+        # Only replace the hash that was checked, in case the password changed meanwhile
+        updated = conn.execute("""
+            UPDATE users 
+            SET password = ?
+            WHERE user_id = ? AND password = ?
+        """, (hashed_new_password, user_id, stored_password)).rowcount
+        if updated:
+            # Sessions started with the old password must log in again
+            conn.execute("""
+                UPDATE refresh_tokens SET revoked_at = CURRENT_TIMESTAMP
+                WHERE user_id = ? AND revoked_at IS NULL
+            """, (user_id,))
+        return updated
+
+    try:
+        if not await writer.submit(write):
+            return {"status": "failure", "message": "Password was changed meanwhile, please try again"}
+        return {"status": "success", "message": "Password updated successfully"}
+    except Exception as e:
+        return {"status": "failure", "message": f"Database error: {str(e)}"}
 
 
 async def update_user_details_in_db(data: dict):
-    async with aiosqlite.connect(DB_NAME) as db:
+    user_id = data.get('user_id')
+    reset_password = data.get('reset_password', False)
+    sub_end_date = data.get('sub_end_date')
+    device_id = data.get('device_id')
+
+    # Generate new password if reset is requested, hashing it before a connection is taken
+    new_password = None
+    if reset_password:
+        import os
+        from dotenv import load_dotenv
+        load_dotenv()
+        new_password = os.getenv("NEW_USER_PASSWORD", "pubfitnessstudio")
+        hashed_password = await _hash_password(new_password)
+
+    async with pool.acquire() as db:
         try:
-            user_id = data.get('user_id')
-            reset_password = data.get('reset_password', False)
-            sub_end_date = data.get('sub_end_date')
-            device_id = data.get('device_id')
-            
-            # Generate new password if reset is requested
-            new_password = None
             if reset_password:
-                import os
-                from dotenv import load_dotenv
-                load_dotenv()
-                new_password = os.getenv("NEW_USER_PASSWORD", "pubfitnessstudio")
-                
-                # Hash the password
-                hashed_password = bcrypt.hashpw(new_password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-                
                 # Update password
                 await db.execute("""
                     UPDATE users 
                     SET password = ?
                     WHERE user_id = ?
                 """, (hashed_password, user_id))
+
+                # Sessions started with the old password must log in again
+                await db.execute("""
+                    UPDATE refresh_tokens SET revoked_at = CURRENT_TIMESTAMP
+                    WHERE user_id = ? AND revoked_at IS NULL
+                """, (user_id,))
             
             # Update subscription end date
             if sub_end_date:
@@ -730,6 +1752,7 @@ async def update_user_details_in_db(data: dict):
                 """, (device_id, user_id))
             
             await db.commit()
+            invalidate_dashboard_statistics()
             
             return {
                 "status": "success", 
@@ -741,7 +1764,7 @@ async def update_user_details_in_db(data: dict):
 
 
 async def delete_user_from_db(user_id: str):
-    async with aiosqlite.connect(DB_NAME) as db:
+    async with pool.acquire() as db:
         try:
             # First, get user details for confirmation
             async with db.execute("""
@@ -760,11 +1783,20 @@ async def delete_user_from_db(user_id: str):
             
             # Delete nutrition data first (due to foreign key constraint)
             await db.execute("DELETE FROM nutrition_data WHERE user_id = ?", (user_id,))
+            await db.execute("DELETE FROM meal_items WHERE user_id = ?", (user_id,))
+            for table, _ in ROLLUPS.values():
+                await db.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
             
+            await db.execute("DELETE FROM refresh_tokens WHERE user_id = ?", (user_id,))
+            await db.execute("DELETE FROM resource_versions WHERE user_id = ?", (user_id,))
+
             # Delete the user
             await db.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
             
             await db.commit()
+            invalidate_dashboard_statistics()
+
+            await writer.submit(lambda conn: delete_profile_image(conn, user_id))
             
             return {
                 "status": "success", 
@@ -776,21 +1808,19 @@ async def delete_user_from_db(user_id: str):
 
 
 async def get_user_by_id_from_db(user_id: str):
-    async with aiosqlite.connect(DB_NAME) as db:
+    async with pool.acquire() as db:
         try:
             async with db.execute("""
-                SELECT user_id, username, phone_no, role, profile_img, gender, dob, height, weight,
-                       calories_goal, proteins_goal, fats_goal, carbs_goal, sub_start_date, sub_end_date, device_id
-                FROM users 
-                WHERE user_id = ?
+                SELECT u.user_id, u.username, u.phone_no, u.role, p.content_hash, u.gender, u.dob, u.height, u.weight,
+                       u.calories_goal, u.proteins_goal, u.fats_goal, u.carbs_goal, u.sub_start_date, u.sub_end_date, u.device_id
+                FROM users u
+                LEFT JOIN profile_images p ON p.user_id = u.user_id
+                WHERE u.user_id = ?
             """, (user_id,)) as cursor:
                 row = await cursor.fetchone()
                 
                 if row:
-                    profile_img = None
-                    if row[4]:  # If profile_img exists
-                        import base64
-                        profile_img = base64.b64encode(row[4]).decode('utf-8')
+                    profile_img = profile_image_url(row[0], row[4], size=256)
                     
                     return {
                         "user_id": row[0],
@@ -0,0 +1,140 @@
+import bisect
+import csv
+import os
+import re
+import zlib
+
+from rapidfuzz import fuzz, process
+
+FOOD_DATA_PATH = os.getenv("FOOD_DATA_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "data.csv"))
+FOOD_SEARCH_LIMIT = 10
+FOOD_SEARCH_MAX_LIMIT = 50
+# Minimum rapidfuzz score (0-100) for a typo-tolerant match to be returned
+FUZZY_SCORE_CUTOFF = 70
+
+NUMERIC_FIELDS = (
+    "energy_kcal", "carb_g", "protein_g", "fat_g",
+    "unit_serving_energy_kcal", "unit_serving_carb_g", "unit_serving_protein_g", "unit_serving_fat_g",
+)
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: str) -> str:
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def load_foods_csv(path: str = FOOD_DATA_PATH):
+    """Rows of data.csv that have a serving unit, with numeric fields as floats."""
+    foods = []
+    # utf-8-sig: the shipped file starts with a BOM
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            name = (row.get("food_name") or "").strip()
+            unit = (row.get("servings_unit") or "").strip()
+            if not name or not unit:
+                continue
+            food = {"food_name": name, "servings_unit": unit}
+            for field in NUMERIC_FIELDS:
+                food[field] = _to_float(row.get(field))
+            foods.append(food)
+    return foods
+
+
+class FoodIndex:
+    """In-memory search over the food table, built once and read-only afterwards.
+
+    Results are ranked in three tiers: names starting with the query, names in
+    which every query word starts some word of the name, and finally fuzzy
+    matches for typos. Within a tier, rapidfuzz's WRatio orders the results.
+    """
+
+    def __init__(self, foods):
+        self.foods = foods
+        self.names = [normalize(food["food_name"]) for food in foods]
+        # Changes whenever a food is added or its name, unit or nutrition values change
+        self.revision = f"{zlib.crc32(repr([sorted(food.items()) for food in foods]).encode()):08x}"
+
+        # Names in sorted order (with their food ids) answer whole-name prefix queries with a bisect
+        order = sorted(range(len(foods)), key=self.names.__getitem__)
+        self._sorted_names = [self.names[i] for i in order]
+        self._sorted_ids = order
+
+        # Sorted word list plus word -> food ids for per-word prefix queries
+        postings = {}
+        for i, name in enumerate(self.names):
+            for word in set(name.split()):
+                postings.setdefault(word, set()).add(i)
+        self._words = sorted(postings)
+        self._postings = postings
+
+    @classmethod
+    def from_csv(cls, path: str = FOOD_DATA_PATH):
+        return cls(load_foods_csv(path))
+
+    @classmethod
+    def from_db(cls, conn):
+        """Build from the foods table so results carry the food_id meal items refer to."""
+        fields = ("food_id", "food_name", "servings_unit") + NUMERIC_FIELDS
+        rows = conn.execute(f"SELECT {', '.join(fields)} FROM foods ORDER BY food_id").fetchall()
+        return cls([dict(zip(fields, row)) for row in rows])
+
+    def __len__(self):
+        return len(self.foods)
+
+    @staticmethod
+    def _prefix_range(items, prefix):
+        # Normalized text is plain ASCII, so "\x7f" sorts after every continuation of prefix
+        return bisect.bisect_left(items, prefix), bisect.bisect_left(items, prefix + "\x7f")
+
+    def _name_prefix_matches(self, query):
+        start, end = self._prefix_range(self._sorted_names, query)
+        return set(self._sorted_ids[start:end])
+
+    def _word_prefix_matches(self, words):
+        matches = None
+        for word in words:
+            start, end = self._prefix_range(self._words, word)
+            ids = set()
+            for token in self._words[start:end]:
+                ids |= self._postings[token]
+            matches = ids if matches is None else matches & ids
+            if not matches:
+                return set()
+        return matches or set()
+
+    def search(self, query: str, limit: int = FOOD_SEARCH_LIMIT):
+        query = normalize(query or "")
+        if not query or limit <= 0:
+            return []
+
+        tiers = [self._name_prefix_matches(query)]
+        tiers.append(self._word_prefix_matches(query.split()) - tiers[0])
+
+        ranked = []
+        for tier in tiers:
+            scored = [(fuzz.WRatio(query, self.names[i]), i) for i in tier]
+            scored.sort(key=lambda item: (-item[0], self.names[item[1]]))
+            ranked.extend(i for _, i in scored)
+            if len(ranked) >= limit:
+                return [self.foods[i] for i in ranked[:limit]]
+
+        # Not enough exact hits: fall back to typo-tolerant matching over all names
+        seen = set(ranked)
+        for _, _, i in process.extract(
+            query, self.names, scorer=fuzz.WRatio, processor=None,
+            limit=limit + len(seen), score_cutoff=FUZZY_SCORE_CUTOFF,
+        ):
+            if i not in seen:
+                ranked.append(i)
+                if len(ranked) >= limit:
+                    break
+        return [self.foods[i] for i in ranked]
+
@@ -0,0 +1,83 @@
+import asyncio
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+MAX_IMAGE_BYTES = int(os.getenv("PROFILE_IMAGE_MAX_BYTES", str(5 * 1024 * 1024)))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+# Thumbnail edge lengths in pixels; list views use the small one, the profile page the large one
+VARIANT_SIZES = (64, 256)
+VARIANT_FORMAT = "WEBP"
+VARIANT_MIME_TYPE = "image/webp"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def read_upload(file, max_bytes: int = MAX_IMAGE_BYTES, chunk_size: int = 64 * 1024) -> bytes:
+    """Read an uploaded file in chunks, giving up as soon as it passes max_bytes."""
+    stream = getattr(file, "stream", file)
+    chunks = []
+    total = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise ImageTooLarge(f"Image is larger than {max_bytes // 1024} KB")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def make_variants(data: bytes):
+    """Decode the image once and render every thumbnail size. Runs in a worker process."""
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            source_format = image.format
+            image.load()
+    except Exception as e:
+        raise ValueError(f"Unsupported image: {e}") from None
+
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    variants = {}
+    for size in VARIANT_SIZES:
+        thumb = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        out = io.BytesIO()
+        thumb.save(out, VARIANT_FORMAT, quality=80, method=4)
+        variants[size] = out.getvalue()
+
+    mime_type = Image.MIME.get(source_format, "application/octet-stream")
+    return {"mime_type": mime_type, "width": image.width, "height": image.height, "variants": variants}
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: worker processes must not inherit the server's threads and connections.
+            # Each worker re-imports __main__ (see password_hasher), so callers' scripts
+            # need an `if __name__ == "__main__":` guard
+            _executor = ProcessPoolExecutor(
+                max_workers=IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+async def process_image(data: bytes):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), make_variants, data)
+
@@ -0,0 +1,179 @@
+import hashlib
+
+from image_pipeline import make_variants, VARIANT_MIME_TYPE, VARIANT_SIZES
+
+# Image bytes are stored once per content hash; users point at them through profile_images
+IMAGE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS image_blobs (
+        content_hash TEXT PRIMARY KEY,
+        mime_type TEXT NOT NULL,
+        byte_size INTEGER NOT NULL,
+        data BLOB NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS profile_images (
+        user_id TEXT PRIMARY KEY,
+        content_hash TEXT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE,
+        FOREIGN KEY (content_hash) REFERENCES image_blobs (content_hash)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_profile_images_content_hash ON profile_images (content_hash)",
+    # Thumbnails derived from an original; the thumbnail bytes are themselves in image_blobs
+    """
+    CREATE TABLE IF NOT EXISTS image_variants (
+        source_hash TEXT NOT NULL,
+        variant TEXT NOT NULL,
+        variant_hash TEXT NOT NULL,
+        PRIMARY KEY (source_hash, variant),
+        FOREIGN KEY (source_hash) REFERENCES image_blobs (content_hash),
+        FOREIGN KEY (variant_hash) REFERENCES image_blobs (content_hash)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_image_variants_variant_hash ON image_variants (variant_hash)",
+]
+
+_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+
+def sniff_mime_type(data: bytes) -> str:
+    for signature, mime_type in _SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def profile_image_url(user_id: str, image_hash: str, size: int = None):
+    if not image_hash:
+        return None
+    # The version parameter changes with the content, so the URL can be cached forever
+    url = f"/api/profile-image/{user_id}?v={image_hash[:16]}"
+    if size:
+        url += f"&size={size}"
+    return url
+
+
+def create_image_tables(cursor):
+    for sql in IMAGE_TABLES:
+        cursor.execute(sql)
+
+
+def _insert_blob(conn, data: bytes, mime_type: str) -> str:
+    image_hash = content_hash(data)
+    conn.execute("""
+        INSERT OR IGNORE INTO image_blobs (content_hash, mime_type, byte_size, data)
+        VALUES (?, ?, ?, ?)
+    """, (image_hash, mime_type, len(data), data))
+    return image_hash
+
+
+def _delete_blob_if_unused(conn, image_hash):
+    conn.execute("""
+        DELETE FROM image_blobs
+        WHERE content_hash = ?
+        AND NOT EXISTS (SELECT 1 FROM profile_images WHERE content_hash = ?)
+        AND NOT EXISTS (SELECT 1 FROM image_variants WHERE source_hash = ? OR variant_hash = ?)
+    """, (image_hash, image_hash, image_hash, image_hash))
+
+
+def _delete_orphan(conn, image_hash):
+    if conn.execute("SELECT 1 FROM profile_images WHERE content_hash = ?", (image_hash,)).fetchone():
+        return
+    variant_hashes = [row[0] for row in conn.execute(
+        "SELECT variant_hash FROM image_variants WHERE source_hash = ?", (image_hash,)
+    )]
+    conn.execute("DELETE FROM image_variants WHERE source_hash = ?", (image_hash,))
+    for variant_hash in variant_hashes:
+        _delete_blob_if_unused(conn, variant_hash)
+    _delete_blob_if_unused(conn, image_hash)
+
+
+def _insert_variants(conn, image_hash: str, variants: dict):
+    for size, variant_data in variants.items():
+        variant_hash = _insert_blob(conn, variant_data, VARIANT_MIME_TYPE)
+        conn.execute("""
+            INSERT OR IGNORE INTO image_variants (source_hash, variant, variant_hash)
+            VALUES (?, ?, ?)
+        """, (image_hash, str(size), variant_hash))
+
+
+def store_profile_image(conn, user_id: str, data: bytes, mime_type: str = None, variants: dict = None) -> str:
+    """Point user_id at data, storing the original and its thumbnails only if this content is new."""
+    image_hash = _insert_blob(conn, data, mime_type or sniff_mime_type(data))
+    _insert_variants(conn, image_hash, variants or {})
+
+    row = conn.execute("SELECT content_hash FROM profile_images WHERE user_id = ?", (user_id,)).fetchone()
+    conn.execute("""
+        INSERT OR REPLACE INTO profile_images (user_id, content_hash, updated_at)
+        VALUES (?, ?, CURRENT_TIMESTAMP)
+    """, (user_id, image_hash))
+    if row and row[0] != image_hash:
+        _delete_orphan(conn, row[0])
+    return image_hash
+
+
+def delete_profile_image(conn, user_id: str):
+    row = conn.execute("SELECT content_hash FROM profile_images WHERE user_id = ?", (user_id,)).fetchone()
+    if row:
+        conn.execute("DELETE FROM profile_images WHERE user_id = ?", (user_id,))
+        _delete_orphan(conn, row[0])
+
+
+def migrate_inline_profile_images(conn, batch_size: int = 100):
+    """Move legacy users.profile_img BLOBs into the image store in batches, within the caller's transaction."""
+    moved = 0
+    while True:
+        rows = conn.execute(
+            "SELECT user_id, profile_img FROM users WHERE profile_img IS NOT NULL LIMIT ?",
+            (batch_size,)
+        ).fetchall()
+        if not rows:
+            return moved
+        for user_id, data in rows:
+            store_profile_image(conn, user_id, bytes(data))
+            conn.execute("UPDATE users SET profile_img = NULL WHERE user_id = ?", (user_id,))
+        moved += len(rows)
+
+
+def add_missing_variants(conn, batch_size: int = 100):
+    """Render thumbnails for profile images stored without them, within the caller's transaction.
+
+    Runs in-process, so it is meant for migrations. Images that cannot be
+    decoded are skipped and keep serving their original.
+    """
+    added = 0
+    after = ""
+    while True:
+        rows = conn.execute("""
+            SELECT b.content_hash, b.data FROM image_blobs b
+            WHERE b.content_hash > ?
+            AND b.content_hash IN (SELECT content_hash FROM profile_images)
+            AND (SELECT COUNT(*) FROM image_variants v WHERE v.source_hash = b.content_hash) < ?
+            ORDER BY b.content_hash
+            LIMIT ?
+        """, (after, len(VARIANT_SIZES), batch_size)).fetchall()
+        if not rows:
+            return added
+        for image_hash, data in rows:
+            try:
+                image = make_variants(bytes(data))
+            except ValueError:
+                continue
+            _insert_variants(conn, image_hash, image["variants"])
+            added += 1
+        after = rows[-1][0]
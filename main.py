@@ -1,25 +1,57 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from db_utils import create_tables, login, register, contact_admin, get_pending_registrations, approve_registration, reject_registration, get_dashboard_statistics, get_all_users, get_user_goals_from_db, get_nutrition_data_from_db, save_nutrition_data_to_db, get_user_profile_from_db, update_user_profile_to_db, update_user_goals_to_db, update_profile_image_to_db, update_user_details_in_db, update_user_password_in_db, delete_user_from_db
+from db_utils import create_tables, login, register, bulk_register, contact_admin, get_pending_registrations, approve_registration, reject_registration, approve_registrations, reject_registrations, REGISTRATION_BATCH_MAX_IDS, get_dashboard_statistics, get_all_users, get_user_goals_from_db, get_nutrition_data_from_db, save_nutrition_data_to_db, get_nutrition_range_from_db, get_nutrition_trends_from_db, import_nutrition_chunk, iter_nutrition_export, NUTRITION_IMPORT_CHUNK, get_user_profile_from_db, update_user_profile_to_db, update_user_goals_to_db, update_profile_image_to_db, update_user_details_in_db, update_user_password_in_db, delete_user_from_db, get_pool_statistics, get_query_statistics, get_profile_image_from_db, USERS_PAGE_SIZE, create_refresh_token, rotate_refresh_token, revoke_refresh_token, search_foods, get_resource_etag
 from auth_utils import generate_token, decode_token
-
-from flask import Flask, request, jsonify, render_template, redirect, url_for
+from async_runner import run_async
+from image_pipeline import MAX_IMAGE_BYTES
+from food_search import FOOD_SEARCH_LIMIT
+from nutrition_io import FORMATS, ImportFormatError, read_records, import_records, ndjson_line, csv_lines
+from member_import import FORMATS as MEMBER_FORMATS, MemberImportError, read_member_rows
+from response_compression import ResponseCompressor, encoded_etags
+from resource_versions import GOALS, PROFILE, nutrition_day
+from page_cache import PageCache
+from request_metrics import RequestMetrics
+
+from flask import Flask, Response, request, jsonify, redirect, url_for, make_response
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 from functools import wraps
+from datetime import datetime
 
 import os
-import asyncio
-
-create_tables()
-
 
 app = Flask(__name__)
 CORS(app, supports_credentials=True)
 app.config['SECRET_KEY'] = os.getenv("FLASK_SECRET_KEY", "supersecretkey")
+# First, so request timings include compression and the other hooks
+metrics = RequestMetrics(app)
+compressor = ResponseCompressor(app)
+# None of the page templates take context, so each renders to the same HTML every time
+pages = PageCache(app, compressor, [
+    "login.html", "register.html", "contact_admin.html", "user_base.html", "admin_dashboard.html",
+    "home_page.html", "profile_page.html", "calculator_page.html", "update_user_details.html",
+])
+
+# Room for the other multipart fields sent alongside a profile image
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+NUTRITION_IMPORT_MAX_BYTES = int(os.getenv("NUTRITION_IMPORT_MAX_BYTES", str(20 * 1024 * 1024)))
+BULK_REGISTER_MAX_BYTES = int(os.getenv("BULK_REGISTER_MAX_BYTES", str(2 * 1024 * 1024)))
 
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pubfitnessstudio.db')
 
+
+def prepare():
+    """Apply pending migrations and build the static and page caches before serving.
+
+    Kept out of import time: the password and image worker processes are
+    spawned, and each one re-imports the __main__ module it was started from.
+    """
+    create_tables()
+    compressor.precompress_static()
+    pages.render_all()
+
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -39,6 +71,27 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def _not_modified(etag):
+    """A 304 if the client already holds the representation tagged etag, in any encoding."""
+    for tag in encoded_etags(etag):
+        if request.if_none_match.contains(tag):
+            response = make_response("", 304)
+            response.set_etag(tag)
+            response.vary.add("Accept-Encoding")
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+    return None
+
+def _tagged(result, etag):
+    response = jsonify(result)
+    if result.get("status") == "success":
+        response.set_etag(etag)
+        # Cached per browser, revalidated on every use
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    return response
+
 @app.route("/")
 def home():
     return redirect(url_for("login_page"))
@@ -46,25 +99,26 @@ def home():
 @app.route("/login", methods=["GET", "POST"])
 def login_page():
     if request.method == "GET":
-        return render_template("login.html")
+        return pages.serve("login.html")
     return "Method not allowed", 405
 
 @app.route("/register", methods=["GET", "POST"])
 def register_page():
     if request.method == "GET":
-        return render_template("register.html")
+        return pages.serve("register.html")
     return "Method not allowed", 405
 
 @app.route("/contact-admin", methods=["GET", "POST"])
 def contact_admin_page():
     if request.method == "GET":
-        return render_template("contact_admin.html")
+        return pages.serve("contact_admin.html")
     return "Method not allowed", 405
 
 @app.route("/api/register", methods=["POST"])
 @admin_required
 def register_route():
     try:
+        request.max_content_length = MAX_IMAGE_BYTES + UPLOAD_FORM_OVERHEAD
         # Check if the request contains files (multipart/form-data)
         if request.files:
             # Handle multipart form data with image
@@ -84,39 +138,85 @@ def register_route():
             # Handle JSON data
             data = request.get_json()
         
-        result = asyncio.run(register(data))
+        result = run_async(register(data))
         return jsonify(result)
+    except RequestEntityTooLarge:
+        return jsonify({"status": "failure", "error": "Image is too large"}), 413
     except Exception as e:
         return jsonify({"status": "failure", "error": str(e)}), 500
 
+@app.route("/api/register/bulk", methods=["POST"])
+@admin_required
+def bulk_register_route():
+    fmt = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'json')
+    if fmt not in MEMBER_FORMATS:
+        return jsonify({"status": "failure", "error": f"format must be one of: {', '.join(MEMBER_FORMATS)}"}), 400
+
+    request.max_content_length = BULK_REGISTER_MAX_BYTES
+    try:
+        rows = read_member_rows(request.get_data(), fmt)
+    except RequestEntityTooLarge:
+        return jsonify({"status": "failure", "error": f"Upload is larger than {BULK_REGISTER_MAX_BYTES // 1024} KB"}), 413
+    except (MemberImportError, UnicodeDecodeError) as e:
+        return jsonify({"status": "failure", "error": str(e)}), 400
+
+    try:
+        result = run_async(bulk_register(rows))
+    except Exception as e:
+        return jsonify({"status": "failure", "error": str(e)}), 500
+    return jsonify(result), 200 if result["status"] == "success" else 500
+
 @app.route("/api/login", methods=["POST"])
 def login_route():
     data = request.get_json()
     username = data.get("username")
     password = data.get("password")
 
-    result = asyncio.run(login(username, password))
+    result = run_async(login(username, password))
     if result["status"] == "success":
         jwt_token = generate_token(result["user_id"], result["username"], result["role"])
         result["token"] = jwt_token
+        result["refresh_token"] = run_async(create_refresh_token(result["user_id"]))
+    return jsonify(result)
+
+@app.route("/api/token/refresh", methods=["POST"])
+def refresh_token_route():
+    data = request.get_json(silent=True) or {}
+    refresh_token = data.get("refresh_token")
+    if not refresh_token:
+        return jsonify({"status": "failure", "reason": "No refresh token provided"}), 400
+
+    # Mints a new access token from the refresh token alone; no bcrypt involved
+    result = run_async(rotate_refresh_token(refresh_token))
+    if result["status"] != "success":
+        return jsonify(result), 401
+    result["token"] = generate_token(result["user_id"], result["username"], result["role"])
     return jsonify(result)
 
+@app.route("/api/token/revoke", methods=["POST"])
+def revoke_token_route():
+    data = request.get_json(silent=True) or {}
+    refresh_token = data.get("refresh_token")
+    if not refresh_token:
+        return jsonify({"status": "failure", "message": "No refresh token provided"}), 400
+    return jsonify(run_async(revoke_refresh_token(refresh_token)))
+
 @app.route("/api/contact-admin", methods=["POST"])
 def contact_admin_route():
     data = request.get_json()
-    result = asyncio.run(contact_admin(data))
+    result = run_async(contact_admin(data))
     return jsonify(result)
 
 @app.route("/api/pending-requests", methods=["GET"])
 @admin_required
 def get_pending_requests():
-    result = asyncio.run(get_pending_registrations())
+    result = run_async(get_pending_registrations())
     return jsonify(result)
 
 @app.route("/api/approve-request/<registration_id>", methods=["POST"])
 @admin_required
 def approve_registration_request(registration_id):
-    result = asyncio.run(approve_registration(registration_id))
+    result = run_async(approve_registration(registration_id))
     return jsonify(result)
 
 @app.route("/api/reject-request/<registration_id>", methods=["POST"])
@@ -124,45 +224,103 @@ def approve_registration_request(registration_id):
 def reject_registration_request(registration_id):
     data = request.get_json()
     reason = data.get("reason", "No reason provided")
-    result = asyncio.run(reject_registration(registration_id, reason))
+    result = run_async(reject_registration(registration_id, reason))
     return jsonify(result)
 
+def _registration_ids(data):
+    ids = data.get("registration_ids")
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, str) for i in ids):
+        return None, "registration_ids must be a non-empty list of ids"
+    if len(ids) > REGISTRATION_BATCH_MAX_IDS:
+        return None, f"At most {REGISTRATION_BATCH_MAX_IDS} requests can be processed at once"
+    return ids, None
+
+@app.route("/api/approve-requests", methods=["POST"])
+@admin_required
+def approve_registration_requests():
+    ids, error = _registration_ids(request.get_json(silent=True) or {})
+    if error:
+        return jsonify({"status": "failure", "message": error}), 400
+    result = run_async(approve_registrations(ids))
+    return jsonify(result), 200 if result["status"] == "success" else 500
+
+@app.route("/api/reject-requests", methods=["POST"])
+@admin_required
+def reject_registration_requests():
+    data = request.get_json(silent=True) or {}
+    ids, error = _registration_ids(data)
+    if error:
+        return jsonify({"status": "failure", "message": error}), 400
+    result = run_async(reject_registrations(ids, data.get("reason", "No reason provided")))
+    return jsonify(result), 200 if result["status"] == "success" else 500
+
 @app.route("/api/dashboard-stats", methods=["GET"])
 @admin_required
 def get_dashboard_stats():
-    result = asyncio.run(get_dashboard_statistics())
+    result = run_async(get_dashboard_statistics())
     return jsonify(result)
 
+@app.route("/api/db-pool-stats", methods=["GET"])
+@admin_required
+def get_db_pool_stats():
+    return jsonify(get_pool_statistics())
+
+@app.route("/api/query-stats", methods=["GET"])
+@admin_required
+def get_query_stats():
+    try:
+        top = int(request.args.get("top", 20))
+    except ValueError:
+        return jsonify({"status": "failure", "message": "top must be an integer"}), 400
+
+    result = get_query_statistics(top, request.args.get("sort", "total"))
+    return jsonify(result), 200 if result["status"] == "success" else 400
+
+@app.route("/api/compression-stats", methods=["GET"])
+@admin_required
+def get_compression_stats():
+    return jsonify({"status": "success", **compressor.stats(), "page_cache": pages.stats()})
+
 @app.route("/api/users", methods=["GET"])
 @admin_required
 def get_users():
-    result = asyncio.run(get_all_users())
-    # print(result)
+    try:
+        limit = int(request.args.get("limit", USERS_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"status": "failure", "message": "limit must be an integer"}), 400
+
+    result = run_async(get_all_users(
+        limit=limit,
+        cursor=request.args.get("cursor"),
+        status=request.args.get("status"),
+        sort=request.args.get("sort", "username"),
+        prefix=request.args.get("q")
+    ))
     return jsonify(result)
 
 @app.route("/user")
 def user_dashboard():
-    return render_template("user_base.html")
+    return pages.serve("user_base.html")
 
 @app.route("/admin")
 def admin_dashboard():
-    return render_template("admin_dashboard.html")
+    return pages.serve("admin_dashboard.html")
 
 @app.route("/home")
 def home_page():
-    return render_template("home_page.html")
+    return pages.serve("home_page.html")
 
 @app.route("/profile")
 def profile_page():
-    return render_template("profile_page.html")
+    return pages.serve("profile_page.html")
 
 @app.route("/calculator")
 def calculator_page():
-    return render_template("calculator_page.html")
+    return pages.serve("calculator_page.html")
 
 @app.route("/update-user-details")
 def update_user_details():
-    return render_template("update_user_details.html")
+    return pages.serve("update_user_details.html")
 
 @app.route("/api/delete-user", methods=["POST"])
 @admin_required
@@ -172,7 +330,7 @@ def delete_user():
     if not user_id:
         return jsonify({"status": "failure", "message": "User ID is required"}), 400
     
-    result = asyncio.run(delete_user_from_db(user_id))
+    result = run_async(delete_user_from_db(user_id))
     return jsonify(result)
 
 @app.route("/logout")
@@ -190,8 +348,13 @@ def get_user_goals():
         payload = decode_token(token)
         user_id = payload['user_id']
         
-        goals = asyncio.run(get_user_goals_from_db(user_id))
-        return jsonify(goals)
+        etag = run_async(get_resource_etag(user_id, GOALS))
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        goals = run_async(get_user_goals_from_db(user_id))
+        return _tagged(goals, etag)
     except Exception as e:
         return jsonify({"status": "failure", "message": str(e)}), 500
 
@@ -205,11 +368,114 @@ def get_nutrition_data(date):
         payload = decode_token(token)
         user_id = payload['user_id']
         
-        nutrition_data = asyncio.run(get_nutrition_data_from_db(user_id, date))
-        return jsonify(nutrition_data)
+        etag = run_async(get_resource_etag(user_id, nutrition_day(date)))
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        nutrition_data = run_async(get_nutrition_data_from_db(user_id, date))
+        return _tagged(nutrition_data, etag)
     except Exception as e:
         return jsonify({"status": "failure", "message": str(e)}), 500
 
+@app.route('/api/nutrition-data', methods=['GET'])
+def get_nutrition_range():
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    if not token:
+        return jsonify({"status": "failure", "message": "No token provided"}), 401
+    
+    try:
+        payload = decode_token(token)
+        user_id = payload['user_id']
+
+        result = run_async(get_nutrition_range_from_db(
+            user_id,
+            request.args.get('from'),
+            request.args.get('to'),
+            request.args.get('bucket', 'day')
+        ))
+        return jsonify(result), 200 if result["status"] == "success" else 400
+    except Exception as e:
+        return jsonify({"status": "failure", "message": str(e)}), 500
+
+@app.route('/api/nutrition-trends', methods=['GET'])
+def get_nutrition_trends():
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    if not token:
+        return jsonify({"status": "failure", "message": "No token provided"}), 401
+    
+    try:
+        payload = decode_token(token)
+        user_id = payload['user_id']
+
+        periods = int(request.args.get('periods', 12))
+        result = run_async(get_nutrition_trends_from_db(user_id, request.args.get('bucket', 'week'), periods))
+        return jsonify(result), 200 if result["status"] == "success" else 400
+    except ValueError:
+        return jsonify({"status": "failure", "message": "periods must be an integer"}), 400
+    except Exception as e:
+        return jsonify({"status": "failure", "message": str(e)}), 500
+
+@app.route('/api/nutrition-data/export', methods=['GET'])
+def export_nutrition_data():
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    if not token:
+        return jsonify({"status": "failure", "message": "No token provided"}), 401
+
+    payload = decode_token(token)
+    if 'error' in payload:
+        return jsonify({"status": "failure", "message": payload['error']}), 401
+
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in FORMATS:
+        return jsonify({"status": "failure", "message": f"format must be one of: {', '.join(FORMATS)}"}), 400
+    date_from, date_to = request.args.get('from'), request.args.get('to')
+    try:
+        for value in (date_from, date_to):
+            if value:
+                datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        return jsonify({"status": "failure", "message": "from and to must be dates in YYYY-MM-DD format"}), 400
+
+    # Rows are read and rendered one at a time while the response is being sent
+    days = iter_nutrition_export(payload['user_id'], date_from, date_to, include_items=fmt == 'ndjson')
+    body = (ndjson_line(day) for day in days) if fmt == 'ndjson' else csv_lines(days)
+    response = Response(body, mimetype=FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="nutrition-{payload["username"]}.{fmt}"'
+    return response
+
+@app.route('/api/nutrition-data/import', methods=['POST'])
+def import_nutrition_data():
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    if not token:
+        return jsonify({"status": "failure", "message": "No token provided"}), 401
+
+    payload = decode_token(token)
+    if 'error' in payload:
+        return jsonify({"status": "failure", "message": payload['error']}), 401
+    user_id = payload['user_id']
+
+    fmt = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'ndjson')
+    if fmt not in FORMATS:
+        return jsonify({"status": "failure", "message": f"format must be one of: {', '.join(FORMATS)}"}), 400
+
+    request.max_content_length = NUTRITION_IMPORT_MAX_BYTES
+    try:
+        # The body is parsed as it arrives and written in bounded transactions
+        summary = import_records(
+            read_records(request.stream, fmt),
+            lambda chunk: run_async(import_nutrition_chunk(user_id, chunk)),
+            chunk_size=NUTRITION_IMPORT_CHUNK,
+        )
+    except RequestEntityTooLarge:
+        return jsonify({"status": "failure", "message": f"Import is larger than {NUTRITION_IMPORT_MAX_BYTES // (1024 * 1024)} MB"}), 413
+    except ImportFormatError as e:
+        return jsonify({"status": "failure", "message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"status": "failure", "message": f"Import stopped: {str(e)}"}), 500
+
+    return jsonify({"status": "success", **summary})
+
 @app.route('/api/nutrition-data', methods=['POST'])
 def save_nutrition_data():
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
@@ -221,11 +487,24 @@ def save_nutrition_data():
         user_id = payload['user_id']
         
         data = request.get_json()
-        result = asyncio.run(save_nutrition_data_to_db(user_id, data))
-        return jsonify(result)
+        result = run_async(save_nutrition_data_to_db(user_id, data))
+        return jsonify(result), 200 if result["status"] == "success" else 400
     except Exception as e:
         return jsonify({"status": "failure", "message": str(e)}), 500
 
+@app.route('/api/foods/search', methods=['GET'])
+def search_foods_route():
+    # Same data as the public static/data.csv, so no token is required
+    try:
+        limit = int(request.args.get("limit", FOOD_SEARCH_LIMIT))
+    except ValueError:
+        return jsonify({"status": "failure", "message": "limit must be an integer"}), 400
+
+    foods = search_foods(request.args.get("q", ""), limit)
+    response = jsonify({"status": "success", "foods": foods})
+    response.headers["Cache-Control"] = "public, max-age=3600"
+    return response
+
 @app.route('/api/user-profile', methods=['GET'])
 def get_user_profile():
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
@@ -236,8 +515,13 @@ def get_user_profile():
         payload = decode_token(token)
         user_id = payload['user_id']
         
-        profile = asyncio.run(get_user_profile_from_db(user_id))
-        return jsonify(profile)
+        etag = run_async(get_resource_etag(user_id, PROFILE))
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        profile = run_async(get_user_profile_from_db(user_id))
+        return _tagged(profile, etag)
     except Exception as e:
         return jsonify({"status": "failure", "message": str(e)}), 500
 
@@ -252,7 +536,7 @@ def update_user_profile():
         user_id = payload['user_id']
         
         data = request.get_json()
-        result = asyncio.run(update_user_profile_to_db(user_id, data))
+        result = run_async(update_user_profile_to_db(user_id, data))
         return jsonify(result)
     except Exception as e:
         return jsonify({"status": "failure", "message": str(e)}), 500
@@ -268,7 +552,7 @@ def update_user_goals():
         user_id = payload['user_id']
         
         data = request.get_json()
-        result = asyncio.run(update_user_goals_to_db(user_id, data))
+        result = run_async(update_user_goals_to_db(user_id, data))
         return jsonify(result)
     except Exception as e:
         return jsonify({"status": "failure", "message": str(e)}), 500
@@ -283,6 +567,8 @@ def update_profile_image():
         payload = decode_token(token)
         user_id = payload['user_id']
         
+        # Bound the upload before Werkzeug starts spooling it
+        request.max_content_length = MAX_IMAGE_BYTES + UPLOAD_FORM_OVERHEAD
         if 'profile_image' not in request.files:
             return jsonify({"status": "failure", "message": "No image file provided"}), 400
         
@@ -290,11 +576,44 @@ def update_profile_image():
         if file.filename == '':
             return jsonify({"status": "failure", "message": "No image file selected"}), 400
         
-        result = asyncio.run(update_profile_image_to_db(user_id, file))
+        result = run_async(update_profile_image_to_db(user_id, file))
         return jsonify(result)
+    except RequestEntityTooLarge:
+        return jsonify({"status": "failure", "message": "Image is too large"}), 413
     except Exception as e:
         return jsonify({"status": "failure", "message": str(e)}), 500
 
+@app.route('/api/profile-image/<user_id>', methods=['GET'])
+def get_profile_image(user_id):
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    if not token:
+        return jsonify({"status": "failure", "message": "No token provided"}), 401
+
+    payload = decode_token(token)
+    if 'error' in payload:
+        return jsonify({"status": "failure", "message": payload['error']}), 401
+    # Members see their own picture; admins see everyone's in the user list
+    if payload.get('user_id') != user_id and payload.get('role') != 'admin':
+        return jsonify({"status": "failure", "message": "Access denied"}), 403
+
+    size = request.args.get("size", type=int)
+    result = run_async(get_profile_image_from_db(user_id, request.if_none_match.as_set(), size))
+    if result["status"] == "failure":
+        return jsonify(result), 404
+
+    if result["status"] == "not_modified":
+        response = make_response("", 304)
+    else:
+        response = make_response(result["data"])
+        response.headers["Content-Type"] = result["mime_type"]
+    response.set_etag(result["content_hash"])
+    # Versioned URLs (?v=<hash prefix>) never change content; bare URLs must revalidate
+    if request.args.get("v") and result["source_hash"].startswith(request.args["v"]):
+        response.headers["Cache-Control"] = "private, max-age=31536000, immutable"
+    else:
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
 @app.route('/api/update-password', methods=['PUT'])
 def update_user_password():
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
@@ -306,7 +625,7 @@ def update_user_password():
         user_id = payload['user_id']
         
         data = request.get_json()
-        result = asyncio.run(update_user_password_in_db(user_id, data))
+        result = run_async(update_user_password_in_db(user_id, data))
         return jsonify(result)
     except Exception as e:
         return jsonify({"status": "failure", "message": str(e)}), 500
@@ -322,7 +641,7 @@ def update_user_details_api():
         admin_id = payload['user_id']
         
         data = request.get_json()
-        result = asyncio.run(update_user_details_in_db(data))
+        result = run_async(update_user_details_in_db(data))
         return jsonify(result)
     except Exception as e:
         print(e)
@@ -332,6 +651,7 @@ def update_user_details_api():
 if __name__ == '__main__':
     from dotenv import load_dotenv
     load_dotenv()
+    prepare()
     
     # from waitress import serve
 
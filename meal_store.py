@@ -0,0 +1,253 @@
+from nutrition_rollups import apply_day_changes, ROLLUP_COLUMNS
+from resource_versions import bump_versions, nutrition_day
+
+MEALS = ("breakfast", "lunch", "snacks", "dinner")
+
+# Nutrition per serving is looked up here rather than trusted from the client
+NUTRIENT_COLUMNS = (
+    ("calories", "unit_serving_energy_kcal"),
+    ("carbs", "unit_serving_carb_g"),
+    ("proteins", "unit_serving_protein_g"),
+    ("fats", "unit_serving_fat_g"),
+)
+
+MEAL_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS foods (
+        food_id INTEGER PRIMARY KEY,
+        food_name TEXT NOT NULL,
+        servings_unit TEXT NOT NULL,
+        energy_kcal REAL,
+        carb_g REAL,
+        protein_g REAL,
+        fat_g REAL,
+        unit_serving_energy_kcal REAL NOT NULL DEFAULT 0,
+        unit_serving_carb_g REAL NOT NULL DEFAULT 0,
+        unit_serving_protein_g REAL NOT NULL DEFAULT 0,
+        unit_serving_fat_g REAL NOT NULL DEFAULT 0,
+        UNIQUE (food_name, servings_unit)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS meal_items (
+        item_id INTEGER PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        date DATE NOT NULL,
+        meal TEXT NOT NULL CHECK (meal IN ('breakfast', 'lunch', 'snacks', 'dinner')),
+        food_id INTEGER NOT NULL,
+        servings REAL NOT NULL DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE,
+        FOREIGN KEY (food_id) REFERENCES foods (food_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_meal_items_user_id_date ON meal_items (user_id, date)",
+]
+
+_FOOD_FIELDS = (
+    "food_name", "servings_unit", "energy_kcal", "carb_g", "protein_g", "fat_g",
+    "unit_serving_energy_kcal", "unit_serving_carb_g", "unit_serving_protein_g", "unit_serving_fat_g",
+)
+
+
+def create_meal_tables(cursor):
+    for sql in MEAL_TABLES:
+        cursor.execute(sql)
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(nutrition_data)")}
+    if "items_backfilled" not in columns:
+        # 0 marks days still logged as comma-joined food names only
+        cursor.execute("ALTER TABLE nutrition_data ADD COLUMN items_backfilled INTEGER NOT NULL DEFAULT 0")
+
+
+def seed_foods(conn, foods):
+    """Insert new foods and refresh the nutrition values of known ones; food_ids never change."""
+    placeholders = ", ".join("?" for _ in _FOOD_FIELDS)
+    updates = ", ".join(f"{field} = excluded.{field}" for field in _FOOD_FIELDS[2:])
+    conn.executemany(f"""
+        INSERT INTO foods ({", ".join(_FOOD_FIELDS)}) VALUES ({placeholders})
+        ON CONFLICT (food_name, servings_unit) DO UPDATE SET {updates}
+    """, [tuple(food[field] for field in _FOOD_FIELDS) for food in foods])
+
+
+def _lookup_foods(conn, food_ids):
+    food_ids = sorted(set(food_ids))
+    if not food_ids:
+        return {}
+    columns = ", ".join(column for _, column in NUTRIENT_COLUMNS)
+    rows = conn.execute(
+        f"SELECT food_id, food_name, {columns} FROM foods WHERE food_id IN ({', '.join('?' for _ in food_ids)})",
+        food_ids
+    ).fetchall()
+    return {row[0]: row[1:] for row in rows}
+
+
+def meal_totals(foods, items):
+    """Sum (calories, carbs, proteins, fats) over items of (meal, food_id, servings)."""
+    totals = [0.0] * len(NUTRIENT_COLUMNS)
+    for _, food_id, servings in items:
+        for i, value in enumerate(foods[food_id][1:]):
+            totals[i] += (value or 0) * servings
+    return [round(total, 2) for total in totals]
+
+
+def replace_meal_items(conn, user_id: str, date: str, items, water: float = 0):
+    """Make items of (meal, food_id, servings) the whole of a day's log and recompute its totals."""
+    foods = _lookup_foods(conn, [food_id for _, food_id, _ in items])
+    unknown = sorted({food_id for _, food_id, _ in items if food_id not in foods})
+    if unknown:
+        raise ValueError(f"Unknown food_id: {', '.join(map(str, unknown))}")
+
+    conn.execute("DELETE FROM meal_items WHERE user_id = ? AND date = ?", (user_id, date))
+    conn.executemany(
+        "INSERT INTO meal_items (user_id, date, meal, food_id, servings) VALUES (?, ?, ?, ?, ?)",
+        [(user_id, date, meal, food_id, servings) for meal, food_id, servings in items]
+    )
+
+    # The per-meal name lists are kept for the existing daily log view
+    names = {meal: ", ".join(foods[food_id][0] for item_meal, food_id, _ in items if item_meal == meal) for meal in MEALS}
+    calories, carbs, proteins, fats = meal_totals(foods, items)
+    conn.execute("""
+        INSERT OR REPLACE INTO nutrition_data
+        (user_id, date, breakfast, lunch, snacks, dinner, calories, carbs, proteins, fats, water, items_backfilled)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+    """, (
+        user_id, date, names["breakfast"], names["lunch"], names["snacks"], names["dinner"],
+        calories, carbs, proteins, fats, water
+    ))
+
+
+def import_nutrition_days(conn, user_id: str, days):
+    """Replace whole days of a user's log in bulk; returns [(date, error)] for days that were skipped.
+
+    Each day is a dict with date, water and either items of (meal, food_id,
+    servings), whose totals are computed here, or the totals and meal name
+    strings carried over from another tracker. The caller bounds the batch size.
+    """
+    by_date = {day["date"]: day for day in days}  # Later lines for the same day win
+    foods = _lookup_foods(conn, [food_id for day in by_date.values() for _, food_id, _ in day["items"] or ()])
+
+    skipped = []
+    for date, day in list(by_date.items()):
+        unknown = sorted({food_id for _, food_id, _ in day["items"] or () if food_id not in foods})
+        if unknown:
+            skipped.append((date, f"Unknown food_id: {', '.join(map(str, unknown))}"))
+            del by_date[date]
+    if not by_date:
+        return skipped
+
+    dates = list(by_date)
+    old = {
+        row[0]: row[1:] for row in conn.execute(f"""
+            SELECT date, {", ".join(f"COALESCE({column}, 0)" for column in ROLLUP_COLUMNS)}
+            FROM nutrition_data WHERE user_id = ? AND date IN ({", ".join("?" for _ in dates)})
+        """, (user_id, *dates))
+    }
+    conn.executemany("DELETE FROM meal_items WHERE user_id = ? AND date = ?", [(user_id, date) for date in dates])
+
+    rows, item_rows, changes = [], [], []
+    for date, day in by_date.items():
+        if day["items"] is not None:
+            names = [", ".join(foods[food_id][0] for item_meal, food_id, _ in day["items"] if item_meal == meal) for meal in MEALS]
+            calories, carbs, proteins, fats = meal_totals(foods, day["items"])
+            item_rows.extend((user_id, date, meal, food_id, servings) for meal, food_id, servings in day["items"])
+        else:
+            names = [day.get(meal) or "" for meal in MEALS]
+            calories, carbs, proteins, fats = (day.get(name) or 0 for name in ("calories", "carbs", "proteins", "fats"))
+        water = day.get("water") or 0
+        rows.append((user_id, date, *names, calories, carbs, proteins, fats, water))
+        changes.append((date, old.get(date), (calories, proteins, fats, carbs, water)))
+
+    conn.executemany("""
+        INSERT OR REPLACE INTO nutrition_data
+        (user_id, date, breakfast, lunch, snacks, dinner, calories, carbs, proteins, fats, water, items_backfilled)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+    """, rows)
+    conn.executemany("INSERT INTO meal_items (user_id, date, meal, food_id, servings) VALUES (?, ?, ?, ?, ?)", item_rows)
+    apply_day_changes(conn, user_id, changes)
+    bump_versions(conn, user_id, [nutrition_day(date) for date in dates])
+    return skipped
+
+
+# A day's items with nutrition scaled by servings, shared by the sync and async readers
+MEAL_ITEMS_SQL = f"""
+    SELECT m.item_id, m.meal, m.food_id, f.food_name, f.servings_unit, m.servings,
+           {", ".join(f"f.{column} * m.servings" for _, column in NUTRIENT_COLUMNS)}
+    FROM meal_items m
+    JOIN foods f ON f.food_id = m.food_id
+    WHERE m.user_id = ? AND m.date = ?
+    ORDER BY m.item_id
+"""
+
+
+def meal_item_from_row(row):
+    item = {
+        "item_id": row[0], "meal": row[1], "food_id": row[2], "food_name": row[3],
+        "servings_unit": row[4], "servings": row[5],
+    }
+    for (name, _), value in zip(NUTRIENT_COLUMNS, row[6:]):
+        item[name] = round(value or 0, 2)
+    return item
+
+
+def get_meal_items(conn, user_id: str, date: str):
+    return [meal_item_from_row(row) for row in conn.execute(MEAL_ITEMS_SQL, (user_id, date))]
+
+
+def _split_food_names(text, food_ids_by_name, max_parts=6):
+    """Split a legacy "Idli, Masala dosa" string back into food_ids.
+
+    Some food names contain commas themselves, so the longest run of parts that
+    forms a known name wins. Returns (food_ids, unmatched_names).
+    """
+    parts = text.split(",")
+    food_ids, unmatched = [], []
+    i = 0
+    while i < len(parts):
+        for j in range(min(len(parts), i + max_parts), i, -1):
+            food_id = food_ids_by_name.get(",".join(parts[i:j]).strip().lower())
+            if food_id is not None:
+                food_ids.append(food_id)
+                i = j
+                break
+        else:
+            if parts[i].strip():
+                unmatched.append(parts[i].strip())
+            i += 1
+    return food_ids, unmatched
+
+
+def backfill_meal_items(conn, batch_size: int = 500):
+    """Turn legacy comma-joined meal strings into meal_items rows in batches, within the caller's transaction.
+
+    Each name becomes one item of one serving. The legacy strings do not record
+    servings, so the totals already stored for the day are kept as they are and
+    the week and month rollups are left untouched.
+    """
+    food_ids_by_name = {}
+    for food_id, name in conn.execute("SELECT food_id, food_name FROM foods ORDER BY food_id DESC"):
+        # Same name in several units: the legacy string cannot tell, take the first
+        food_ids_by_name[name.strip().lower()] = food_id
+
+    migrated = 0
+    while True:
+        rows = conn.execute(f"""
+            SELECT rowid, user_id, date, {", ".join(MEALS)}
+            FROM nutrition_data WHERE items_backfilled = 0 LIMIT ?
+        """, (batch_size,)).fetchall()
+        if not rows:
+            return migrated
+
+        for rowid, user_id, date, *meal_texts in rows:
+            items = []
+            for meal, text in zip(MEALS, meal_texts):
+                food_ids, _ = _split_food_names(text or "", food_ids_by_name)
+                items.extend((meal, food_id, 1.0) for food_id in food_ids)
+
+            conn.executemany(
+                "INSERT INTO meal_items (user_id, date, meal, food_id, servings) VALUES (?, ?, ?, ?, ?)",
+                [(user_id, date, meal, food_id, servings) for meal, food_id, servings in items]
+            )
+            conn.execute("UPDATE nutrition_data SET items_backfilled = 1 WHERE rowid = ?", (rowid,))
+            # The day's GET response now lists items
+            bump_versions(conn, user_id, [nutrition_day(date)])
+        migrated += len(rows)
@@ -0,0 +1,44 @@
+import csv
+import io
+import json
+
+FORMATS = {
+    "csv": "text/csv",
+    "json": "application/json",
+}
+
+BULK_REGISTER_MAX_ROWS = 2000
+
+
+class MemberImportError(ValueError):
+    pass
+
+
+def read_member_rows(body: bytes, fmt: str, max_rows: int = BULK_REGISTER_MAX_ROWS):
+    """Parse a bulk registration upload into [(row_no, fields)] ready for RegisterModel.
+
+    CSV rows are numbered by their line in the file (the header is line 1),
+    JSON objects by their position in the array starting at 1. Blank CSV cells
+    are left out so optional fields fall back to their defaults.
+    """
+    text = body.decode("utf-8-sig")
+    if fmt == "json":
+        try:
+            records = json.loads(text)
+        except ValueError as e:
+            raise MemberImportError(f"Invalid JSON: {e}")
+        if not isinstance(records, list):
+            raise MemberImportError("JSON body must be an array of members")
+        rows = list(enumerate(records, start=1))
+    else:
+        reader = csv.DictReader(io.StringIO(text, newline=""))
+        if reader.fieldnames is None or not {"username", "password"} <= set(reader.fieldnames):
+            raise MemberImportError("CSV header must include username and password columns")
+        rows = [
+            (reader.line_num, {key: value for key, value in record.items() if key and value not in ("", None)})
+            for record in reader
+        ]
+
+    if len(rows) > max_rows:
+        raise MemberImportError(f"At most {max_rows} members can be registered at once")
+    return rows
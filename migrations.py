@@ -0,0 +1,98 @@
+"""Schema migrations keyed on SQLite's PRAGMA user_version.
+
+A migration is (version, description, step). Steps run in version order,
+each in its own write transaction that also records the new version, so an
+interrupted upgrade resumes at the first step that did not commit. Steps
+must not commit themselves: that would release the write lock before the
+version is recorded and let another worker run the same step. Steps must
+be idempotent: databases created before versioning start at 0 and
+replay every step over tables that may already exist.
+
+When the database is current, migrate() costs one PRAGMA read.
+
+    python migrations.py [--db pubfitnessstudio.db] [--status]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+
+def schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def pending_migrations(conn, migrations):
+    current = schema_version(conn)
+    return [migration for migration in migrations if migration[0] > current]
+
+
+def migrate(db_name: str, migrations, prepare=None, log=print, lock_timeout: float = 120):
+    """Bring db_name up to the last version in migrations; returns the versions applied.
+
+    prepare(conn) runs before the first pending step, outside any transaction,
+    for settings such as journal_mode that cannot change inside one. A worker
+    that finds another one migrating waits up to lock_timeout seconds for it.
+    """
+    conn = sqlite3.connect(db_name)
+    try:
+        current = schema_version(conn)
+        if current >= migrations[-1][0]:
+            return []
+
+        conn.execute(f"PRAGMA busy_timeout = {int(lock_timeout * 1000)}")
+        if prepare:
+            prepare(conn)
+        applied = []
+        for version, description, step in migrations:
+            if version <= current:
+                continue
+            # Other workers may be starting too: take the write lock, then re-check
+            conn.execute("BEGIN IMMEDIATE")
+            current = schema_version(conn)
+            if version <= current:
+                conn.rollback()
+                continue
+            started = time.perf_counter()
+            try:
+                step(conn)
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            current = version
+            applied.append(version)
+            log(f"Schema version {version}: {description} ({(time.perf_counter() - started) * 1000:.0f} ms)")
+        return applied
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.getenv("DB_NAME", "pubfitnessstudio.db"))
+    parser.add_argument("--status", action="store_true", help="list pending migrations without applying them")
+    args = parser.parse_args()
+
+    os.environ["DB_NAME"] = args.db
+    from db_utils import MIGRATIONS, prepare_database
+
+    if args.status:
+        conn = sqlite3.connect(args.db)
+        try:
+            print(f"Schema version {schema_version(conn)} of {MIGRATIONS[-1][0]}.")
+            for version, description, _ in pending_migrations(conn, MIGRATIONS):
+                print(f"  pending {version}: {description}")
+        finally:
+            conn.close()
+        return 0
+
+    applied = migrate(args.db, MIGRATIONS, prepare_database)
+    print(f"Applied {len(applied)} migrations." if applied else "Schema is up to date.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,34 +1,79 @@
-from pydantic import BaseModel, EmailStr, constr, ValidationError
-from typing import Optional, Literal
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, constr, field_validator, ValidationError
+from typing import List, Optional, Literal
 from datetime import date
 
 
+def _member_role(role: str) -> str:
+    # Free-text roles are accepted as before; anything but admin registers a plain member
+    return role if role in ("user", "admin") else "user"
+
+
 class RegisterModel(BaseModel):
     username: constr(min_length=3, max_length=50)
     password: constr(min_length=6)
     phone_no: Optional[str] = None
     device_id: Optional[str] = None
-    role: str = Literal["user", "admin"]
+    role: str = "user"
     sub_start_date: Optional[str] = None
     sub_end_date: Optional[str] = None
     calories_goal: Optional[int] = None
     proteins_goal: Optional[int] = None
     fats_goal: Optional[int] = None
     carbs_goal: Optional[int] = None
-    gender: str = Literal["male", "female", "other", "prefer_not_to_say"]
+    gender: Optional[str] = None
     dob: str  # Date of birth in YYYY-MM-DD format
     height: Optional[int] = None
     weight: Optional[int] = None
 
+    @field_validator("role")
+    @classmethod
+    def _known_role(cls, role):
+        return _member_role(role)
+
 
 class ContactModel(BaseModel):
     username: constr(min_length=3, max_length=50)
     phone_no: str
     email_id: EmailStr
     message: constr(min_length=10, max_length=1000)
-    preferred_role: str = Literal["user", "admin"]
+    preferred_role: str = "user"
     device_id: Optional[str] = None
-    gender: str = Literal["male", "female", "other", "prefer_not_to_say"]
+    gender: str
     dob: str  # Date of birth in YYYY-MM-DD format
     height: Optional[int] = None
-    weight: Optional[int] = None
\ No newline at end of file
+    weight: Optional[int] = None
+
+    @field_validator("preferred_role")
+    @classmethod
+    def _known_role(cls, role):
+        return _member_role(role)
+
+
+class MealItemModel(BaseModel):
+    meal: Literal["breakfast", "lunch", "snacks", "dinner"]
+    food_id: int
+    servings: float = Field(default=1, gt=0, le=50)
+
+
+class NutritionLogModel(BaseModel):
+    # Rejects the old breakfast/lunch/snacks/dinner strings instead of silently dropping them
+    model_config = ConfigDict(extra="forbid")
+
+    date: date
+    items: List[MealItemModel] = Field(default_factory=list, max_length=200)
+    water: float = Field(default=0, ge=0, le=20)  # Litres
+
+
+class NutritionImportModel(BaseModel):
+    """One day of an imported nutrition history; totals are ignored when items are given."""
+    date: date
+    breakfast: Optional[constr(max_length=2000)] = None
+    lunch: Optional[constr(max_length=2000)] = None
+    snacks: Optional[constr(max_length=2000)] = None
+    dinner: Optional[constr(max_length=2000)] = None
+    calories: Optional[float] = Field(default=None, ge=0)
+    carbs: Optional[float] = Field(default=None, ge=0)
+    proteins: Optional[float] = Field(default=None, ge=0)
+    fats: Optional[float] = Field(default=None, ge=0)
+    water: float = Field(default=0, ge=0, le=20)
+    items: Optional[List[MealItemModel]] = Field(default=None, max_length=200)
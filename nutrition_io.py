@@ -0,0 +1,126 @@
+import csv
+import io
+import json
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Columns of the CSV format; NDJSON lines carry the same keys plus the day's items
+EXPORT_FIELDS = ("date", "breakfast", "lunch", "snacks", "dinner", "calories", "carbs", "proteins", "fats", "water")
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def _text_stream(stream):
+    # Decode lazily; nothing is read before the first record is requested
+    if not isinstance(stream, io.BufferedIOBase):
+        stream = io.BufferedReader(stream)
+    return io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+
+def _read_ndjson(stream):
+    for line_no, line in enumerate(_text_stream(stream), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, "Each line must be a JSON object"
+            continue
+        yield line_no, record, None
+
+
+def _read_csv(stream):
+    reader = csv.DictReader(_text_stream(stream))
+    if reader.fieldnames is None or "date" not in reader.fieldnames:
+        raise ImportFormatError("CSV header must include a date column")
+    for record in reader:
+        # Blank cells mean "not given", not an empty string to validate
+        yield reader.line_num, {key: value for key, value in record.items() if key and value not in ("", None)}, None
+
+
+def read_records(stream, fmt: str):
+    """Yield (line_no, day, error) for every record of an NDJSON or CSV upload, one at a time.
+
+    day is the validated record as a dict with items converted to
+    (meal, food_id, servings) tuples, or None when error says why it was rejected.
+    """
+    # pydantic loads on the first import, not at startup
+    from models import NutritionImportModel
+    from pydantic import ValidationError
+
+    reader = _read_ndjson if fmt == "ndjson" else _read_csv
+    for line_no, record, error in reader(stream):
+        if error:
+            yield line_no, None, error
+            continue
+        try:
+            validated = NutritionImportModel(**record)
+        except ValidationError as e:
+            first = e.errors(include_url=False)[0]
+            yield line_no, None, f"{'.'.join(map(str, first['loc']))}: {first['msg']}"
+            continue
+        day = validated.model_dump(exclude={"items"})
+        day["date"] = validated.date.isoformat()
+        day["items"] = None if validated.items is None else [
+            (item.meal, item.food_id, item.servings) for item in validated.items
+        ]
+        yield line_no, day, None
+
+
+def import_records(records, write_chunk, chunk_size: int = 500, max_errors: int = 50):
+    """Feed validated days to write_chunk in lists of at most chunk_size and tally the outcome.
+
+    write_chunk commits each list in its own transaction and returns the
+    [(date, error)] it skipped, so a failure part-way leaves earlier chunks in place.
+    """
+    summary = {"imported": 0, "skipped": 0, "errors": []}
+
+    def report(where, error):
+        summary["skipped"] += 1
+        if len(summary["errors"]) < max_errors:
+            summary["errors"].append({where[0]: where[1], "error": error})
+
+    def flush(chunk):
+        skipped = write_chunk(chunk)
+        summary["imported"] += len({day["date"] for day in chunk}) - len(skipped)
+        for date, error in skipped:
+            report(("date", date), error)
+
+    chunk = []
+    for line_no, day, error in records:
+        if error:
+            report(("line", line_no), error)
+            continue
+        chunk.append(day)
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+    return summary
+
+
+def ndjson_line(day: dict) -> str:
+    return json.dumps(day, separators=(",", ":")) + "\n"
+
+
+def csv_lines(days):
+    """Render days as CSV text, one line per day, starting with the header."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for day in days:
+        writer.writerow([day.get(field) for field in EXPORT_FIELDS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
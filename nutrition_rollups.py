@@ -0,0 +1,153 @@
+"""Weekly and monthly per-user nutrition rollups, kept in step with nutrition_data.
+
+Every write that changes a day's totals calls apply_day_change() in the same
+transaction, which removes the day's old contribution and adds the new one.
+Run this module to recompute the rollups from scratch and compare them with
+the incrementally maintained values:
+
+    python nutrition_rollups.py [--db pubfitnessstudio.db] [--check-only]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+
+ROLLUP_COLUMNS = ("calories", "proteins", "fats", "carbs", "water")
+
+# bucket -> (table, SQL expression giving the period's first day for a date)
+ROLLUPS = {
+    # Weeks start on Monday
+    "week": ("nutrition_weekly", "date({}, '-6 days', 'weekday 1')"),
+    "month": ("nutrition_monthly", "strftime('%Y-%m-01', {})"),
+}
+
+# Sums are floats; differences below this are rounding, not drift
+TOLERANCE = 0.01
+
+
+def period_sql(bucket: str, column: str) -> str:
+    return ROLLUPS[bucket][1].format(column)
+
+
+def create_rollup_tables(cursor):
+    """Create the rollup tables; returns True if they did not exist yet and need a rebuild."""
+    existing = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    created = False
+    for table, _ in ROLLUPS.values():
+        created = created or table not in existing
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                user_id TEXT NOT NULL,
+                period DATE NOT NULL,
+                days_logged INTEGER NOT NULL DEFAULT 0,
+                {", ".join(f"{column} REAL NOT NULL DEFAULT 0" for column in ROLLUP_COLUMNS)},
+                PRIMARY KEY (user_id, period),
+                FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE
+            )
+        """)
+    return created
+
+
+def day_totals(conn, user_id: str, date: str):
+    """The day's (calories, proteins, fats, carbs, water), or None if nothing is logged."""
+    return conn.execute(f"""
+        SELECT {", ".join(f"COALESCE({column}, 0)" for column in ROLLUP_COLUMNS)}
+        FROM nutrition_data WHERE user_id = ? AND date = ?
+    """, (user_id, date)).fetchone()
+
+
+def apply_day_change(conn, user_id: str, date: str, old, new):
+    """Replace a day's contribution to its week and month: subtract old, add new (either may be None)."""
+    apply_day_changes(conn, user_id, [(date, old, new)])
+
+
+def apply_day_changes(conn, user_id: str, changes):
+    """apply_day_change for many (date, old, new) at once, one executemany per statement."""
+    empty = [0] * len(ROLLUP_COLUMNS)
+    params = []
+    for date, old, new in changes:
+        if old == new:
+            continue
+        days = (new is not None) - (old is not None)
+        deltas = [(n or 0) - (o or 0) for o, n in zip(old or empty, new or empty)]
+        params.append((user_id, date, days, *deltas))
+    if not params:
+        return
+
+    for bucket, (table, _) in ROLLUPS.items():
+        conn.executemany(f"""
+            INSERT INTO {table} (user_id, period, days_logged, {", ".join(ROLLUP_COLUMNS)})
+            VALUES (?, {period_sql(bucket, "?")}, ?, {", ".join("?" for _ in ROLLUP_COLUMNS)})
+            ON CONFLICT (user_id, period) DO UPDATE SET
+                days_logged = days_logged + excluded.days_logged,
+                {", ".join(f"{column} = {column} + excluded.{column}" for column in ROLLUP_COLUMNS)}
+        """, params)
+        conn.executemany(f"""
+            DELETE FROM {table} WHERE user_id = ? AND period = {period_sql(bucket, "?")} AND days_logged <= 0
+        """, [(user_id, date) for user_id, date, *_ in params])
+
+
+def _recompute_sql(bucket: str) -> str:
+    return f"""
+        SELECT user_id, {period_sql(bucket, "date")} AS period, COUNT(*),
+               {", ".join(f"SUM(COALESCE({column}, 0))" for column in ROLLUP_COLUMNS)}
+        FROM nutrition_data
+        GROUP BY user_id, period
+    """
+
+
+def verify_rollups(conn):
+    """Compare stored rollups with a from-scratch recomputation; returns a list of mismatches."""
+    mismatches = []
+    for bucket, (table, _) in ROLLUPS.items():
+        expected = {(row[0], row[1]): row[2:] for row in conn.execute(_recompute_sql(bucket))}
+        stored = {
+            (row[0], row[1]): row[2:]
+            for row in conn.execute(f"SELECT user_id, period, days_logged, {', '.join(ROLLUP_COLUMNS)} FROM {table}")
+        }
+        for key in sorted(expected.keys() | stored.keys()):
+            want, have = expected.get(key), stored.get(key)
+            if want is None or have is None or any(abs(a - b) > TOLERANCE for a, b in zip(want, have)):
+                mismatches.append({
+                    "bucket": bucket, "user_id": key[0], "period": key[1],
+                    "expected": list(want) if want else None, "stored": list(have) if have else None,
+                })
+    return mismatches
+
+
+def rebuild_rollups(conn):
+    """Recompute every rollup from nutrition_data. The caller commits."""
+    for bucket, (table, _) in ROLLUPS.items():
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(f"""
+            INSERT INTO {table} (user_id, period, days_logged, {", ".join(ROLLUP_COLUMNS)})
+            {_recompute_sql(bucket)}
+        """)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.getenv("DB_NAME", "pubfitnessstudio.db"))
+    parser.add_argument("--check-only", action="store_true", help="report mismatches without rebuilding")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        create_rollup_tables(conn.cursor())
+        mismatches = verify_rollups(conn)
+        for mismatch in mismatches:
+            print(f"{mismatch['bucket']} {mismatch['user_id']} {mismatch['period']}: "
+                  f"stored {mismatch['stored']}, expected {mismatch['expected']}")
+        print(f"{len(mismatches)} rollup rows differ from nutrition_data.")
+        if args.check_only:
+            return 1 if mismatches else 0
+        rebuild_rollups(conn)
+        conn.commit()
+        print("Rollups rebuilt.")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+
+from flask import render_template, request
+
+from response_compression import fingerprint, precompress
+
+PAGE_MIMETYPE = "text/html"
+
+
+class _Page:
+    __slots__ = ("etag", "variants", "rendered_at")
+
+    def __init__(self, html: str):
+        body = html.encode("utf-8")
+        self.etag = fingerprint(body)
+        self.variants = precompress(body)
+        self.rendered_at = time.time()
+
+
+class PageCache:
+    """Pages rendered once from templates that take no context, served from memory.
+
+    Every template is rendered and precompressed by render_all() at startup,
+    or else on the first page request. With
+    template auto-reload on (debug mode), a change to any template or static
+    file re-renders the pages on their next request; otherwise they are only
+    rebuilt by restarting. Responses carry a strong ETag and are revalidated
+    before use, while the static assets they link to use fingerprinted,
+    immutable URLs.
+    """
+
+    def __init__(self, app, compressor, templates):
+        self.app = app
+        self.compressor = compressor
+        self.templates = tuple(templates)
+        self._lock = threading.Lock()
+        self._pages = {}
+        self._signature = None
+        self._render_ms = 0.0
+
+    @property
+    def auto_reload(self) -> bool:
+        return self.app.debug or bool(self.app.config.get("TEMPLATES_AUTO_RELOAD"))
+
+    def _source_signature(self):
+        # Newest modification time under the folders the pages are built from
+        newest = 0.0
+        for folder in (os.path.join(self.app.root_path, self.app.template_folder), self.app.static_folder):
+            for root, _, names in os.walk(folder):
+                for name in names:
+                    newest = max(newest, os.stat(os.path.join(root, name)).st_mtime)
+        return newest
+
+    def render_all(self):
+        started = time.perf_counter()
+        signature = self._source_signature()
+        # A request context lets templates build URLs; nothing request-specific is rendered
+        with self.app.test_request_context("/"):
+            pages = {template: _Page(render_template(template)) for template in self.templates}
+        with self._lock:
+            self._pages = pages
+            self._signature = signature
+        self._render_ms = (time.perf_counter() - started) * 1000
+
+    def _page(self, template: str) -> _Page:
+        if self._signature is None or (self.auto_reload and self._source_signature() != self._signature):
+            self.render_all()
+        return self._pages[template]
+
+    def serve(self, template: str):
+        page = self._page(template)
+        route = request.url_rule.rule if request.url_rule else request.path
+        return self.compressor.precompressed_response(page.variants, PAGE_MIMETYPE, page.etag, route)
+
+    def stats(self):
+        return {
+            "render_ms": round(self._render_ms, 1),
+            "pages": {
+                template: {"bytes": len(page.variants[None]), **{
+                    encoding: len(body) for encoding, body in page.variants.items() if encoding
+                }}
+                for template, page in sorted(self._pages.items())
+            },
+        }
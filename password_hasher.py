@@ -0,0 +1,178 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+
+# bcrypt is only needed inside the worker processes
+def _hashpw(password: bytes, rounds: int) -> bytes:
+    import bcrypt
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _checkpw(password: bytes, hashed: bytes) -> bool:
+    import bcrypt
+    return bcrypt.checkpw(password, hashed)
+
+
+def hash_rounds(hashed: str):
+    # "$2b$12$<salt+hash>" -> 12
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed: str, rounds: int = BCRYPT_ROUNDS) -> bool:
+    return hash_rounds(hashed) != rounds
+
+
+class PasswordHasher:
+    """Runs bcrypt in a process pool so hashing never holds the server's GIL.
+
+    At most ``max_concurrency`` operations are submitted at once; further
+    callers wait in a queue whose depth is reported by ``stats``. Like the
+    connection pool, waiters may live on different event loops.
+    """
+
+    def __init__(self, workers=2, max_concurrency=None, rounds=BCRYPT_ROUNDS):
+        self.workers = workers
+        self.max_concurrency = max_concurrency or workers * 2
+        self.rounds = rounds
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self._waiters = deque()  # (loop, future)
+        self._in_flight = 0
+
+        self._completed = 0
+        self._rehashes = 0
+        self._peak_queue_depth = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: workers must not inherit the server's threads and connections. Each
+                # worker re-imports __main__, so a script that hashes passwords must keep its
+                # work under `if __name__ == "__main__":` or the pool breaks on start-up
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    async def _acquire_slot(self):
+        while True:
+            with self._lock:
+                if self._in_flight < self.max_concurrency:
+                    self._in_flight += 1
+                    return
+                loop = asyncio.get_running_loop()
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+                self._peak_queue_depth = max(self._peak_queue_depth, len(self._waiters))
+            try:
+                await waiter
+            except BaseException:
+                with self._lock:
+                    queued = any(item[1] is waiter for item in self._waiters)
+                    if queued:
+                        self._waiters = deque(item for item in self._waiters if item[1] is not waiter)
+                if not queued:
+                    # A release already picked this waiter; hand the wake-up on
+                    self._wake_next()
+                raise
+
+    def _release_slot(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._wake_next()
+
+    def _wake_next(self):
+        with self._lock:
+            if not self._waiters:
+                return
+            loop, waiter = self._waiters.popleft()
+        try:
+            loop.call_soon_threadsafe(self._wake, waiter)
+        except RuntimeError:
+            self._wake_next()
+
+    def _wake(self, waiter):
+        if waiter.done():
+            self._wake_next()
+        else:
+            waiter.set_result(None)
+
+    async def _run(self, fn, *args):
+        queued_at = time.perf_counter()
+        await self._acquire_slot()
+        started_at = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(self._get_executor(), fn, *args)
+            except BrokenProcessPool:
+                # A worker died; start a fresh pool for the next call
+                with self._lock:
+                    self._executor = None
+                raise
+        finally:
+            finished_at = time.perf_counter()
+            with self._lock:
+                self._completed += 1
+                self._total_wait += started_at - queued_at
+                self._total_run += finished_at - started_at
+            self._release_slot()
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._run(_hashpw, password.encode("utf-8"), self.rounds)
+        return hashed.decode("utf-8")
+
+    async def hash_many(self, passwords, concurrency=None):
+        """Hash a batch across the worker processes, returning hashes in input order.
+
+        Only ``concurrency`` (default: one per worker) of the batch queue for a
+        slot at a time, so logins arriving meanwhile wait behind a few bulk
+        hashes rather than the whole batch.
+        """
+        limit = asyncio.Semaphore(concurrency or self.workers)
+
+        async def hash_one(password):
+            async with limit:
+                return await self.hash(password)
+
+        return await asyncio.gather(*(hash_one(password) for password in passwords))
+
+    async def check(self, password: str, hashed: str) -> bool:
+        return await self._run(_checkpw, password.encode("utf-8"), hashed.encode("utf-8"))
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return needs_rehash(hashed, self.rounds)
+
+    def record_rehash(self):
+        with self._lock:
+            self._rehashes += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_concurrency": self.max_concurrency,
+                "rounds": self.rounds,
+                "in_flight": self._in_flight,
+                "queue_depth": len(self._waiters),
+                "peak_queue_depth": self._peak_queue_depth,
+                "completed": self._completed,
+                "rehashes": self._rehashes,
+                "avg_wait_ms": round(self._total_wait * 1000 / self._completed, 3) if self._completed else 0.0,
+                "avg_run_ms": round(self._total_run * 1000 / self._completed, 3) if self._completed else 0.0,
+            }
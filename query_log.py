@@ -0,0 +1,240 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from functools import lru_cache
+
+# Statements taking at least this long are logged with their query plan
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "50"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))
+# Set QUERY_LOG=0 to connect with plain sqlite3 connections
+QUERY_LOG_ENABLED = os.getenv("QUERY_LOG", "1") != "0"
+
+# Distinct statements tracked; anything beyond is counted under OTHER_STATEMENTS
+MAX_STATEMENTS = 1000
+OTHER_STATEMENTS = "<other statements>"
+
+# Only these can be explained; PRAGMA, BEGIN, COMMIT and DDL are timed but not explained
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+# "IN (?, ?, ?)" built for a list of ids is one statement whatever the list length
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql: str) -> str:
+    """The statement with literals replaced by ? and whitespace collapsed, used as its stats key."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    return _PLACEHOLDER_LIST.sub("?, ...", sql)
+
+
+def _redact(value):
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, (str, bytes, memoryview)):
+        return f"<{type(value).__name__}:{len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def redact_params(params):
+    """Parameter types and sizes only: values may be passwords, tokens or personal details."""
+    if isinstance(params, dict):
+        return {name: _redact(value) for name, value in params.items()}
+    return [_redact(value) for value in params]
+
+
+class _StatementStats:
+    __slots__ = ("count", "seconds", "max_seconds", "slow", "plan")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.slow = 0
+        self.plan = None
+
+
+class QueryLog:
+    """Timing of every SQL statement, aggregated by normalized text, and a log of slow ones.
+
+    A statement's time is its execute call plus any fetchone/fetchmany/fetchall
+    calls on the same cursor, so a query whose rows are read later is still
+    timed in full; rows read by iterating the cursor directly are not. The
+    first time a statement is slow, its EXPLAIN QUERY PLAN is captured on the
+    same connection and kept with its stats.
+    """
+
+    def __init__(self, slow_ms: float = SLOW_QUERY_MS, log_size: int = SLOW_QUERY_LOG_SIZE):
+        self.slow_seconds = slow_ms / 1000
+        self._lock = threading.Lock()
+        self._statements = {}
+        self._slow = deque(maxlen=log_size)
+        self._started_at = time.time()
+
+    def _entry(self, key):
+        stats = self._statements.get(key)
+        if stats is None:
+            if len(self._statements) >= MAX_STATEMENTS:
+                key = OTHER_STATEMENTS
+                stats = self._statements.get(key)
+            if stats is None:
+                stats = self._statements[key] = _StatementStats()
+        return stats
+
+    def record(self, conn, key, sql, params, seconds, previous=None):
+        """Add seconds of work on one execution of sql; previous is its time so far, when fetching rows."""
+        total = seconds if previous is None else previous + seconds
+        crossed = total >= self.slow_seconds and (previous is None or previous < self.slow_seconds)
+        with self._lock:
+            stats = self._entry(key)
+            if previous is None:
+                stats.count += 1
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, total)
+            if crossed:
+                stats.slow += 1
+                explain = stats.plan is None
+        if crossed:
+            self._log_slow(conn, stats, key, sql, params, total, explain)
+        return total
+
+    def _log_slow(self, conn, stats, key, sql, params, seconds, explain):
+        if explain:
+            plan = self.explain(conn, sql, params)
+            with self._lock:
+                stats.plan = plan
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "ms": round(seconds * 1000, 3),
+            "sql": key,
+            "params": redact_params(params) if params is not None else None,
+            "plan": stats.plan,
+        }
+        with self._lock:
+            self._slow.append(entry)
+        print(f"Slow query ({entry['ms']} ms): {key}")
+
+    def explain(self, conn, sql, params):
+        if not sql.lstrip().upper().startswith(_EXPLAINABLE) or params is None:
+            return None
+        try:
+            # A plain cursor, so the EXPLAIN itself is not timed
+            cursor = sqlite3.Cursor(conn)
+            return [row[3] for row in cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        except sqlite3.Error as e:
+            return [f"EXPLAIN failed: {e}"]
+
+    def stats(self, top: int = 20, sort: str = "total"):
+        sort_keys = {
+            "total": lambda item: item[1].seconds,
+            "avg": lambda item: item[1].seconds / item[1].count if item[1].count else 0.0,
+            "max": lambda item: item[1].max_seconds,
+            "count": lambda item: item[1].count,
+            "slow": lambda item: item[1].slow,
+        }
+        if sort not in sort_keys:
+            raise ValueError(f"sort must be one of: {', '.join(sort_keys)}")
+        with self._lock:
+            ranked = sorted(self._statements.items(), key=sort_keys[sort], reverse=True)[:top]
+            statements = [
+                {
+                    "sql": key,
+                    "count": stats.count,
+                    "total_ms": round(stats.seconds * 1000, 3),
+                    "avg_ms": round(stats.seconds * 1000 / stats.count, 3) if stats.count else 0.0,
+                    "max_ms": round(stats.max_seconds * 1000, 3),
+                    "slow": stats.slow,
+                    "plan": stats.plan,
+                }
+                for key, stats in ranked
+            ]
+            return {
+                "slow_query_ms": self.slow_seconds * 1000,
+                "since": datetime.fromtimestamp(self._started_at, timezone.utc).isoformat(timespec="seconds"),
+                "distinct_statements": len(self._statements),
+                "executions": sum(stats.count for stats in self._statements.values()),
+                "statements": statements,
+                "recent_slow": list(self._slow),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._slow.clear()
+            self._started_at = time.time()
+
+
+query_log = QueryLog()
+
+
+class LoggedCursor(sqlite3.Cursor):
+    """A cursor whose statements and fetches are timed into query_log."""
+
+    _last = None  # (key, sql, params, seconds so far) of the statement being read
+
+    def _timed(self, sql, params, run):
+        started = time.perf_counter()
+        try:
+            return run()
+        finally:
+            seconds = time.perf_counter() - started
+            key = normalize_sql(sql)
+            total = query_log.record(self.connection, key, sql, params, seconds)
+            self._last = (key, sql, params, total)
+
+    def execute(self, sql, parameters=()):
+        return self._timed(sql, parameters, lambda: super(LoggedCursor, self).execute(sql, parameters))
+
+    def executemany(self, sql, seq_of_parameters):
+        # Parameters of the first row, when they can be read without consuming an iterator
+        first = seq_of_parameters[0] if isinstance(seq_of_parameters, (list, tuple)) and seq_of_parameters else None
+        return self._timed(sql, first, lambda: super(LoggedCursor, self).executemany(sql, seq_of_parameters))
+
+    def _fetch(self, fetch, *args):
+        if self._last is None:
+            return fetch(*args)
+        started = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            key, sql, params, previous = self._last
+            total = query_log.record(self.connection, key, sql, params, time.perf_counter() - started, previous)
+            self._last = (key, sql, params, total)
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, *args):
+        return self._fetch(super().fetchmany, *args)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+
+class LoggedConnection(sqlite3.Connection):
+    """sqlite3 connection factory whose statements go through LoggedCursor.
+
+    Connection.execute and executemany are overridden too: the built-in ones
+    call the cursor's C implementation directly.
+    """
+
+    def cursor(self, factory=LoggedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connection_factory():
+    return LoggedConnection if QUERY_LOG_ENABLED else sqlite3.Connection
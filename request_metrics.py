@@ -0,0 +1,159 @@
+import hmac
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, request
+
+from async_runner import database_seconds
+from auth_utils import decode_token
+
+# Upper bounds in seconds, the Prometheus client defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# /metrics takes an admin's access token, or this static token for scrapers when set
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Requests that matched no route share one label, so scanners cannot grow the series without bound
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class _RouteStats:
+    __slots__ = ("buckets", "count", "seconds", "db_seconds", "in_flight", "statuses")
+
+    def __init__(self):
+        # Per-bucket counts; made cumulative only when rendered
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.seconds = 0.0
+        self.db_seconds = 0.0
+        self.in_flight = 0
+        self.statuses = {}
+
+
+class RequestMetrics:
+    """Per-route request latency, status codes, in-flight requests and database time.
+
+    Routes are labelled by their URL rule, so /api/nutrition-data/<date> is one
+    series whatever the date. Database time is how long the request held or
+    waited for pooled connections and the writer, not the password hashing or
+    image work that also runs in run_async. A request costs two perf_counter
+    reads, a bisect and one short lock; all formatting happens when /metrics is
+    scraped.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._routes = {}
+        self.started_at = time.time()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # Register before other extensions: before_request hooks run in order and
+        # after_request hooks in reverse, so the timing includes their work
+        app.before_request(self._start)
+        app.after_request(self._status)
+        app.teardown_request(self._finish)
+        app.add_url_rule("/metrics", "metrics", self._metrics_view, methods=["GET"])
+        app.extensions["request_metrics"] = self
+
+    def _route(self, key):
+        stats = self._routes.get(key)
+        if stats is None:
+            stats = self._routes[key] = _RouteStats()
+        return stats
+
+    def _start(self):
+        key = (request.url_rule.rule if request.url_rule else UNMATCHED_ROUTE, request.method)
+        g._metrics = (key, time.perf_counter(), database_seconds())
+        with self._lock:
+            self._route(key).in_flight += 1
+
+    def _status(self, response):
+        g._metrics_status = response.status_code
+        return response
+
+    def _finish(self, error=None):
+        started = g.pop("_metrics", None)
+        if started is None:
+            return
+        key, started_at, database_at = started
+        seconds = time.perf_counter() - started_at
+        db_seconds = database_seconds() - database_at
+        # No response means an exception escaped the view and its handlers
+        status = g.pop("_metrics_status", 500)
+        bucket = bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            stats = self._route(key)
+            stats.in_flight -= 1
+            stats.buckets[bucket] += 1
+            stats.count += 1
+            stats.seconds += seconds
+            stats.db_seconds += db_seconds
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    @staticmethod
+    def _authorized() -> bool:
+        auth_header = request.headers.get("Authorization", "")
+        if not auth_header.startswith("Bearer "):
+            return False
+        token = auth_header[len("Bearer "):]
+        if METRICS_TOKEN and hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+            return True
+        # Per-route traffic and timings are not public: anyone else must be an admin
+        return decode_token(token).get("role") == "admin"
+
+    def _metrics_view(self):
+        if not self._authorized():
+            return Response("Unauthorized\n", 401, content_type=CONTENT_TYPE)
+        response = Response(self.render(), content_type=CONTENT_TYPE)
+        response.cache_control.no_store = True
+        return response
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        with self._lock:
+            routes = sorted(
+                (key, stats.buckets[:], stats.count, stats.seconds, stats.db_seconds, stats.in_flight, dict(stats.statuses))
+                for key, stats in self._routes.items()
+            )
+
+        requests = ["# HELP http_requests_total Requests completed, by route, method and status code.",
+                    "# TYPE http_requests_total counter"]
+        latency = ["# HELP http_request_duration_seconds Time from routing to the end of the request.",
+                   "# TYPE http_request_duration_seconds histogram"]
+        database = ["# HELP http_request_db_seconds_total Time requests spent holding or waiting for database connections and the writer.",
+                    "# TYPE http_request_db_seconds_total counter"]
+        in_flight = ["# HELP http_requests_in_flight Requests currently being handled.",
+                     "# TYPE http_requests_in_flight gauge"]
+
+        for (route, method), buckets, count, seconds, db_seconds, active, statuses in routes:
+            for status, total in sorted(statuses.items()):
+                requests.append(f"http_requests_total{_labels(route=route, method=method, status=status)} {total}")
+            cumulative = 0
+            for bound, observed in zip(LATENCY_BUCKETS, buckets):
+                cumulative += observed
+                latency.append(f"http_request_duration_seconds_bucket{_labels(route=route, method=method, le=bound)} {cumulative}")
+            labels = _labels(route=route, method=method)
+            latency.append(f"http_request_duration_seconds_bucket{_labels(route=route, method=method, le='+Inf')} {count}")
+            latency.append(f"http_request_duration_seconds_sum{labels} {seconds}")
+            latency.append(f"http_request_duration_seconds_count{labels} {count}")
+            database.append(f"http_request_db_seconds_total{labels} {db_seconds}")
+            in_flight.append(f"http_requests_in_flight{labels} {active}")
+
+        process = ["# HELP process_start_time_seconds Start time of the process since the Unix epoch.",
+                   "# TYPE process_start_time_seconds gauge",
+                   f"process_start_time_seconds {self.started_at}"]
+        return "\n".join(requests + latency + database + in_flight + process) + "\n"
@@ -0,0 +1,46 @@
+"""Per-user version counters for responses that clients revalidate with ETags.
+
+Each write that changes what GET /api/user-goals, /api/user-profile or
+/api/nutrition-data/<date> returns bumps the matching counter in the same
+transaction. Reading one counter is enough to answer If-None-Match.
+"""
+
+GOALS = "goals"
+PROFILE = "profile"
+
+
+def nutrition_day(date: str) -> str:
+    return f"nutrition:{date}"
+
+
+def create_version_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS resource_versions (
+            user_id TEXT NOT NULL,
+            resource TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            PRIMARY KEY (user_id, resource)
+        ) WITHOUT ROWID
+    """)
+
+
+BUMP_VERSION_SQL = """
+    INSERT INTO resource_versions (user_id, resource, version) VALUES (?, ?, 1)
+    ON CONFLICT (user_id, resource) DO UPDATE SET version = version + 1
+"""
+
+VERSION_SQL = "SELECT version FROM resource_versions WHERE user_id = ? AND resource = ?"
+
+
+def bump_versions(conn, user_id: str, resources):
+    conn.executemany(BUMP_VERSION_SQL, [(user_id, resource) for resource in resources])
+
+
+def resource_etag(user_id: str, resource: str, version: int, revision: str = None) -> str:
+    """Strong ETag (unquoted) for a user's resource at a version.
+
+    The user id is part of the tag because browsers cache by URL alone, and
+    the same URL returns a different user's data after switching accounts.
+    """
+    tag = f"{user_id}.{resource}.{version}"
+    return f"{tag}.{revision}" if revision else tag
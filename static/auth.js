@@ -0,0 +1,120 @@
+// Keeps the short-lived access token fresh using the refresh token stored at login.
+// Included by the base templates with data-token-key / data-refresh-key set per role.
+(function () {
+    const script = document.currentScript;
+    const tokenKey = script.dataset.tokenKey;
+    const refreshKey = script.dataset.refreshKey;
+    const REFRESH_MARGIN_SECONDS = 60;
+
+    const originalFetch = window.fetch.bind(window);
+    let refreshing = null;
+
+    function tokenExpiry(token) {
+        try {
+            return JSON.parse(atob(token.split('.')[1])).exp || 0;
+        } catch (e) {
+            return 0;
+        }
+    }
+
+    async function refreshAccessToken() {
+        const refreshToken = localStorage.getItem(refreshKey);
+        if (!refreshToken) {
+            return null;
+        }
+        try {
+            const response = await originalFetch('/api/token/refresh', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ refresh_token: refreshToken })
+            });
+            const result = await response.json();
+            if (result.status !== 'success') {
+                localStorage.removeItem(refreshKey);
+                return null;
+            }
+            localStorage.setItem(tokenKey, result.token);
+            localStorage.setItem(refreshKey, result.refresh_token);
+            return result.token;
+        } catch (e) {
+            console.error('Token refresh failed');
+            return null;
+        }
+    }
+
+    // Returns a token that is valid for at least REFRESH_MARGIN_SECONDS, refreshing it if needed.
+    // Concurrent callers share a single refresh request.
+    async function ensureFreshToken() {
+        const token = localStorage.getItem(tokenKey);
+        if (token && tokenExpiry(token) - Date.now() / 1000 > REFRESH_MARGIN_SECONDS) {
+            return token;
+        }
+        if (!refreshing) {
+            refreshing = refreshAccessToken().finally(() => { refreshing = null; });
+        }
+        return (await refreshing) || token;
+    }
+
+    function bearerHeader(headers) {
+        if (!headers) {
+            return null;
+        }
+        if (headers instanceof Headers) {
+            return headers.get('Authorization');
+        }
+        return headers['Authorization'] || null;
+    }
+
+    // Pages build their Authorization header from localStorage at call time; swap in a
+    // fresh token before the request goes out so they never see an expired one.
+    window.fetch = async function (input, init) {
+        const auth = bearerHeader(init && init.headers);
+        if (auth && auth.startsWith('Bearer ')) {
+            const token = await ensureFreshToken();
+            if (token && auth !== `Bearer ${token}`) {
+                let headers;
+                if (init.headers instanceof Headers) {
+                    headers = new Headers(init.headers);
+                    headers.set('Authorization', `Bearer ${token}`);
+                } else {
+                    headers = { ...init.headers, 'Authorization': `Bearer ${token}` };
+                }
+                init = { ...init, headers };
+            }
+        }
+        return originalFetch(input, init);
+    };
+
+    window.ensureFreshToken = ensureFreshToken;
+
+    // Profile images need the access token, which an <img src> cannot send: fetch the
+    // image and show it through an object URL instead.
+    window.loadProtectedImage = async function (img, url) {
+        try {
+            const response = await window.fetch(url, {
+                headers: { 'Authorization': `Bearer ${localStorage.getItem(tokenKey)}` }
+            });
+            if (!response.ok) {
+                return;
+            }
+            const objectUrl = URL.createObjectURL(await response.blob());
+            img.addEventListener('load', () => URL.revokeObjectURL(objectUrl), { once: true });
+            img.src = objectUrl;
+        } catch (e) {
+            console.error('Error loading image:', e);
+        }
+    };
+
+    window.revokeRefreshToken = function () {
+        const refreshToken = localStorage.getItem(refreshKey);
+        localStorage.removeItem(refreshKey);
+        if (refreshToken) {
+            originalFetch('/api/token/revoke', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ refresh_token: refreshToken }),
+                keepalive: true
+            }).catch(() => {});
+        }
+    };
+})();
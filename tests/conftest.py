@@ -0,0 +1,72 @@
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+# db_utils binds its pool and writer to DB_NAME when imported: point the whole session at a
+# scratch database, and keep bcrypt cheap
+os.environ["DB_NAME"] = os.path.join(tempfile.mkdtemp(prefix="pubfit-tests-"), "test.db")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "1")
+os.environ.setdefault("IMAGE_WORKERS", "1")
+
+import db_utils  # noqa: E402
+from migrations import migrate  # noqa: E402
+
+
+def _quiet(message):
+    pass
+
+
+@pytest.fixture
+def migrated_db(tmp_path):
+    """Path of a fresh database with every migration applied; separate from the app's database."""
+    db_name = str(tmp_path / "migrated.db")
+    migrate(db_name, db_utils.MIGRATIONS, db_utils.prepare_database, log=_quiet)
+    return db_name
+
+
+@pytest.fixture(scope="session")
+def app_db():
+    """The database db_utils' pool and writer use, migrated once for the session."""
+    db_utils.create_tables()
+    return db_utils.DB_NAME
+
+
+@pytest.fixture(scope="session")
+def client(app_db):
+    import main
+    main.prepare()
+    return main.app.test_client()
+
+
+@pytest.fixture
+def conn(migrated_db):
+    connection = sqlite3.connect(migrated_db)
+    yield connection
+    connection.close()
+
+
+def add_user(conn, username, **fields):
+    """Insert a member straight into users; returns their user_id."""
+    user_id = f"user-{username}"
+    columns = {"user_id": user_id, "role": "user", "username": username, "password": "x", **fields}
+    conn.execute(
+        f"INSERT INTO users ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+        list(columns.values())
+    )
+    return user_id
+
+
+def bearer(user_id, username, role="user"):
+    """Authorization header carrying a fresh access token."""
+    from auth_utils import generate_token
+    return {"Authorization": f"Bearer {generate_token(user_id, username, role)}"}
+
+
+def add_member(db_name, username, **fields):
+    """Register a member with a live subscription in db_name; returns their Authorization header."""
+    with sqlite3.connect(db_name) as conn:
+        user_id = add_user(conn, username, sub_end_date="2030-12-31", **fields)
+    return bearer(user_id, username)
@@ -0,0 +1,43 @@
+import sqlite3
+
+from conftest import add_user, bearer
+
+ADMIN = bearer("test-admin", "PubFit", "admin")
+
+
+def test_bulk_register_creates_valid_rows_and_reports_the_rest(client, app_db):
+    with sqlite3.connect(app_db) as conn:
+        add_user(conn, "bulk-taken")
+    upload = "\n".join([
+        "username,password,dob,role,gender,sub_end_date",
+        "bulk-ann,Secret@123,1990-01-01,,female,2030-12-31",
+        "bulk-bob,short,1990-01-01,,",               # password too short
+        "bulk-ann,Secret@456,1991-01-01,,",          # repeated in the upload
+        "bulk-taken,Secret@123,1990-01-01,,",        # already registered
+        "bulk-cat,Secret@123,,,",                    # no date of birth
+        "bulk-dan,Secret@123,1992-02-02,admin,male",
+    ]).encode()
+
+    response = client.post("/api/register/bulk", data=upload, headers={**ADMIN, "Content-Type": "text/csv"})
+
+    assert response.status_code == 200
+    result = response.get_json()
+    assert (result["received"], result["created"], result["failed"]) == (6, 2, 4)
+    assert [(user["row"], user["username"], user["role"]) for user in result["users"]] == [
+        (2, "bulk-ann", "user"), (7, "bulk-dan", "admin"),
+    ]
+    assert [(error["row"], error["username"]) for error in result["errors"]] == [
+        (3, "bulk-bob"), (4, "bulk-ann"), (5, "bulk-taken"), (6, "bulk-cat"),
+    ]
+    assert result["errors"][1]["errors"] == ["Username appears earlier in the upload"]
+    assert result["errors"][2]["errors"] == ["Username already exists"]
+    assert result["errors"][3]["errors"][0].startswith("dob:")
+
+    with sqlite3.connect(app_db) as conn:
+        assert conn.execute(
+            "SELECT username, role FROM users WHERE username LIKE 'bulk-%' ORDER BY username"
+        ).fetchall() == [("bulk-ann", "user"), ("bulk-dan", "admin"), ("bulk-taken", "user")]
+
+    # The created members can log in with the passwords from the upload
+    login = client.post("/api/login", json={"username": "bulk-ann", "password": "Secret@123"}).get_json()
+    assert login["status"] == "success"
@@ -0,0 +1,62 @@
+import sqlite3
+
+import pytest
+
+from conftest import add_member
+
+
+@pytest.fixture
+def member(app_db, request):
+    return add_member(app_db, request.node.name[:50], dob="1990-01-01")
+
+
+def _get(client, url, headers, etag=None):
+    return client.get(url, headers={**headers, **({"If-None-Match": etag} if etag else {})})
+
+
+def _assert_not_modified(response):
+    assert response.status_code == 304
+    assert response.get_data() == b""
+    assert {"private", "no-cache"} <= set(response.headers["Cache-Control"].replace(" ", "").split(","))
+
+
+@pytest.mark.parametrize("url", ["/api/user-goals", "/api/user-profile", "/api/nutrition-data/2025-06-01"])
+def test_unchanged_resource_answers_304(client, member, url):
+    first = _get(client, url, member)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    _assert_not_modified(_get(client, url, member, etag))
+    # The tag a compressed copy went out under matches as well
+    _assert_not_modified(_get(client, url, member, f'{etag[:-1]}-gzip"'))
+    assert _get(client, url, member, '"something-else"').status_code == 200
+
+
+def test_goal_update_changes_goals_and_profile_tags(client, member):
+    tags = {url: _get(client, url, member).headers["ETag"] for url in ("/api/user-goals", "/api/user-profile")}
+
+    update = client.put("/api/update-goals", headers=member, json={
+        "calories_goal": 1800, "proteins_goal": 120, "fats_goal": 60, "carbs_goal": 200,
+    })
+    assert update.get_json()["status"] == "success"
+
+    for url, etag in tags.items():
+        response = _get(client, url, member, etag)
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+    assert _get(client, "/api/user-goals", member).get_json()["goals"]["calories_goal"] == 1800
+
+
+def test_saving_a_day_changes_only_that_days_tag(client, member, app_db):
+    with sqlite3.connect(app_db) as conn:
+        food_id = conn.execute("SELECT MIN(food_id) FROM foods").fetchone()[0]
+    saved, other = "/api/nutrition-data/2025-06-01", "/api/nutrition-data/2025-06-02"
+    saved_tag, other_tag = _get(client, saved, member).headers["ETag"], _get(client, other, member).headers["ETag"]
+
+    result = client.post("/api/nutrition-data", headers=member, json={
+        "date": "2025-06-01", "items": [{"meal": "lunch", "food_id": food_id, "servings": 1}],
+    }).get_json()
+    assert result["status"] == "success"
+
+    assert _get(client, saved, member, saved_tag).status_code == 200
+    _assert_not_modified(_get(client, other, member, other_tag))
@@ -0,0 +1,46 @@
+import io
+import sqlite3
+
+from PIL import Image
+
+import db_utils
+from conftest import add_user
+from image_pipeline import VARIANT_SIZES
+from image_store import add_missing_variants
+from migrations import migrate
+
+
+def _png(width, height):
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 40, 40)).save(out, "PNG")
+    return out.getvalue()
+
+
+def test_inline_images_get_thumbnails_when_migrated(tmp_path):
+    db_name = str(tmp_path / "legacy.db")
+    # A database from before the image store, with pictures still inline in users
+    migrate(db_name, db_utils.MIGRATIONS[:4], db_utils.prepare_database, log=lambda message: None)
+    with sqlite3.connect(db_name) as conn:
+        photo = add_user(conn, "photo", profile_img=_png(300, 200))
+        broken = add_user(conn, "broken", profile_img=b"not an image")
+
+    migrate(db_name, db_utils.MIGRATIONS, db_utils.prepare_database, log=lambda message: None)
+
+    with sqlite3.connect(db_name) as conn:
+        thumbnails = conn.execute("""
+            SELECT v.variant, b.mime_type, b.data
+            FROM profile_images p
+            JOIN image_variants v ON v.source_hash = p.content_hash
+            JOIN image_blobs b ON b.content_hash = v.variant_hash
+            WHERE p.user_id = ?
+            ORDER BY CAST(v.variant AS INTEGER)
+        """, (photo,)).fetchall()
+        assert [(variant, mime_type) for variant, mime_type, _ in thumbnails] == [
+            (str(size), "image/webp") for size in VARIANT_SIZES
+        ]
+        for size, (_, _, data) in zip(VARIANT_SIZES, thumbnails):
+            assert Image.open(io.BytesIO(data)).size == (size, size)
+
+        # An image that cannot be decoded keeps its original and is not retried forever
+        assert conn.execute("SELECT COUNT(*) FROM profile_images WHERE user_id = ?", (broken,)).fetchone() == (1,)
+        assert add_missing_variants(conn) == 0
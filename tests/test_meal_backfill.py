@@ -0,0 +1,41 @@
+from conftest import add_user
+from meal_store import backfill_meal_items
+from nutrition_rollups import ROLLUPS, rebuild_rollups
+
+TOTALS_SQL = "SELECT date, calories, carbs, proteins, fats, water FROM nutrition_data WHERE user_id = ? ORDER BY date"
+
+
+def _rollups(conn):
+    return {table: sorted(conn.execute(f"SELECT * FROM {table}")) for table, _ in ROLLUPS.values()}
+
+
+def test_backfill_adds_items_and_keeps_totals_and_rollups(conn):
+    (first_id, first), (second_id, second) = conn.execute("""
+        SELECT MIN(food_id), food_name FROM foods WHERE food_name NOT LIKE '%,%'
+        GROUP BY lower(trim(food_name)) ORDER BY MIN(food_id) LIMIT 2
+    """).fetchall()
+    user_id = add_user(conn, "legacy")
+    legacy_days = [
+        # Two servings of the first food were logged; the names cannot show that
+        ("2025-03-03", first, "", second, None, 812.5, 40.0, 30.25, 20.0, 1.5),
+        # Only the totals were kept
+        ("2025-03-04", "", None, "", "", 640.0, 55.0, 21.0, 18.0, 0.0),
+        ("2025-03-12", "Grandma's curry", "", "", "", 300.0, 10.0, 5.0, 12.0, 0.5),
+    ]
+    conn.executemany("""
+        INSERT INTO nutrition_data
+        (user_id, date, breakfast, lunch, snacks, dinner, calories, carbs, proteins, fats, water, items_backfilled)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+    """, [(user_id, *day) for day in legacy_days])
+    rebuild_rollups(conn)
+    totals = conn.execute(TOTALS_SQL, (user_id,)).fetchall()
+    rollups = _rollups(conn)
+
+    assert backfill_meal_items(conn) == 3
+
+    assert conn.execute(TOTALS_SQL, (user_id,)).fetchall() == totals
+    assert _rollups(conn) == rollups
+    assert conn.execute(
+        "SELECT date, meal, food_id, servings FROM meal_items WHERE user_id = ? ORDER BY item_id", (user_id,)
+    ).fetchall() == [("2025-03-03", "breakfast", first_id, 1.0), ("2025-03-03", "snacks", second_id, 1.0)]
+    assert conn.execute("SELECT COUNT(*) FROM nutrition_data WHERE items_backfilled = 0").fetchone() == (0,)
@@ -0,0 +1,59 @@
+import sqlite3
+
+import pytest
+
+import db_utils
+from migrations import migrate, schema_version
+
+
+def _quiet(message):
+    pass
+
+
+def _schema(db_name):
+    with sqlite3.connect(db_name) as conn:
+        return schema_version(conn), sorted(conn.execute("SELECT type, name, sql FROM sqlite_master"))
+
+
+def test_failing_step_rolls_back_and_keeps_the_version(tmp_path):
+    db_name = str(tmp_path / "failing.db")
+
+    def create(conn):
+        conn.execute("CREATE TABLE notes (body TEXT)")
+
+    def half_done(conn):
+        conn.execute("INSERT INTO notes (body) VALUES ('written before the failure')")
+        conn.execute("ALTER TABLE notes ADD COLUMN author TEXT")
+        raise RuntimeError("step 2 failed")
+
+    with pytest.raises(RuntimeError, match="step 2 failed"):
+        migrate(db_name, [(1, "create", create), (2, "fill", half_done)], log=_quiet)
+
+    with sqlite3.connect(db_name) as conn:
+        assert schema_version(conn) == 1
+        assert conn.execute("SELECT COUNT(*) FROM notes").fetchone() == (0,)
+        assert [row[1] for row in conn.execute("PRAGMA table_info(notes)")] == ["body"]
+
+    # Once fixed, the upgrade resumes at the step that failed
+    def fill(conn):
+        conn.execute("INSERT INTO notes (body) VALUES ('written')")
+
+    assert migrate(db_name, [(1, "create", create), (2, "fill", fill)], log=_quiet) == [2]
+
+
+def test_rerunning_migrations_is_a_no_op(migrated_db):
+    before = _schema(migrated_db)
+
+    assert migrate(migrated_db, db_utils.MIGRATIONS, db_utils.prepare_database, log=_quiet) == []
+    assert _schema(migrated_db) == before
+    assert before[0] == db_utils.MIGRATIONS[-1][0]
+
+
+def test_migrations_leave_exactly_the_listed_indexes(conn):
+    created = {
+        row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name IN ('users', 'registrations', 'refresh_tokens')"
+            " AND sql IS NOT NULL"
+        )
+    }
+    assert created == {name for name, _, _, _ in db_utils.INDEXES}
@@ -0,0 +1,50 @@
+import sqlite3
+
+import pytest
+
+from conftest import bearer
+
+ADMIN = bearer("test-admin", "PubFit", "admin")
+
+
+def _member(username, **fields):
+    return {"username": username, "password": "Secret@123", "dob": "1990-01-01", **fields}
+
+
+@pytest.mark.parametrize("role, gender, stored_role", [
+    ("admin", "female", "admin"),
+    ("Admin", "F", "user"),      # roles other than user and admin have always registered members
+    ("trainer", None, "user"),
+])
+def test_register_accepts_free_text_role_and_gender(client, role, gender, stored_role):
+    fields = {"role": role} if gender is None else {"role": role, "gender": gender}
+    result = client.post("/api/register", json=_member(f"lenient-{role}", **fields), headers=ADMIN).get_json()
+    assert (result["status"], result["role"]) == ("success", stored_role)
+
+
+def test_register_defaults_role_to_user(client):
+    result = client.post("/api/register", json=_member("no-role"), headers=ADMIN).get_json()
+    assert (result["status"], result["role"]) == ("success", "user")
+
+
+def _contact(username, **fields):
+    return {
+        "username": username, "phone_no": "9000000000", "email_id": f"{username}@example.com",
+        "message": "Please add me to the gym", "dob": "1995-05-05", **fields,
+    }
+
+
+def test_contact_admin_accepts_free_text_gender_and_role(client, app_db):
+    result = client.post("/api/contact-admin", json=_contact("contact-free", gender="Woman", preferred_role="coach")).get_json()
+    assert result["status"] == "success"
+    with sqlite3.connect(app_db) as conn:
+        assert conn.execute(
+            "SELECT gender, preferred_role FROM registrations WHERE registration_id = ?", (result["registration_id"],)
+        ).fetchone() == ("Woman", "user")
+
+
+def test_contact_admin_still_requires_gender(client):
+    # registrations.gender is NOT NULL, so a request without it never could be stored
+    result = client.post("/api/contact-admin", json=_contact("contact-nogender")).get_json()
+    assert result["status"] == "failure"
+    assert "gender" in result["message"]
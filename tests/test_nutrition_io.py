@@ -0,0 +1,59 @@
+import json
+import sqlite3
+
+from conftest import add_member
+
+
+def _import(client, headers, body, fmt):
+    response = client.post(f"/api/nutrition-data/import?format={fmt}", data=body, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def _export(client, headers, fmt):
+    response = client.get(f"/api/nutrition-data/export?format={fmt}", headers=headers)
+    assert response.status_code == 200
+    return response.get_data(as_text=True)
+
+
+def _history(client, headers, food_ids):
+    first, second = food_ids
+    lines = [
+        {"date": "2025-05-01", "water": 1.5, "items": [
+            {"meal": "breakfast", "food_id": first, "servings": 2},
+            {"meal": "dinner", "food_id": second, "servings": 0.5},
+        ]},
+        # Carried over from another tracker: names and totals, no items
+        {"date": "2025-05-02", "breakfast": "Oats", "lunch": "Rice, Dal", "calories": 1650.5,
+         "carbs": 210, "proteins": 70.25, "fats": 40, "water": 2},
+    ]
+    body = "\n".join(json.dumps(line) for line in lines)
+    body += '\n{"date": "2025-05-03", "items": [\nnot json\n{"date": "2025-05-04", "items": [{"meal": "lunch", "food_id": -1}]}\n'
+    return _import(client, headers, body, "ndjson")
+
+
+def _food_ids(app_db):
+    with sqlite3.connect(app_db) as conn:
+        return [row[0] for row in conn.execute("SELECT food_id FROM foods ORDER BY food_id LIMIT 2")]
+
+
+def test_ndjson_export_imports_back_unchanged(client, app_db):
+    source, copy = add_member(app_db, "ndjson-source"), add_member(app_db, "ndjson-copy")
+    summary = _history(client, source, _food_ids(app_db))
+    assert (summary["imported"], summary["skipped"]) == (2, 3)
+    assert [error.get("line", error.get("date")) for error in summary["errors"]] == [3, 4, "2025-05-04"]
+
+    exported = _export(client, source, "ndjson")
+    assert [json.loads(line)["date"] for line in exported.splitlines()] == ["2025-05-01", "2025-05-02"]
+    assert _import(client, copy, exported, "ndjson")["imported"] == 2
+    assert _export(client, copy, "ndjson") == exported
+
+
+def test_csv_export_imports_back_unchanged(client, app_db):
+    source, copy = add_member(app_db, "csv-source"), add_member(app_db, "csv-copy")
+    _history(client, source, _food_ids(app_db))
+
+    exported = _export(client, source, "csv")
+    assert exported.splitlines()[0] == "date,breakfast,lunch,snacks,dinner,calories,carbs,proteins,fats,water"
+    assert _import(client, copy, exported, "csv") == {"status": "success", "imported": 2, "skipped": 0, "errors": []}
+    assert _export(client, copy, "csv") == exported
@@ -0,0 +1,18 @@
+import pytest
+
+import db_utils
+
+
+@pytest.fixture(scope="module")
+def query_plans(tmp_path_factory):
+    from migrations import migrate
+    db_name = str(tmp_path_factory.mktemp("plans") / "plans.db")
+    migrate(db_name, db_utils.MIGRATIONS, db_utils.prepare_database, log=lambda message: None)
+    return db_utils.check_hot_query_plans(db_name)
+
+
+@pytest.mark.parametrize("name", [name for name, _, _, _ in db_utils.HOT_QUERIES])
+def test_hot_query_uses_its_index(query_plans, name):
+    report = query_plans[name]
+    assert report["uses_index"], f"{name} does not use {report['index']}: {report['plan']}"
+    assert not report["has_full_scan"], f"{name} scans a table: {report['plan']}"
@@ -0,0 +1,51 @@
+import sqlite3
+from datetime import timedelta
+
+import pytest
+
+import db_utils
+from async_runner import run_async
+from conftest import add_user
+
+
+@pytest.fixture
+def refresh_token(app_db, request):
+    with sqlite3.connect(app_db) as conn:
+        user_id = add_user(conn, request.node.name[:50], sub_end_date="2030-12-31")
+    return run_async(db_utils.create_refresh_token(user_id))
+
+
+def _rotate(token):
+    return run_async(db_utils.rotate_refresh_token(token))
+
+
+@pytest.fixture
+def no_grace(monkeypatch):
+    monkeypatch.setattr(db_utils, "REFRESH_TOKEN_REUSE_GRACE", timedelta(0))
+
+
+def test_rotated_token_is_rejected(refresh_token, no_grace):
+    rotated = _rotate(refresh_token)
+    assert rotated["status"] == "success"
+    assert rotated["refresh_token"] != refresh_token
+
+    assert _rotate(refresh_token) == {"status": "failure", "reason": "Refresh token has been revoked"}
+
+
+def test_reuse_after_grace_revokes_the_family(refresh_token, no_grace):
+    current = _rotate(refresh_token)["refresh_token"]
+
+    assert _rotate(refresh_token)["status"] == "failure"
+    # The legitimate holder is logged out too, since either side may be the thief
+    assert _rotate(current) == {"status": "failure", "reason": "Refresh token has been revoked"}
+
+
+def test_reuse_within_grace_is_tolerated(refresh_token):
+    current = _rotate(refresh_token)["refresh_token"]
+
+    # Another tab refreshing with the same token a moment later gets a sibling
+    sibling = _rotate(refresh_token)
+    assert sibling["status"] == "success"
+    assert sibling["refresh_token"] not in (refresh_token, current)
+    assert _rotate(current)["status"] == "success"
+    assert _rotate(sibling["refresh_token"])["status"] == "success"
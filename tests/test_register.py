@@ -0,0 +1,47 @@
+import io
+import sqlite3
+
+import db_utils
+from async_runner import run_async
+
+
+def _member(username, **fields):
+    return {"username": username, "password": "Secret@123", "dob": "1990-01-01", "sub_end_date": "2030-12-31", **fields}
+
+
+def _user_count(db_name, username):
+    with sqlite3.connect(db_name) as conn:
+        return conn.execute("SELECT COUNT(*) FROM users WHERE username = ?", (username,)).fetchone()[0]
+
+
+def test_register_stores_user_and_image_together(app_db, monkeypatch):
+    async def prepared(data):
+        return {"data": data}
+
+    monkeypatch.setattr(db_utils, "_prepare_profile_image", prepared)
+    result = run_async(db_utils.register(_member("withimage", profile_image=io.BytesIO(b"\x89PNG\r\n\x1a\nimage"))))
+
+    assert result["status"] == "success"
+    with sqlite3.connect(app_db) as conn:
+        assert conn.execute(
+            "SELECT b.mime_type FROM profile_images p JOIN image_blobs b ON b.content_hash = p.content_hash"
+            " WHERE p.user_id = ?", (result["user_id"],)
+        ).fetchone() == ("image/png",)
+
+
+def test_register_leaves_no_user_when_the_image_cannot_be_stored(app_db, monkeypatch):
+    async def prepared(data):
+        return {"data": data}
+
+    def broken_store(conn, user_id, **image):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(db_utils, "_prepare_profile_image", prepared)
+    monkeypatch.setattr(db_utils, "store_profile_image", broken_store)
+    result = run_async(db_utils.register(_member("imagefails", profile_image=io.BytesIO(b"image"))))
+
+    assert result == {"status": "failure", "error": "disk I/O error"}
+    assert _user_count(app_db, "imagefails") == 0
+    # The name is free again, so the member can simply retry
+    monkeypatch.undo()
+    assert run_async(db_utils.register(_member("imagefails")))["status"] == "success"
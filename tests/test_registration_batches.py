@@ -0,0 +1,67 @@
+import sqlite3
+
+from conftest import add_user, bearer
+
+ADMIN = bearer("test-admin", "PubFit", "admin")
+
+
+def _request(client, username):
+    result = client.post("/api/contact-admin", json={
+        "username": username, "phone_no": "9111111111", "email_id": "member@example.com",
+        "message": "Please add me to the gym", "gender": "female", "dob": "1994-04-04",
+    }).get_json()
+    assert result["status"] == "success", result
+    return result["registration_id"]
+
+
+def _statuses(db_name, registration_ids):
+    with sqlite3.connect(db_name) as conn:
+        return [
+            conn.execute("SELECT status FROM registrations WHERE registration_id = ?", (registration_id,)).fetchone()
+            for registration_id in registration_ids
+        ]
+
+
+def test_batch_approval_reports_each_request(client, app_db):
+    with sqlite3.connect(app_db) as conn:
+        add_user(conn, "batch-taken")
+    fresh, taken, twin, twin_again, rejected = (
+        _request(client, name) for name in ("batch-fresh", "batch-taken", "batch-twin", "batch-twin", "batch-rejected")
+    )
+    assert client.post("/api/reject-requests", json={"registration_ids": [rejected]}, headers=ADMIN).get_json()["processed"] == 1
+
+    response = client.post("/api/approve-requests", headers=ADMIN, json={
+        "registration_ids": [fresh, taken, twin, "missing", twin_again, rejected, fresh],
+    })
+
+    assert response.status_code == 200
+    result = response.get_json()
+    assert (result["processed"], result["failed"]) == (2, 4)
+    assert [(outcome["registration_id"], outcome["status"], outcome["message"]) for outcome in result["results"]] == [
+        (fresh, "success", "Registration approved and user account created"),
+        (taken, "failure", "Username already exists in users table"),
+        (twin, "success", "Registration approved and user account created"),
+        ("missing", "failure", "Registration request not found"),
+        (twin_again, "failure", "Username already exists in users table"),
+        (rejected, "failure", "Registration request is already rejected"),
+    ]
+    assert _statuses(app_db, [fresh, taken, twin, twin_again, rejected]) == [
+        ("approved",), ("pending",), ("approved",), ("pending",), ("rejected",),
+    ]
+    with sqlite3.connect(app_db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM users WHERE username IN ('batch-fresh', 'batch-twin')").fetchone() == (2,)
+
+
+def test_batch_rejection_skips_processed_requests(client, app_db):
+    pending, approved = _request(client, "reject-pending"), _request(client, "reject-approved")
+    client.post("/api/approve-requests", json={"registration_ids": [approved]}, headers=ADMIN)
+
+    result = client.post("/api/reject-requests", headers=ADMIN, json={
+        "registration_ids": [pending, approved], "reason": "Duplicate",
+    }).get_json()
+
+    assert [(outcome["status"], outcome["message"]) for outcome in result["results"]] == [
+        ("success", "Registration request rejected"),
+        ("failure", "Registration request is already approved"),
+    ]
+    assert _statuses(app_db, [pending, approved]) == [("rejected",), ("approved",)]
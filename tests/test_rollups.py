@@ -0,0 +1,92 @@
+import sqlite3
+
+import pytest
+
+import db_utils
+from async_runner import run_async
+from conftest import add_user
+from nutrition_rollups import ROLLUPS, apply_day_change, day_totals, rebuild_rollups, verify_rollups
+
+
+def _rollups(conn):
+    return {
+        (table, row[0], row[1]): row[2:]
+        for table, _ in ROLLUPS.values()
+        for row in conn.execute(f"SELECT * FROM {table}")
+    }
+
+
+def assert_matches_rebuild(conn):
+    """The incrementally kept rollups equal a from-scratch rebuild, which is then rolled back."""
+    kept = _rollups(conn)
+    rebuild_rollups(conn)
+    rebuilt = _rollups(conn)
+    conn.rollback()
+    assert kept.keys() == rebuilt.keys()
+    for key, values in kept.items():
+        assert values == pytest.approx(rebuilt[key]), key
+    assert verify_rollups(conn) == []
+
+
+def _foods(conn, count):
+    return [row[0] for row in conn.execute("SELECT food_id FROM foods ORDER BY food_id LIMIT ?", (count,))]
+
+
+def _set_day(conn, user_id, date, totals):
+    # Same shape as the app's writes: read the old totals, change the day, apply the difference
+    old = day_totals(conn, user_id, date)
+    if totals is None:
+        conn.execute("DELETE FROM nutrition_data WHERE user_id = ? AND date = ?", (user_id, date))
+    else:
+        calories, proteins, fats, carbs, water = totals
+        conn.execute("""
+            INSERT OR REPLACE INTO nutrition_data (user_id, date, calories, proteins, fats, carbs, water)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (user_id, date, calories, proteins, fats, carbs, water))
+    apply_day_change(conn, user_id, date, old, day_totals(conn, user_id, date))
+
+
+def test_day_changes_match_a_rebuild(conn):
+    ann, ben = add_user(conn, "ann"), add_user(conn, "ben")
+    # 2025-01-27 to 2025-02-02 is one Monday-to-Sunday week across two months
+    for date in ("2025-01-26", "2025-01-27", "2025-01-31", "2025-02-01", "2025-02-02", "2025-02-03"):
+        _set_day(conn, ann, date, (2000.5, 120, 60.25, 240, 2))
+    _set_day(conn, ben, "2025-01-31", (1500, 90, 50, 180, 1.5))
+    conn.commit()
+    assert_matches_rebuild(conn)
+
+    _set_day(conn, ann, "2025-01-31", (1200, 80, 40, 100, 3))  # edited
+    _set_day(conn, ann, "2025-02-01", (0, 0, 0, 0, 0))          # cleared, still logged
+    _set_day(conn, ann, "2025-02-02", None)                     # deleted
+    _set_day(conn, ann, "2025-01-26", None)                     # the only day of its week
+    _set_day(conn, ben, "2025-01-31", None)                     # the only day of ben's month
+    _set_day(conn, ben, "2025-01-31", (900, 30, 20, 150, 0))    # logged again
+    conn.commit()
+    assert_matches_rebuild(conn)
+    assert ("nutrition_weekly", ann, "2025-01-20") not in _rollups(conn)
+
+
+def test_saves_and_imports_match_a_rebuild(app_db):
+    with sqlite3.connect(app_db) as conn:
+        user_id = add_user(conn, "rollups", sub_end_date="2030-12-31")
+        first, second, third = _foods(conn, 3)
+
+    def save(date, *items, water=0):
+        result = run_async(db_utils.save_nutrition_data_to_db(user_id, {
+            "date": date, "water": water,
+            "items": [{"meal": meal, "food_id": food_id, "servings": servings} for meal, food_id, servings in items],
+        }))
+        assert result["status"] == "success", result
+
+    save("2025-03-30", ("breakfast", first, 1))
+    save("2025-03-31", ("breakfast", first, 2), ("dinner", second, 0.5), water=2)
+    save("2025-04-01", ("lunch", third, 1.5))
+    save("2025-03-31", ("snacks", third, 1), water=1)  # edited
+    save("2025-03-30", water=0.5)                      # items removed
+    assert run_async(db_utils.import_nutrition_chunk(user_id, [
+        {"date": "2025-04-01", "items": [("dinner", first, 3)], "water": 0},
+        {"date": "2025-04-07", "items": None, "calories": 1800, "proteins": 100, "fats": 70, "carbs": 200, "water": 2},
+    ])) == []
+
+    with sqlite3.connect(app_db) as conn:
+        assert_matches_rebuild(conn)
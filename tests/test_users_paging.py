@@ -0,0 +1,55 @@
+import sqlite3
+
+import pytest
+
+from conftest import add_user, bearer
+
+ADMIN = bearer("test-admin", "PubFit", "admin")
+
+# Three members without an end date: pages have to walk the NULL segment and then leave it
+MEMBERS = [
+    ("page-a", None, "2025-01-01", "9000000003"),
+    ("page-b", "2026-06-30", None, "9000000001"),
+    ("page-c", None, None, None),
+    ("page-d", "2026-06-30", "2025-01-01", "9000000001"),
+    ("page-e", "2025-12-31", "2025-02-01", None),
+    ("page-f", None, "2025-03-01", "9000000002"),
+    ("page-g", "2027-01-01", None, "9000000000"),
+]
+
+
+@pytest.fixture(scope="module")
+def members(app_db):
+    with sqlite3.connect(app_db) as conn:
+        return [
+            {"user_id": add_user(conn, username, sub_end_date=end, sub_start_date=start, phone_no=phone),
+             "username": username, "sub_end_date": end, "sub_start_date": start, "phone_no": phone}
+            for username, end, start, phone in MEMBERS
+        ]
+
+
+def _walk(client, sort, limit):
+    seen, cursor = [], None
+    while True:
+        query = {"sort": sort, "limit": limit, "q": "page-"}
+        if cursor:
+            query["cursor"] = cursor
+        result = client.get("/api/users", query_string=query, headers=ADMIN).get_json()
+        assert result["status"] == "success", result
+        assert result["total"] == len(MEMBERS)
+        assert len(result["users"]) <= limit
+        seen.extend(user["user_id"] for user in result["users"])
+        cursor = result["next_cursor"]
+        if cursor is None:
+            return seen
+
+
+@pytest.mark.parametrize("sort", ["sub_end_date", "sub_start_date", "phone_no", "username"])
+@pytest.mark.parametrize("limit", [1, 2, 3, len(MEMBERS)])
+def test_pages_cover_every_member_once(client, members, sort, limit):
+    # SQLite sorts NULLs first; ties are broken by user_id
+    expected = [
+        member["user_id"]
+        for member in sorted(members, key=lambda m: (m[sort] is not None, m[sort] or "", m["user_id"]))
+    ]
+    assert _walk(client, sort, limit) == expected
@@ -0,0 +1,49 @@
+import sqlite3
+
+import pytest
+
+from write_queue import GroupCommitWriter
+
+
+@pytest.fixture
+def writer(tmp_path):
+    db_name = str(tmp_path / "writes.db")
+    with sqlite3.connect(db_name) as conn:
+        conn.execute("CREATE TABLE notes (body TEXT NOT NULL)")
+    # A long delay keeps every job submitted below in the same batch
+    writer = GroupCommitWriter(db_name, max_delay=0.5)
+    yield writer
+    writer.stop()
+
+
+def _insert(body):
+    return lambda conn: conn.execute("INSERT INTO notes (body) VALUES (?)", (body,)).lastrowid
+
+
+def test_failing_job_rolls_back_alone_and_the_batch_commits(writer):
+    def half_written(conn):
+        conn.execute("INSERT INTO notes (body) VALUES ('half')")
+        raise ValueError("job failed after its first write")
+
+    futures = [writer.submit_nowait(job) for job in (_insert("first"), half_written, _insert("last"))]
+
+    assert futures[0].result(timeout=5) == 1
+    with pytest.raises(ValueError, match="job failed"):
+        futures[1].result(timeout=5)
+    assert futures[2].result(timeout=5) == 2
+    with sqlite3.connect(writer.db_name) as conn:
+        assert conn.execute("SELECT body FROM notes ORDER BY rowid").fetchall() == [("first",), ("last",)]
+    stats = writer.stats()
+    assert (stats["batches"], stats["jobs"], stats["failed_jobs"]) == (1, 3, 1)
+
+
+def test_jobs_fail_instead_of_waiting_when_the_writer_cannot_connect(tmp_path):
+    writer = GroupCommitWriter(str(tmp_path / "missing" / "writes.db"))
+    try:
+        for _ in range(2):
+            # The second submit starts a fresh writer thread, which fails the same way
+            with pytest.raises(sqlite3.OperationalError):
+                writer.submit_nowait(_insert("lost")).result(timeout=5)
+        assert not writer.stats()["running"]
+    finally:
+        writer.stop()
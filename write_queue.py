@@ -0,0 +1,192 @@
+import asyncio
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from async_runner import add_database_seconds
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """Single writer thread that batches queued write jobs into one transaction.
+
+    A job is a plain function taking a ``sqlite3.Connection``. Each job runs
+    inside its own SAVEPOINT, so a failing job is rolled back and reported to
+    its caller without affecting the rest of the batch. A batch starts with
+    the first queued job and is flushed once it holds ``max_batch`` jobs or
+    ``max_delay`` seconds after that first job, whichever comes first. If the
+    writer cannot open its connection, the queued jobs fail with that error
+    and the next submit starts a new writer thread.
+    """
+
+    def __init__(self, db_name, max_batch=64, max_delay=0.002, pragmas=None, factory=sqlite3.Connection):
+        self.db_name = db_name
+        self.factory = factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.pragmas = pragmas or {}
+
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self._batches = 0
+        self._jobs = 0
+        self._failed_jobs = 0
+        self._failed_commits = 0
+        self._max_batch_seen = 0
+        self._total_flush = 0.0
+        self._max_flush = 0.0
+
+    def start(self):
+        with self._lock:
+            self._start_locked()
+
+    def _start_locked(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self._thread.start()
+
+    async def submit(self, job):
+        started = time.perf_counter()
+        try:
+            return await asyncio.wrap_future(self.submit_nowait(job))
+        finally:
+            add_database_seconds(time.perf_counter() - started)
+
+    def submit_nowait(self, job):
+        future = Future()
+        # Queued under the lock, so a writer thread that fails to connect cannot miss it (see _run)
+        with self._lock:
+            self._start_locked()
+            self._queue.put((job, future))
+        return future
+
+    def stop(self):
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout=10)
+
+    def _connect(self):
+        # Autocommit mode: transactions are managed explicitly in _flush
+        conn = sqlite3.connect(self.db_name, isolation_level=None, factory=self.factory)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _run(self):
+        try:
+            conn = self._connect()
+        except Exception as e:
+            self._fail_queued(e)
+            return
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(conn, batch)
+        conn.close()
+
+    def _fail_queued(self, error):
+        # Detach this thread first: jobs queued after the lock is released start a new one
+        with self._lock:
+            self._thread = None
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    return
+                if item is _STOP:
+                    continue
+                _, future = item
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(error)
+
+    def _flush(self, conn, batch):
+        start = time.perf_counter()
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for job, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT write_job")
+                try:
+                    result = job(conn)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write_job")
+                    conn.execute("RELEASE write_job")
+                    outcomes.append((future, None, e))
+                else:
+                    conn.execute("RELEASE write_job")
+                    outcomes.append((future, result, None))
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                self._failed_commits += 1
+            for _, future in batch:
+                if not future.cancelled():
+                    future.set_exception(e)
+            return
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._batches += 1
+            self._jobs += len(outcomes)
+            self._failed_jobs += sum(1 for _, _, error in outcomes if error is not None)
+            self._max_batch_seen = max(self._max_batch_seen, len(outcomes))
+            self._total_flush += elapsed
+            self._max_flush = max(self._max_flush, elapsed)
+
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "running": self._thread is not None,
+                "queued": self._queue.qsize(),
+                "batches": self._batches,
+                "jobs": self._jobs,
+                "failed_jobs": self._failed_jobs,
+                "failed_commits": self._failed_commits,
+                "avg_batch_size": round(self._jobs / self._batches, 2) if self._batches else 0.0,
+                "max_batch_size": self._max_batch_seen,
+                "avg_flush_ms": round(self._total_flush * 1000 / self._batches, 3) if self._batches else 0.0,
+                "max_flush_ms": round(self._max_flush * 1000, 3),
+            }
+
+    def register_atexit(self):
+        atexit.register(self.stop)
+        return self